@@ -0,0 +1,294 @@
+# app/admission.py
+# Допуск запросов: лимит частоты на пользователя и общий лимит одновременных
+# запросов к базе. Один клиент, долбящий GET /tasks/, не должен занимать весь пул.
+# Лимит частоты — token bucket на пару (класс маршрута, пользователь): чтение,
+# запись и вход считаются отдельно. Пользователь берётся из JWT без похода в базу,
+# без токена ключом служит IP клиента. Корзины живут в процессе, а с
+# RATE_LIMIT_REDIS_URL — в Redis и общие для всех воркеров.
+# Лимит одновременности ограничивает запросы, держащие соединение с базой:
+# лишние ждут освобождения не дольше DB_CONCURRENCY_WAIT и получают 503,
+# а не висят до таймаута пула.
+import asyncio
+import logging
+import math
+import os
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+import orjson
+from cachetools import TTLCache
+from fastapi import HTTPException
+
+from database import DB_MAX_OVERFLOW, DB_POOL_SIZE
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") == "1"
+# redis://... — общие корзины для нескольких воркеров; без него корзины в процессе
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL")
+RATE_LIMIT_BUCKETS = int(os.getenv("RATE_LIMIT_BUCKETS", "100000"))
+# Одновременных запросов к базе на процесс; по умолчанию столько, сколько соединений даёт пул
+DB_CONCURRENCY_LIMIT = int(os.getenv("DB_CONCURRENCY_LIMIT", str(DB_POOL_SIZE + DB_MAX_OVERFLOW)))
+# Сколько запрос ждёт свободного места, прежде чем получить 503
+DB_CONCURRENCY_WAIT = float(os.getenv("DB_CONCURRENCY_WAIT", "1"))
+# Сколько запросов может ждать одновременно; остальные получают 503 сразу
+DB_CONCURRENCY_QUEUE = int(os.getenv("DB_CONCURRENCY_QUEUE", str(2 * DB_CONCURRENCY_LIMIT)))
+
+
+def _rate(name: str, rate: str, burst: str) -> Tuple[float, float]:
+    # (токенов в секунду, размер корзины)
+    return float(os.getenv(f"RATE_LIMIT_{name}_RATE", rate)), float(os.getenv(f"RATE_LIMIT_{name}_BURST", burst))
+
+
+RATE_LIMITS: Dict[str, Tuple[float, float]] = {
+    "read": _rate("READ", "50", "100"),
+    "write": _rate("WRITE", "20", "40"),
+    "auth": _rate("AUTH", "5", "20"),
+}
+
+# Мониторинг и документация не лимитируются; /parse ходит во внешний сервис, а /timers — в память
+EXEMPT_PREFIXES = ("/metrics", "/docs", "/redoc", "/openapi.json")
+DB_FREE_PREFIXES = EXEMPT_PREFIXES + ("/parse", "/timers")
+
+READ_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+# Корзина в Redis: пополнение и списание одним скриптом, время берётся у Redis,
+# чтобы часы воркеров не расходились. Возвращает время ожидания строкой (Lua режет дроби)
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(wait)
+"""
+
+
+def route_class(method: str, path: str) -> str:
+    if path.startswith("/auth/"):
+        return "auth"
+    return "read" if method in READ_METHODS else "write"
+
+
+class TokenBuckets:
+    # Корзины в памяти процесса: ключ -> [токены, время обновления].
+    # Давно не обновлявшаяся корзина полная, поэтому вытеснение по TTL ничего не теряет
+    def __init__(self, maxsize: int):
+        ttl = max(burst / rate for rate, burst in RATE_LIMITS.values()) + 1
+        self._buckets = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def take(self, key: str, rate: float, burst: float) -> float:
+        """Списывает токен; возвращает 0 или сколько секунд ждать следующего."""
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        tokens = burst if bucket is None else min(burst, bucket[0] + (now - bucket[1]) * rate)
+        if tokens >= 1:
+            self._buckets[key] = [tokens - 1, now]
+            return 0.0
+        self._buckets[key] = [tokens, now]
+        return (1 - tokens) / rate
+
+
+class RedisTokenBuckets:
+    def __init__(self, redis, fallback: TokenBuckets):
+        self._script = redis.register_script(TOKEN_BUCKET_SCRIPT)
+        self.fallback = fallback
+
+    async def take(self, key: str, rate: float, burst: float) -> float:
+        try:
+            return float(await self._script(keys=[f"ratelimit:{key}"], args=[rate, burst]))
+        except Exception:
+            # Без Redis лимит действует хотя бы в пределах процесса
+            logger.warning("Redis недоступен, лимит частоты считается локально", exc_info=True)
+            return await self.fallback.take(key, rate, burst)
+
+
+class ConcurrencyLimiter:
+    def __init__(self, limit: int, wait: float, queue: int):
+        self.limit = limit
+        self.wait = wait
+        self.queue = queue
+        self.in_flight = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def acquire(self) -> bool:
+        # Счётчики меняются только из event loop, блокировка не нужна
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.limit)
+        if self._semaphore.locked():
+            if self.waiting >= self.queue:
+                self.rejected += 1
+                return False
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.wait)
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                return False
+            finally:
+                self.waiting -= 1
+        else:
+            await self._semaphore.acquire()
+        self.in_flight += 1
+        return True
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._semaphore.release()
+
+
+class AdmissionController:
+    def __init__(self, buckets, limiter: ConcurrencyLimiter, enabled: bool = True):
+        self.buckets = buckets
+        self.limiter = limiter
+        self.enabled = enabled
+        self.throttled: Dict[str, int] = {name: 0 for name in RATE_LIMITS}
+
+    async def retry_after(self, route: str, identity: str) -> float:
+        if not self.enabled:
+            return 0.0
+        rate, burst = RATE_LIMITS[route]
+        wait = await self.buckets.take(f"{route}:{identity}", rate, burst)
+        if wait > 0:
+            self.throttled[route] += 1
+        return wait
+
+    def snapshot(self) -> dict:
+        return {
+            "rate_limit_enabled": self.enabled,
+            "throttled": dict(self.throttled),
+            "db_concurrency_limit": self.limiter.limit,
+            "db_in_flight": self.limiter.in_flight,
+            "db_waiting": self.limiter.waiting,
+            "db_rejected": self.limiter.rejected,
+        }
+
+    def prometheus_lines(self) -> List[str]:
+        lines = [
+            "# HELP http_requests_throttled_total Запросы, отклонённые лимитом частоты (429)",
+            "# TYPE http_requests_throttled_total counter",
+        ]
+        lines += [f'http_requests_throttled_total{{class="{name}"}} {count}' for name, count in sorted(self.throttled.items())]
+        lines += [
+            "# HELP db_concurrency_in_flight Запросы, выполняющиеся под лимитом одновременности",
+            "# TYPE db_concurrency_in_flight gauge",
+            f"db_concurrency_in_flight {self.limiter.in_flight}",
+            "# HELP db_concurrency_waiting Запросы в очереди лимита одновременности",
+            "# TYPE db_concurrency_waiting gauge",
+            f"db_concurrency_waiting {self.limiter.waiting}",
+            "# HELP db_concurrency_rejected_total Запросы, отклонённые лимитом одновременности (503)",
+            "# TYPE db_concurrency_rejected_total counter",
+            f"db_concurrency_rejected_total {self.limiter.rejected}",
+        ]
+        return lines
+
+
+# Место текущего запроса под лимитом одновременности: [лимит, пока место занято, иначе None]
+_held_slot: ContextVar[Optional[List[Optional[ConcurrencyLimiter]]]] = ContextVar("held_slot", default=None)
+
+
+def release_db_slot() -> None:
+    """Освобождает место запроса досрочно, если дальше он только ждёт, не держа соединения."""
+    held = _held_slot.get()
+    if held is not None and held[0] is not None:
+        limiter, held[0] = held[0], None
+        limiter.release()
+
+
+def _client_ip(scope) -> str:
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+def _identity(scope) -> str:
+    # Подпись JWT проверяется, но пользователь в базе не ищется: это сделает get_current_user
+    from auth import decode_access_token
+
+    authorization = dict(scope["headers"]).get(b"authorization", b"").decode("latin-1")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            return f"user:{decode_access_token(token)['sub']}"
+        except HTTPException:
+            pass
+    return _client_ip(scope)
+
+
+async def _reject(send, status: int, detail: str, retry_after: float) -> None:
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": orjson.dumps({"detail": detail})})
+
+
+class AdmissionMiddleware:
+    # Чистое ASGI-middleware: место под лимитом одновременности держится до конца
+    # отправки тела, поэтому потоковая выгрузка занимает его, пока читает базу
+    def __init__(self, app, controller: Optional[AdmissionController] = None):
+        self.app = app
+        self.controller = controller or admission
+
+    async def __call__(self, scope, receive, send):
+        path = scope.get("path", "")
+        if scope["type"] != "http" or path.startswith(EXEMPT_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+        controller = self.controller
+        route = route_class(scope["method"], path)
+        # Вход без токена: ключом всегда служит IP, иначе подбор пароля не ограничен
+        identity = _client_ip(scope) if route == "auth" else _identity(scope)
+        wait = await controller.retry_after(route, identity)
+        if wait > 0:
+            await _reject(send, 429, "Слишком много запросов, повторите попытку позже", wait)
+            return
+        if path.startswith(DB_FREE_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+        if not await controller.limiter.acquire():
+            await _reject(send, 503, "Сервис перегружен, повторите попытку позже", controller.limiter.wait)
+            return
+        held = [controller.limiter]
+        token = _held_slot.set(held)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _held_slot.reset(token)
+            if held[0] is not None:
+                held[0].release()
+
+
+def _make_buckets(url: Optional[str]):
+    local = TokenBuckets(RATE_LIMIT_BUCKETS)
+    if not url:
+        return local
+    import redis.asyncio
+
+    return RedisTokenBuckets(redis.asyncio.from_url(url, decode_responses=True), local)
+
+
+admission = AdmissionController(
+    _make_buckets(RATE_LIMIT_REDIS_URL),
+    ConcurrencyLimiter(DB_CONCURRENCY_LIMIT, DB_CONCURRENCY_WAIT, DB_CONCURRENCY_QUEUE),
+    enabled=RATE_LIMIT_ENABLED,
+)
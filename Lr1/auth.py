@@ -1,26 +1,99 @@
 # app/routers/auth.py
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-import schemas, crud, auth
-from database import get_db
-from fastapi.security import OAuth2PasswordRequestForm
+import os
+import secrets
+from datetime import datetime, timedelta, timezone
+
+import jwt
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+import schemas, crud, auth, models, serializers, idempotency
+from database import current_user_id, get_async_session
+from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from principals import principal_cache
+
+# Ключ подписи JWT обязателен: с известным ключом любой выпишет себе токен.
+# SECRET_KEY_DEV=1 разрешает случайный ключ для локальной разработки — токены
+# тогда не переживают перезапуск и не подходят другим воркерам
+SECRET_KEY = os.getenv("SECRET_KEY")
+if not SECRET_KEY:
+    if os.getenv("SECRET_KEY_DEV", "0") != "1":
+        raise RuntimeError("Не задан SECRET_KEY (для локальной разработки — SECRET_KEY_DEV=1)")
+    SECRET_KEY = secrets.token_urlsafe(32)
+ALGORITHM = "HS256"
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 router = APIRouter()
 
+
+def create_access_token(user: models.User) -> str:
+    # Токен несёт id и имя пользователя и проверяется локально, без обращения к базе
+    expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    payload = {"sub": str(user.id), "username": user.username, "exp": expire}
+    return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
+
+
+def decode_access_token(token: str) -> dict:
+    credentials_error = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Не удалось проверить учётные данные",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        int(payload["sub"])
+    except (jwt.PyJWTError, KeyError, ValueError):
+        raise credentials_error
+    return payload
+
+
+async def get_current_user_id(token: str = Depends(oauth2_scheme)) -> int:
+    # Только проверка токена, без базы и кэша пользователей — для эндпоинтов, которым нужен лишь id
+    return int(decode_access_token(token)["sub"])
+
+
+async def get_current_user(
+    token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_session)
+) -> models.User:
+    payload = decode_access_token(token)
+    user_id = int(payload["sub"])
+    # Пользователь берётся из кэша; в базу идём только при промахе
+    user = principal_cache.get(user_id)
+    if user is None:
+        user = await db.get(models.User, user_id)
+        if user is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Пользователь не найден",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        db.expunge(user)
+        principal_cache.put(user)
+    # По нему сессии базы включают read-your-writes после записи
+    current_user_id.set(user.id)
+    return user
+
+
 @router.post("/register", response_model=schemas.UserOut)
-def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    db_user = crud.get_user_by_username(db, username=user.username)
-    if db_user:
-        raise HTTPException(status_code=400, detail="Имя пользователя уже занято")
-    return crud.create_user(db, user)
-
-@router.post("/login")
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = crud.get_user_by_username(db, username=form_data.username)
+async def register(
+    user: schemas.UserCreate,
+    idempotency_key: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_session),
+):
+    async def create():
+        db_user = await crud.get_user_by_username(db, username=user.username)
+        if db_user:
+            raise HTTPException(status_code=400, detail="Имя пользователя уже занято")
+        return serializers.user_to_dict(await crud.create_user(db, user))
+
+    return await idempotency.run(idempotency_key, None, "POST /auth/register", user.dict(), create)
+
+@router.post("/login", response_model=schemas.Token)
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_session)):
+    user = await crud.authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(status_code=400, detail="Неверное имя пользователя или пароль")
-    from passlib.context import CryptContext
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-    if not pwd_context.verify(form_data.password, user.hashed_password):
-        raise HTTPException(status_code=400, detail="Неверное имя пользователя или пароль")
-    return
+    return {"access_token": create_access_token(user), "token_type": "bearer"}
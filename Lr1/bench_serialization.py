@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# Микробенчмарк сериализации страницы задач: стоимость одного элемента
+# для прежнего пути (валидация TaskOut из ORM-объектов + json.dumps, как это
+# делал response_model с JSONResponse) и для быстрого (serializers + orjson).
+# База не нужна: объекты собираются в памяти с типичными связями.
+#
+#   python bench_serialization.py --sizes 1000 10000 --repeat 5
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+from typing import Callable, List
+
+import orjson
+from pydantic import TypeAdapter
+
+import models
+import schemas
+import serializers
+
+
+def build_tasks(count: int, entries: int = 3, tags: int = 2) -> List[models.Task]:
+    now = datetime.utcnow()
+    owner = models.User(id=1, username="alice", email="alice@example.com", hashed_password="x", created_at=now)
+    tag_objects = [models.Tag(id=i, name=f"tag-{i}") for i in range(tags)]
+    tasks = []
+    for i in range(count):
+        task = models.Task(
+            id=i + 1,
+            title=f"Задача {i}",
+            description="Описание задачи для бенчмарка",
+            deadline=now + timedelta(hours=i),
+            priority=i % 5,
+            user_id=1,
+        )
+        task.owner = owner
+        task.time_entries = [
+            models.TimeEntry(id=i * entries + j, duration=30, created_at=now, task_id=i + 1) for j in range(entries)
+        ]
+        task.tags = [models.TaskTag(task_id=i + 1, tag_id=tag.id, tag=tag) for tag in tag_objects]
+        tasks.append(task)
+    return tasks
+
+
+TASK_LIST = TypeAdapter(List[schemas.TaskOut])
+
+
+def before(tasks: List[models.Task]) -> bytes:
+    validated = TASK_LIST.validate_python(tasks, from_attributes=True)
+    return json.dumps(TASK_LIST.dump_python(validated, mode="json"), ensure_ascii=False).encode()
+
+
+def after(tasks: List[models.Task]) -> bytes:
+    return orjson.dumps(serializers.tasks_to_list(tasks))
+
+
+def per_item_us(serialize: Callable[[List[models.Task]], bytes], tasks: List[models.Task], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        serialize(tasks)
+        best = min(best, time.perf_counter() - started)
+    return best / len(tasks) * 1_000_000
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Микробенчмарк сериализации TaskOut")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    print(f"{'items':>8} {'before, мкс/эл.':>16} {'after, мкс/эл.':>15} {'ускорение':>10}")
+    for size in args.sizes:
+        tasks = build_tasks(size)
+        # Оба пути должны давать одинаковый JSON
+        assert json.loads(before(tasks[:50])) == json.loads(after(tasks[:50]))
+        slow = per_item_us(before, tasks, args.repeat)
+        fast = per_item_us(after, tasks, args.repeat)
+        print(f"{size:>8} {slow:>16.1f} {fast:>15.1f} {slow / fast:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+# app/bulk.py
+# Общее для bulk-эндпоинтов tasks и participants
+from typing import Any, Dict, List
+
+from fastapi import HTTPException
+from pydantic import ValidationError
+
+import schemas
+
+# Максимальный размер пакета для bulk-эндпоинтов
+BULK_MAX_ITEMS = 1000
+
+
+def split_valid(items: List[Dict[str, Any]], schema):
+    # Валидируем каждый элемент отдельно, чтобы ошибка в одном не отменяла весь пакет
+    if len(items) > BULK_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Не более {BULK_MAX_ITEMS} элементов за запрос")
+    valid, indexes, errors = [], [], []
+    for index, item in enumerate(items):
+        try:
+            valid.append(schema.parse_obj(item))
+            indexes.append(index)
+        except ValidationError as e:
+            errors.append(schemas.BulkItemError(index=index, detail=e.errors(include_url=False)))
+    return valid, indexes, errors
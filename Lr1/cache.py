@@ -0,0 +1,118 @@
+# app/cache.py
+import logging
+import os
+import time
+from typing import Any, Dict, Optional
+
+import orjson
+from cachetools import TTLCache
+
+logger = logging.getLogger(__name__)
+
+TASK_CACHE_ENABLED = os.getenv("TASK_CACHE_ENABLED", "1") == "1"
+TASK_CACHE_SIZE = int(os.getenv("TASK_CACHE_SIZE", "10000"))
+TASK_CACHE_TTL = int(os.getenv("TASK_CACHE_TTL", "60"))
+# redis://... — общий второй уровень для нескольких воркеров; memory:// — фейк для тестов
+TASK_CACHE_REDIS_URL = os.getenv("TASK_CACHE_REDIS_URL")
+
+
+class InMemoryRedis:
+    # Минимальная замена redis.asyncio.Redis с теми командами, которые использует кэш
+    def __init__(self):
+        self._data: Dict[str, Any] = {}
+        self._expires: Dict[str, float] = {}
+
+    def _alive(self, key: str) -> bool:
+        expires = self._expires.get(key)
+        if expires is not None and expires <= time.monotonic():
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        return key in self._data
+
+    async def get(self, key: str) -> Optional[str]:
+        return self._data[key] if self._alive(key) else None
+
+    async def set(self, key: str, value: str, ex: Optional[int] = None) -> None:
+        self._data[key] = value
+        if ex is None:
+            self._expires.pop(key, None)
+        else:
+            self._expires[key] = time.monotonic() + ex
+
+
+class TaskCache:
+    """Read-through кэш ответов для чтения задач: локальный LRU с TTL и необязательный Redis.
+
+    Все ключи пользователя содержат его tasks_version из базы — тот же счётчик,
+    что и ETag списка. Любая запись в задачи пользователя увеличивает его в своей
+    транзакции, и старые ключи просто перестают читаться, а затем вытесняются
+    по TTL. Версия общая для всех воркеров, поэтому и локальный уровень,
+    и Redis не отдают ответ, устаревший из-за записи на другом воркере.
+    """
+
+    def __init__(self, maxsize: int, ttl: int, redis=None, enabled: bool = True):
+        self.local = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.ttl = ttl
+        self.redis = redis
+        self.enabled = enabled
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(user_id: int, version: int, *parts: Any) -> str:
+        return ":".join(["tasks", str(user_id), str(version), *map(str, parts)])
+
+    async def get(self, key: str) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        value = self.local.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        if self.redis is not None:
+            try:
+                raw = await self.redis.get(key)
+            except Exception:
+                logger.warning("Redis недоступен, кэш задач пропущен", exc_info=True)
+                raw = None
+            if raw is not None:
+                self.redis_hits += 1
+                value = orjson.loads(raw)
+                self.local[key] = value
+                return value
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: Any) -> None:
+        if not self.enabled:
+            return
+        self.local[key] = value
+        if self.redis is not None:
+            try:
+                await self.redis.set(key, orjson.dumps(value), ex=self.ttl)
+            except Exception:
+                logger.warning("Не удалось записать в Redis", exc_info=True)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "size": len(self.local),
+        }
+
+
+def _make_redis(url: Optional[str]):
+    if not url:
+        return None
+    if url.startswith("memory://"):
+        return InMemoryRedis()
+    import redis.asyncio
+
+    return redis.asyncio.from_url(url, decode_responses=True)
+
+
+task_cache = TaskCache(
+    TASK_CACHE_SIZE, TASK_CACHE_TTL, redis=_make_redis(TASK_CACHE_REDIS_URL), enabled=TASK_CACHE_ENABLED
+)
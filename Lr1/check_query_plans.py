@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+# Проверка планов запросов crud на наполненной базе (например, после seed.py).
+# Каждая функция чтения выполняется по-настоящему, её SQL перехватывается
+# и повторяется через EXPLAIN с теми же параметрами. Если где-то остаётся
+# последовательное сканирование таблицы, скрипт завершается с кодом 1.
+#
+# В PostgreSQL на время проверки выключается enable_seqscan: планировщик
+# выбирает Seq Scan только тогда, когда подходящего индекса нет вовсе,
+# поэтому результат не зависит от размера тестовых данных.
+import asyncio
+import json
+import sys
+from datetime import datetime, timedelta
+from typing import List, Tuple
+
+from sqlalchemy import event, select
+
+import crud
+import idempotency
+import models
+from database import AsyncSessionLocal, async_engine
+
+# Запросы, которым полный проход по таблице нужен по смыслу
+ALLOWED_FULL_SCANS = {
+    ("get_users", "user"),
+    # Постраничные списки без фильтра идут в порядке первичного ключа
+    ("get_teams", "team"),
+    ("get_participants", "participant"),
+    # Планировщик сроков один раз при старте читает все будущие сроки всех пользователей
+    ("deadline_upcoming", "task"),
+}
+
+
+def _postgres_seq_scans(plan: dict) -> List[str]:
+    found = []
+    if plan.get("Node Type") == "Seq Scan":
+        found.append(plan.get("Relation Name", "?"))
+    for child in plan.get("Plans", []):
+        found += _postgres_seq_scans(child)
+    return found
+
+
+def _sqlite_full_scans(rows) -> List[str]:
+    found = []
+    for row in rows:
+        detail = row[-1]
+        # "SCAN task" — полный проход; "SEARCH ... USING INDEX" и FTS5 ("VIRTUAL TABLE") допустимы
+        if detail.startswith("SCAN ") and "VIRTUAL TABLE" not in detail and "CONSTANT ROW" not in detail:
+            if " USING INDEX " not in detail and " USING COVERING INDEX " not in detail:
+                found.append(detail.split()[1])
+    return found
+
+
+async def _explain(connection, statement: str, parameters) -> List[str]:
+    if connection.dialect.name == "postgresql":
+        result = await connection.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters)
+        plan = result.scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return _postgres_seq_scans(plan[0]["Plan"])
+    result = await connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)
+    return _sqlite_full_scans(result.all())
+
+
+# Запросы планировщика сроков (deadlines.py) в том же виде, что и в самом планировщике
+def _deadline_query(condition):
+    Task = models.Task
+    return select(Task.id, Task.user_id, Task.title, Task.deadline).where(condition)
+
+
+async def _sample(db) -> Tuple[models.User, int, str]:
+    # Пользователь с задачами, одна из его задач и слово из названия для поиска
+    task = (await db.execute(select(models.Task).where(models.Task.user_id.is_not(None)).limit(1))).scalar()
+    if task is None:
+        raise SystemExit("База пуста: сначала наполните её (seed.py)")
+    user = await db.get(models.User, task.user_id)
+    return user, task.id, task.title.split()[0]
+
+
+def _checks(user: models.User, task_id: int, word: str):
+    # Команды, участники и ключи идемпотентности в seed.py не создаются;
+    # план от наличия строк не зависит, поэтому значения условны
+    now = datetime.utcnow()
+    return [
+        ("get_user_by_username", lambda db: crud.get_user_by_username(db, user.username)),
+        ("get_users", lambda db: crud.get_users(db, limit=50)),
+        ("get_users_keyset", lambda db: crud.get_users(db, limit=50, after=[user.id])),
+        ("get_users_version", lambda db: crud.get_users_version(db)),
+        ("get_tasks_version", lambda db: crud.get_tasks_version(db, user.id)),
+        ("get_task", lambda db: crud.get_task(db, task_id, include=crud.TASK_RELATIONS)),
+        ("get_tasks", lambda db: crud.get_tasks(db, user.id)),
+        ("get_tasks_keyset", lambda db: crud.get_tasks(db, user.id, after=[task_id])),
+        ("get_tasks_priority", lambda db: crud.get_tasks(db, user.id, sort="priority")),
+        ("get_tasks_priority_keyset", lambda db: crud.get_tasks(db, user.id, sort="priority", after=[1, None, 0])),
+        ("get_due_tasks", lambda db: crud.get_due_tasks(db, user.id, timedelta(days=7))),
+        ("search_tasks", lambda db: crud.search_tasks(db, user.id, word)),
+        ("report_total", lambda db: crud.report_total(db, user.id)),
+        ("report_by_task", lambda db: crud.report_by_task(db, user.id)),
+        ("report_by_day", lambda db: crud.report_by_day(db, user.id)),
+        ("report_by_tag", lambda db: crud.report_by_tag(db, user.id)),
+        ("task_export", lambda db: db.execute(crud.task_export_query(user.id).limit(100))),
+        ("deadline_upcoming", lambda db: db.execute(_deadline_query(models.Task.deadline > now).limit(100))),
+        ("deadline_changed", lambda db: db.execute(_deadline_query(models.Task.updated_at > now - timedelta(minutes=1)))),
+        ("deadline_current", lambda db: db.execute(_deadline_query(models.Task.id.in_([task_id])))),
+        ("get_teams", lambda db: crud.get_teams(db)),
+        ("get_team", lambda db: crud.get_team(db, 1)),
+        ("get_team_by_name", lambda db: crud.get_team_by_name(db, "team")),
+        ("get_participants", lambda db: crud.get_participants(db)),
+        ("get_team_participants", lambda db: crud.get_participants(db, team_id=1)),
+        ("get_participant", lambda db: crud.get_participant(db, 1)),
+        ("get_participant_by_nickname", lambda db: crud.get_participant_by_nickname(db, "nickname")),
+        ("idempotency_lookup", lambda db: idempotency._load(f"user:{user.id}", "key")),
+    ]
+
+
+async def main() -> int:
+    captured: List[Tuple[str, object]] = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            captured.append((statement, parameters))
+
+    async with AsyncSessionLocal() as db:
+        user, task_id, word = await _sample(db)
+        checks = _checks(user, task_id, word)
+
+    failures = 0
+    event.listen(async_engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        for label, run in checks:
+            captured.clear()
+            async with AsyncSessionLocal() as db:
+                await run(db)
+            statements = list(captured)
+            async with async_engine.connect() as connection:
+                event.remove(async_engine.sync_engine, "before_cursor_execute", capture)
+                if connection.dialect.name == "postgresql":
+                    await connection.exec_driver_sql("SET enable_seqscan = off")
+                scans = set()
+                for statement, parameters in statements:
+                    scans |= set(await _explain(connection, statement, parameters))
+                event.listen(async_engine.sync_engine, "before_cursor_execute", capture)
+            scans = {table for table in scans if (label, table) not in ALLOWED_FULL_SCANS}
+            if scans:
+                failures += 1
+                print(f"FAIL {label}: последовательное сканирование {', '.join(sorted(scans))}")
+            else:
+                print(f"ok   {label} ({len(statements)} запросов)")
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", capture)
+        await async_engine.dispose()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -1,83 +1,569 @@
 # app/crud.py
-from sqlalchemy.orm import Session
-from typing import List, Optional
-import models, schemas
-from passlib.context import CryptContext
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from sqlalchemy import and_, delete, exc, func, insert, or_, select, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, noload, selectinload
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Collection, Dict, Iterable, List, Optional, Tuple
+import models, schemas, search
+from passwords import hasher
+from principals import principal_cache
+from deadlines import deadline_scheduler
 
 # Функции для работы с пользователями
-def get_user_by_username(db: Session, username: str) -> Optional[models.User]:
-    return db.query(models.User).filter(models.User.username == username).first()
+async def get_user_by_username(db: AsyncSession, username: str) -> Optional[models.User]:
+    result = await db.execute(select(models.User).where(models.User.username == username))
+    return result.scalars().first()
 
-def create_user(db: Session, user: schemas.UserCreate) -> models.User:
-    hashed_password = pwd_context.hash(user.password)
+async def create_user(db: AsyncSession, user: schemas.UserCreate) -> models.User:
+    hashed_password = await hasher.hash(user.password)
     db_user = models.User(username=user.username, email=user.email, hashed_password=hashed_password)
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
-def update_user_password(db: Session, user: models.User, new_password: str) -> models.User:
-    user.hashed_password = pwd_context.hash(new_password)
-    db.commit()
-    db.refresh(user)
+async def update_user_password(db: AsyncSession, user: models.User, new_password: str) -> models.User:
+    user.hashed_password = await hasher.hash(new_password)
+    await db.commit()
+    await db.refresh(user)
+    principal_cache.invalidate(user.id)
+    return user
+
+async def authenticate_user(db: AsyncSession, username: str, password: str) -> Optional[models.User]:
+    user = await get_user_by_username(db, username)
+    if not user:
+        return None
+    valid, new_hash = await hasher.verify_and_update(password, user.hashed_password)
+    if not valid:
+        return None
+    if new_hash:
+        # Стоимость bcrypt поменялась — сохраняем пересчитанный хэш
+        user.hashed_password = new_hash
+        await db.commit()
     return user
 
-def get_users(db: Session, skip: int = 0, limit: int = 100) -> List[models.User]:
-    return db.query(models.User).offset(skip).limit(limit).all()
+async def get_users_version(db: AsyncSession) -> int:
+    # Пользователи не изменяют видимых в UserOut полей и не удаляются,
+    # поэтому версией списка служит максимальный id
+    return await db.scalar(select(func.max(models.User.id))) or 0
+
+async def get_users(
+    db: AsyncSession, skip: int = 0, limit: int = 100, after: Optional[list] = None
+) -> List[models.User]:
+    query = select(models.User).order_by(models.User.id)
+    if after is not None:
+        # Keyset-пагинация: поиск по индексу вместо пропуска skip строк
+        query = query.where(models.User.id > after[0])
+    else:
+        query = query.offset(skip)
+    result = await db.execute(query.limit(limit))
+    return result.scalars().all()
 
 
 # Функции для работы с задачами
-def create_task(db: Session, task: schemas.TaskCreate, user_id: int) -> models.Task:
+def tasks_version_bump(user_id: int):
+    # Счётчик изменений задач пользователя (для ETag); увеличивается в той же транзакции
+    return update(models.User).where(models.User.id == user_id).values(tasks_version=models.User.tasks_version + 1)
+
+async def _bump_tasks_version(db: AsyncSession, user_id: int) -> None:
+    await db.execute(tasks_version_bump(user_id))
+
+async def get_tasks_version(db: AsyncSession, user_id: int) -> int:
+    return await db.scalar(select(models.User.tasks_version).where(models.User.id == user_id)) or 0
+
+async def create_task(db: AsyncSession, task: schemas.TaskCreate, user_id: int) -> models.Task:
     db_task = models.Task(**task.dict(), user_id=user_id)
     db.add(db_task)
-    db.commit()
-    db.refresh(db_task)
-    return db_task
+    await _bump_tasks_version(db, user_id)
+    await db.commit()
+    deadline_scheduler.schedule(db_task.id, user_id, db_task.title, db_task.deadline)
+    # В async-сессии ленивой загрузки нет, поэтому связи для TaskOut читаем сразу
+    return await get_task(db, db_task.id, include=TASK_RELATIONS)
+
+async def create_tasks_bulk(db: AsyncSession, tasks: List[schemas.TaskCreate], user_id: int) -> List[Row]:
+    # Одна транзакция и один многострочный INSERT ... RETURNING на весь пакет.
+    # Возвращаем строки, а не ORM-объекты: после commit их не нужно перечитывать из базы
+    if not tasks:
+        return []
+    rows = [{**task.dict(), "user_id": user_id} for task in tasks]
+    result = await db.execute(insert(models.Task).returning(*models.Task.__table__.c), rows)
+    created = result.all()
+    await _bump_tasks_version(db, user_id)
+    await db.commit()
+    for row in created:
+        deadline_scheduler.schedule(row.id, user_id, row.title, row.deadline)
+    return created
+
+# Вложенные коллекции TaskOut, которые можно отключить через ?include=
+TASK_RELATIONS = ("time_entries", "tags")
 
-def get_task(db: Session, task_id: int) -> Optional[models.Task]:
-    return db.query(models.Task).filter(models.Task.id == task_id).first()
+def task_load_options(include: Collection[str] = TASK_RELATIONS) -> list:
+    # Явная стратегия загрузки: страница задач читается фиксированным числом запросов
+    # (задачи + владельцы одним JOIN, записи времени и метки по одному SELECT ... IN),
+    # а не отдельным запросом на каждую задачу
+    Task = models.Task
+    options = [joinedload(Task.owner)]
+    if "time_entries" in include:
+        options.append(selectinload(Task.time_entries))
+    else:
+        options.append(noload(Task.time_entries))
+    if "tags" in include:
+        options.append(selectinload(Task.tags).joinedload(models.TaskTag.tag))
+    else:
+        options.append(noload(Task.tags))
+    return options
 
-def get_tasks(db: Session, user_id: int, skip: int = 0, limit: int = 100) -> List[models.Task]:
-    return db.query(models.Task).filter(models.Task.user_id == user_id).offset(skip).limit(limit).all()
+async def get_task(
+    db: AsyncSession, task_id: int, include: Optional[Collection[str]] = None
+) -> Optional[models.Task]:
+    query = select(models.Task).where(models.Task.id == task_id)
+    if include is not None:
+        # populate_existing: объект может уже лежать в сессии без загруженных связей
+        query = query.options(*task_load_options(include)).execution_options(populate_existing=True)
+    result = await db.execute(query)
+    return result.scalars().first()
 
-def update_task(db: Session, task_id: int, task_update: schemas.TaskCreate) -> Optional[models.Task]:
-    task = get_task(db, task_id)
+def _tasks_after_priority(priority: int, deadline: Optional[datetime], task_id: int):
+    # Условие "строго после (priority, deadline, id)" при сортировке deadline NULLS LAST.
+    # Ведущее priority >= даёт планировщику границу диапазона по индексу
+    # (user_id, priority, deadline, id): глубокие страницы не читают начало списка
+    Task = models.Task
+    if deadline is None:
+        after = or_(
+            Task.priority > priority,
+            and_(Task.priority == priority, Task.deadline.is_(None), Task.id > task_id),
+        )
+    else:
+        after = or_(
+            Task.priority > priority,
+            and_(Task.priority == priority, or_(Task.deadline > deadline, Task.deadline.is_(None))),
+            and_(Task.priority == priority, Task.deadline == deadline, Task.id > task_id),
+        )
+    return and_(Task.priority >= priority, after)
+
+async def get_tasks(
+    db: AsyncSession,
+    user_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    sort: str = "id",
+    after: Optional[list] = None,
+    include: Collection[str] = TASK_RELATIONS,
+) -> List[models.Task]:
+    query = select(models.Task).options(*task_load_options(include)).where(models.Task.user_id == user_id)
+    if sort == "priority":
+        query = query.order_by(models.Task.priority, models.Task.deadline.asc().nulls_last(), models.Task.id)
+        if after is not None:
+            query = query.where(_tasks_after_priority(*after))
+    else:
+        query = query.order_by(models.Task.id)
+        if after is not None:
+            query = query.where(models.Task.id > after[0])
+    if after is None:
+        query = query.offset(skip)
+    result = await db.execute(query.limit(limit))
+    return result.scalars().unique().all()
+
+async def update_task(db: AsyncSession, task_id: int, task_update: schemas.TaskCreate) -> Optional[models.Task]:
+    task = await get_task(db, task_id)
     if task:
         for key, value in task_update.dict().items():
             setattr(task, key, value)
-        db.commit()
-        db.refresh(task)
+        await _bump_tasks_version(db, task.user_id)
+        await db.commit()
+        deadline_scheduler.schedule(task.id, task.user_id, task.title, task.deadline)
+        task = await get_task(db, task_id, include=TASK_RELATIONS)
     return task
 
-def delete_task(db: Session, task_id: int) -> bool:
-    task = get_task(db, task_id)
-    if task:
-        db.delete(task)
-        db.commit()
+async def delete_task(db: AsyncSession, task_id: int) -> bool:
+    # Удаляем зависимые строки явными DELETE, без загрузки коллекций задачи в сессию
+    await db.execute(delete(models.TaskTag).where(models.TaskTag.task_id == task_id))
+    await db.execute(delete(models.TimeRollup).where(models.TimeRollup.task_id == task_id))
+    await db.execute(delete(models.TimeEntry).where(models.TimeEntry.task_id == task_id))
+    result = await db.execute(
+        delete(models.Task).where(models.Task.id == task_id).returning(models.Task.user_id)
+    )
+    deleted = result.first()
+    if deleted:
+        await _bump_tasks_version(db, deleted.user_id)
+        await db.commit()
+        deadline_scheduler.unschedule(task_id)
         return True
+    await db.rollback()
     return False
 
+def dialect_insert(dialect_name: str, model):
+    # INSERT с поддержкой ON CONFLICT для текущей СУБД (PostgreSQL или SQLite в тестах)
+    if dialect_name == "postgresql":
+        return postgresql.insert(model)
+    return sqlite.insert(model)
+
+def rollup_rows(user_id: int, entries: Iterable[Tuple[int, datetime, int]]) -> List[dict]:
+    # entries: (task_id, created_at, duration). Суммы сворачиваются по дню до записи
+    buckets = defaultdict(lambda: [0, 0])
+    for task_id, created_at, duration in entries:
+        bucket = buckets[(task_id, created_at.date())]
+        bucket[0] += duration
+        bucket[1] += 1
+    return [
+        {"user_id": user_id, "task_id": task_id, "day": day, "total_minutes": total, "entry_count": count}
+        for (task_id, day), (total, count) in buckets.items()
+    ]
+
+def rollup_upsert(dialect_name: str):
+    # Одним UPSERT прибавляет суммы к уже накопленным в time_rollup
+    stmt = dialect_insert(dialect_name, models.TimeRollup)
+    return stmt.on_conflict_do_update(
+        index_elements=["user_id", "day", "task_id"],
+        set_={
+            "total_minutes": models.TimeRollup.total_minutes + stmt.excluded.total_minutes,
+            "entry_count": models.TimeRollup.entry_count + stmt.excluded.entry_count,
+        },
+    )
+
+async def _add_to_rollups(db: AsyncSession, user_id: int, entries: Iterable[Tuple[int, datetime, int]]) -> None:
+    rows = rollup_rows(user_id, entries)
+    if rows:
+        await db.execute(rollup_upsert(db.get_bind().dialect.name), rows)
+
 # Функции для работы с учётом времени
-def create_time_entry(db: Session, task_id: int, time_entry: schemas.TimeEntryCreate) -> models.TimeEntry:
+async def create_time_entry(
+    db: AsyncSession, task_id: int, time_entry: schemas.TimeEntryCreate, user_id: int
+) -> models.TimeEntry:
     db_time_entry = models.TimeEntry(**time_entry.dict(), task_id=task_id)
     db.add(db_time_entry)
-    db.commit()
-    db.refresh(db_time_entry)
+    # Сводка обновляется в той же транзакции, что и сама запись
+    await _add_to_rollups(db, user_id, [(task_id, db_time_entry.created_at, db_time_entry.duration)])
+    await _bump_tasks_version(db, user_id)
+    await db.commit()
+    await db.refresh(db_time_entry)
     return db_time_entry
 
+async def create_time_entries_bulk(
+    db: AsyncSession, task_id: int, time_entries: List[schemas.TimeEntryCreate], user_id: int
+) -> List[Row]:
+    if not time_entries:
+        return []
+    now = datetime.utcnow()
+    rows = [{**entry.dict(), "task_id": task_id, "created_at": now} for entry in time_entries]
+    result = await db.execute(insert(models.TimeEntry).returning(*models.TimeEntry.__table__.c), rows)
+    created = result.all()
+    await _add_to_rollups(db, user_id, [(task_id, now, entry.duration) for entry in time_entries])
+    await _bump_tasks_version(db, user_id)
+    await db.commit()
+    return created
+
+async def create_time_entries_for_users(
+    db: AsyncSession, entries: List[Tuple[int, int, int, datetime]]
+) -> List[int]:
+    """Записи разных пользователей одной транзакцией: (user_id, task_id, duration, created_at).
+
+    Возвращает id в порядке entries.
+    """
+    if not entries:
+        return []
+    rows = [
+        {"task_id": task_id, "duration": duration, "created_at": created_at}
+        for _, task_id, duration, created_at in entries
+    ]
+    stmt = insert(models.TimeEntry).returning(models.TimeEntry.id, sort_by_parameter_order=True)
+    ids = list((await db.scalars(stmt, rows)).all())
+    by_user = defaultdict(list)
+    for user_id, task_id, duration, created_at in entries:
+        by_user[user_id].append((task_id, created_at, duration))
+    rollups = [row for user_id, user_entries in by_user.items() for row in rollup_rows(user_id, user_entries)]
+    await db.execute(rollup_upsert(db.get_bind().dialect.name), rollups)
+    await db.execute(
+        update(models.User)
+        .where(models.User.id.in_(by_user))
+        .values(tasks_version=models.User.tasks_version + 1)
+    )
+    await db.commit()
+    return ids
+
+async def get_existing_task_ids(db: AsyncSession, task_ids: Collection[int]) -> set:
+    return set(await db.scalars(select(models.Task.id).where(models.Task.id.in_(task_ids))))
+
 # Функции для работы с метками и ассоциацией TaskTag
-def create_tag(db: Session, tag: schemas.TagCreate) -> models.Tag:
+async def create_tag(db: AsyncSession, tag: schemas.TagCreate) -> models.Tag:
     db_tag = models.Tag(**tag.dict())
     db.add(db_tag)
-    db.commit()
-    db.refresh(db_tag)
+    await db.commit()
+    await db.refresh(db_tag)
     return db_tag
 
-def add_tag_to_task(db: Session, task_id: int, task_tag: schemas.TaskTagBase) -> models.TaskTag:
+async def get_tag(db: AsyncSession, tag_id: int) -> Optional[models.Tag]:
+    return await db.get(models.Tag, tag_id)
+
+async def get_task_tag(db: AsyncSession, task_id: int, tag_id: int) -> Optional[models.TaskTag]:
+    return await db.get(models.TaskTag, (task_id, tag_id))
+
+async def add_tag_to_task(
+    db: AsyncSession, task_id: int, task_tag: schemas.TaskTagBase, user_id: int
+) -> Optional[models.TaskTag]:
+    """Возвращает None, если метку уже назначили задаче (в том числе параллельным запросом)."""
     db_task_tag = models.TaskTag(task_id=task_id, tag_id=task_tag.tag_id, note=task_tag.note)
     db.add(db_task_tag)
-    db.commit()
-    db.refresh(db_task_tag)
+    try:
+        # Связь вставляется автосбросом перед UPDATE счётчика, поэтому ошибка возможна уже здесь
+        await _bump_tasks_version(db, user_id)
+        await db.commit()
+    except exc.IntegrityError:
+        await db.rollback()
+        return None
+    # TaskTagOut вкладывает саму метку — загружаем её вместе со связью
+    await db.refresh(db_task_tag, attribute_names=["tag"])
     return db_task_tag
+
+async def add_tags_to_tasks_bulk(
+    db: AsyncSession, links: List[schemas.TaskTagLinkCreate], user_id: int
+) -> Tuple[List[Row], List[Tuple[int, str]]]:
+    """Возвращает созданные связи и ошибки в виде (позиция в links, описание)."""
+    if not links:
+        return [], []
+    task_ids = {link.task_id for link in links}
+    tag_ids = {link.tag_id for link in links}
+    # Все проверки делаются тремя запросами на весь пакет, а не по запросу на строку
+    known_tasks = set(
+        await db.scalars(
+            select(models.Task.id).where(models.Task.id.in_(task_ids), models.Task.user_id == user_id)
+        )
+    )
+    known_tags = set(await db.scalars(select(models.Tag.id).where(models.Tag.id.in_(tag_ids))))
+    existing = set(
+        (
+            await db.execute(
+                select(models.TaskTag.task_id, models.TaskTag.tag_id).where(
+                    tuple_(models.TaskTag.task_id, models.TaskTag.tag_id).in_(
+                        [(link.task_id, link.tag_id) for link in links]
+                    )
+                )
+            )
+        ).all()
+    )
+
+    rows, errors = [], []
+    for position, link in enumerate(links):
+        key = (link.task_id, link.tag_id)
+        if link.task_id not in known_tasks:
+            errors.append((position, "Задача не найдена"))
+        elif link.tag_id not in known_tags:
+            errors.append((position, "Метка не найдена"))
+        elif key in existing:
+            errors.append((position, "Метка уже назначена задаче"))
+        else:
+            existing.add(key)
+            rows.append(link.dict())
+
+    created = []
+    if rows:
+        result = await db.execute(insert(models.TaskTag).returning(*models.TaskTag.__table__.c), rows)
+        created = result.all()
+        await _bump_tasks_version(db, user_id)
+        await db.commit()
+    return created, errors
+
+# Функции для работы с командами и участниками
+async def get_teams(db: AsyncSession, skip: int = 0, limit: int = 100) -> List[models.Team]:
+    result = await db.execute(select(models.Team).order_by(models.Team.id).offset(skip).limit(limit))
+    return result.scalars().all()
+
+async def get_team(db: AsyncSession, team_id: int) -> Optional[models.Team]:
+    return await db.get(models.Team, team_id)
+
+async def get_team_by_name(db: AsyncSession, name: str) -> Optional[models.Team]:
+    return await db.scalar(select(models.Team).where(models.Team.name == name))
+
+async def create_team(db: AsyncSession, team: schemas.TeamCreate) -> models.Team:
+    db_team = models.Team(**team.dict())
+    db.add(db_team)
+    await db.commit()
+    await db.refresh(db_team)
+    return db_team
+
+async def _team_ids(db: AsyncSession, names: Collection[str]) -> Dict[str, int]:
+    # Недостающие команды создаются одним INSERT ... ON CONFLICT DO NOTHING, id читаются одним SELECT
+    names = sorted(names)
+    if not names:
+        return {}
+    stmt = dialect_insert(db.get_bind().dialect.name, models.Team)
+    await db.execute(stmt.on_conflict_do_nothing(index_elements=["name"]), [{"name": name} for name in names])
+    rows = await db.execute(select(models.Team.name, models.Team.id).where(models.Team.name.in_(names)))
+    return {name: team_id for name, team_id in rows}
+
+async def get_participants(
+    db: AsyncSession, skip: int = 0, limit: int = 100, team_id: Optional[int] = None
+) -> List[models.Participant]:
+    query = select(models.Participant).order_by(models.Participant.id)
+    if team_id is not None:
+        query = query.where(models.Participant.team_id == team_id)
+    result = await db.execute(query.offset(skip).limit(limit))
+    return result.scalars().all()
+
+async def get_participant(db: AsyncSession, participant_id: int) -> Optional[models.Participant]:
+    return await db.get(models.Participant, participant_id)
+
+async def get_participant_by_nickname(db: AsyncSession, nickname: str) -> Optional[models.Participant]:
+    return await db.scalar(select(models.Participant).where(models.Participant.nickname == nickname))
+
+async def create_participant(db: AsyncSession, participant: schemas.ParticipantCreate) -> models.Participant:
+    data = participant.dict(exclude={"team_name"})
+    if participant.team_name:
+        data["team_id"] = (await _team_ids(db, [participant.team_name]))[participant.team_name]
+    db_participant = models.Participant(**data)
+    db.add(db_participant)
+    await db.commit()
+    await db.refresh(db_participant)
+    return db_participant
+
+async def set_participant_team(
+    db: AsyncSession, participant: models.Participant, team_id: Optional[int]
+) -> models.Participant:
+    participant.team_id = team_id
+    await db.commit()
+    await db.refresh(participant)
+    return participant
+
+async def upsert_participants_bulk(
+    db: AsyncSession, participants: List[schemas.ParticipantCreate]
+) -> Tuple[Dict[str, int], Dict[str, int]]:
+    """Создаёт или обновляет участников по nickname и назначает команды по имени.
+
+    Всё выполняется в одной транзакции: команды, затем один UPSERT участников.
+    Возвращает соответствия имя команды -> id и nickname -> id.
+    """
+    if not participants:
+        return {}, {}
+    team_ids = await _team_ids(db, {p.team_name for p in participants if p.team_name})
+    now = datetime.utcnow()
+    # Повтор никнейма в пакете: побеждает последняя строка (ON CONFLICT не обновляет строку дважды)
+    rows = {
+        p.nickname: {
+            **p.dict(exclude={"team_name"}),
+            "team_id": team_ids.get(p.team_name) if p.team_name else None,
+            "created_at": now,
+        }
+        for p in participants
+    }
+    stmt = dialect_insert(db.get_bind().dialect.name, models.Participant)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["nickname"],
+        set_={
+            "full_name": stmt.excluded.full_name,
+            "email": stmt.excluded.email,
+            "phone": stmt.excluded.phone,
+            "skill": stmt.excluded.skill,
+            # Без команды в строке текущая команда участника сохраняется
+            "team_id": func.coalesce(stmt.excluded.team_id, models.Participant.team_id),
+        },
+    ).returning(models.Participant.nickname, models.Participant.id)
+    result = await db.execute(stmt, list(rows.values()))
+    participant_ids = {nickname: participant_id for nickname, participant_id in result}
+    await db.commit()
+    return team_ids, participant_ids
+
+
+# Отчёты по учёту времени. Читают только time_rollup, поэтому стоимость зависит
+# от числа возвращаемых групп, а не от числа сырых записей
+def _rollups_in_range(query, user_id: int, date_from: Optional[date], date_to: Optional[date]):
+    query = query.where(models.TimeRollup.user_id == user_id)
+    if date_from is not None:
+        query = query.where(models.TimeRollup.day >= date_from)
+    if date_to is not None:
+        query = query.where(models.TimeRollup.day <= date_to)
+    return query
+
+def _totals():
+    return (
+        func.sum(models.TimeRollup.total_minutes).label("total_minutes"),
+        func.sum(models.TimeRollup.entry_count).label("entry_count"),
+    )
+
+async def report_total(
+    db: AsyncSession, user_id: int, date_from: Optional[date] = None, date_to: Optional[date] = None
+) -> Row:
+    query = _rollups_in_range(select(*_totals()), user_id, date_from, date_to)
+    return (await db.execute(query)).one()
+
+async def report_by_task(
+    db: AsyncSession, user_id: int, date_from: Optional[date] = None, date_to: Optional[date] = None
+) -> List[Row]:
+    query = select(models.TimeRollup.task_id, *_totals()).group_by(models.TimeRollup.task_id)
+    query = _rollups_in_range(query, user_id, date_from, date_to).order_by(models.TimeRollup.task_id)
+    return (await db.execute(query)).all()
+
+async def report_by_day(
+    db: AsyncSession, user_id: int, date_from: Optional[date] = None, date_to: Optional[date] = None
+) -> List[Row]:
+    query = select(models.TimeRollup.day, *_totals()).group_by(models.TimeRollup.day)
+    query = _rollups_in_range(query, user_id, date_from, date_to).order_by(models.TimeRollup.day)
+    return (await db.execute(query)).all()
+
+async def report_by_tag(
+    db: AsyncSession, user_id: int, date_from: Optional[date] = None, date_to: Optional[date] = None
+) -> List[Row]:
+    query = (
+        select(models.Tag.id.label("tag_id"), models.Tag.name, *_totals())
+        .join(models.TaskTag, models.TaskTag.task_id == models.TimeRollup.task_id)
+        .join(models.Tag, models.Tag.id == models.TaskTag.tag_id)
+        .group_by(models.Tag.id, models.Tag.name)
+    )
+    query = _rollups_in_range(query, user_id, date_from, date_to).order_by(models.Tag.id)
+    return (await db.execute(query)).all()
+
+# Задачи со сроком в ближайшие within, по возрастанию срока (индекс user_id, deadline)
+async def get_due_tasks(
+    db: AsyncSession,
+    user_id: int,
+    within: timedelta,
+    limit: int = 100,
+    after: Optional[list] = None,
+    include: Collection[str] = TASK_RELATIONS,
+) -> List[models.Task]:
+    Task = models.Task
+    now = datetime.utcnow()
+    query = (
+        select(Task)
+        .options(*task_load_options(include))
+        .where(Task.user_id == user_id, Task.deadline >= now, Task.deadline <= now + within)
+        .order_by(Task.deadline, Task.id)
+    )
+    if after is not None:
+        query = query.where(tuple_(Task.deadline, Task.id) > tuple_(*after))
+    result = await db.execute(query.limit(limit))
+    return result.scalars().unique().all()
+
+# Выгрузка задач пользователя вместе со всеми записями учёта времени
+def task_export_query(user_id: int):
+    Task, TimeEntry = models.Task, models.TimeEntry
+    return (
+        select(
+            Task.id.label("task_id"),
+            Task.title,
+            Task.description,
+            Task.deadline,
+            Task.priority,
+            TimeEntry.id.label("time_entry_id"),
+            TimeEntry.duration,
+            TimeEntry.created_at,
+        )
+        .outerjoin(TimeEntry, TimeEntry.task_id == Task.id)
+        .where(Task.user_id == user_id)
+        .order_by(Task.id, TimeEntry.id)
+    )
+
+async def search_tasks(
+    db: AsyncSession,
+    user_id: int,
+    q: str,
+    limit: int = 20,
+    after: Optional[list] = None,
+    include: Collection[str] = TASK_RELATIONS,
+) -> List[Row]:
+    # Строки (Task, score) по убыванию релевантности; score нужен для курсора
+    query = search.search_query(db.get_bind().dialect.name, user_id, q, after=after)
+    query = query.options(*task_load_options(include)).limit(limit)
+    return (await db.execute(query)).unique().all()
@@ -0,0 +1,317 @@
+# app/deadlines.py
+# Планировщик напоминаний о сроках задач без постоянного опроса базы.
+# Включается DEADLINE_SCHEDULER_ENABLED=1. Напоминания шлёт один процесс:
+# в PostgreSQL воркеры соревнуются за advisory-блокировку, остальные ждут
+# и берут её, если ведущий остановится. Ведущий загружает будущие сроки в кучу
+# и спит до ближайшего из них; создание, изменение и удаление задач в его
+# процессе crud передаёт в кучу сразу после commit.
+# Записи других воркеров до ведущего так не доходят, поэтому только в PostgreSQL
+# он раз в DEADLINE_SYNC_INTERVAL секунд сверяется с базой: один запрос по
+# индексу task.updated_at, читающий лишь изменённые с прошлой сверки задачи.
+# С SQLite процесс один, и сверки нет вовсе.
+# Перед отправкой напоминания задача перечитывается: удалённые и перенесённые
+# на другом воркере задачи не дают устаревших напоминаний.
+# В остальных процессах schedule/unschedule ничего не делают.
+import asyncio
+import heapq
+import inspect
+import itertools
+import logging
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import select, text
+
+import models
+from database import AsyncSessionLocal, async_engine
+
+logger = logging.getLogger(__name__)
+
+DEADLINE_SCHEDULER_ENABLED = os.getenv("DEADLINE_SCHEDULER_ENABLED", "0") == "1"
+# За сколько минут до срока срабатывает напоминание
+DEADLINE_REMINDER_LEAD_MINUTES = int(os.getenv("DEADLINE_REMINDER_LEAD_MINUTES", "15"))
+DEADLINE_LOAD_BATCH_SIZE = 10000
+# Как часто ведущий в PostgreSQL подтягивает из базы задачи, изменённые другими воркерами
+DEADLINE_SYNC_INTERVAL = float(os.getenv("DEADLINE_SYNC_INTERVAL", "30"))
+# Запас на расхождение часов воркеров при выборке по updated_at
+DEADLINE_SYNC_OVERLAP = timedelta(seconds=5)
+# Ключ pg_try_advisory_lock, которую держит ведущий планировщик
+DEADLINE_LOCK_KEY = 7300114
+
+
+@dataclass
+class Reminder:
+    task_id: int
+    user_id: Optional[int]
+    title: str
+    deadline: datetime
+
+
+def utc_naive(value: datetime) -> datetime:
+    # Сроки хранятся в UTC без часового пояса, как и created_at
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+class DeadlineScheduler:
+    """Куча (время напоминания, seq, task_id) с ленивым удалением.
+
+    Изменение срока не ищет старую запись в куче: актуальная хранится
+    в _entries, устаревшие записи отбрасываются при извлечении.
+    """
+
+    def __init__(self, lead: timedelta):
+        self.lead = lead
+        self.handlers: List[Callable[[Reminder], object]] = [self._log_reminder]
+        self.fired = 0
+        self._heap: List[Tuple[datetime, int, int]] = []
+        self._entries: Dict[int, Tuple[int, Reminder]] = {}
+        self._seq = itertools.count()
+        # Уже отправленные напоминания: task_id -> срок; живут, пока срок не наступит
+        self._fired: Dict[int, datetime] = {}
+        self._synced_at: Optional[datetime] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._runner: Optional[asyncio.Task] = None
+        self._lock_connection = None
+        # True только у ведущего процесса после загрузки сроков
+        self.active = False
+
+    @staticmethod
+    def _log_reminder(reminder: Reminder) -> None:
+        logger.info(
+            "Срок задачи %s пользователя %s: %s (%s)",
+            reminder.task_id, reminder.user_id, reminder.deadline.isoformat(), reminder.title,
+        )
+
+    def _push(self, reminder: Reminder) -> None:
+        seq = next(self._seq)
+        self._entries[reminder.task_id] = (seq, reminder)
+        heapq.heappush(self._heap, (reminder.deadline - self.lead, seq, reminder.task_id))
+        if len(self._heap) > 2 * len(self._entries) + 1024:
+            # Устаревших записей стало больше живых — перестраиваем кучу
+            self._heap = [item for item in self._heap if self._entries.get(item[2], (None,))[0] == item[1]]
+            heapq.heapify(self._heap)
+
+    def schedule(self, task_id: int, user_id: Optional[int], title: str, deadline: Optional[datetime]) -> None:
+        # Вызывается после commit создания или изменения задачи
+        if not self.active:
+            return
+        self._schedule(task_id, user_id, title, deadline)
+        if self._wakeup is not None:
+            # Срок мог стать ближайшим — корутина пересчитает время сна
+            self._wakeup.set()
+
+    def unschedule(self, task_id: int) -> None:
+        if self.active:
+            self._entries.pop(task_id, None)
+
+    def _schedule(self, task_id: int, user_id: Optional[int], title: str, deadline: Optional[datetime]) -> None:
+        if deadline is None or utc_naive(deadline) <= datetime.utcnow():
+            self._entries.pop(task_id, None)
+            return
+        deadline = utc_naive(deadline)
+        if self._fired.get(task_id) == deadline:
+            # Напоминание об этом сроке уже ушло; задачу только переименовали или перечитали
+            self._entries.pop(task_id, None)
+            return
+        self._push(Reminder(task_id, user_id, title, deadline))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def next_fire_at(self) -> Optional[datetime]:
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def _drop_stale(self) -> None:
+        while self._heap:
+            _, seq, task_id = self._heap[0]
+            entry = self._entries.get(task_id)
+            if entry is not None and entry[0] == seq:
+                return
+            heapq.heappop(self._heap)
+
+    def pop_due(self, now: datetime) -> List[Reminder]:
+        due = []
+        self._drop_stale()
+        while self._heap and self._heap[0][0] <= now:
+            _, _, task_id = heapq.heappop(self._heap)
+            due.append(self._entries.pop(task_id)[1])
+            self._drop_stale()
+        if self._fired:
+            self._fired = {task_id: deadline for task_id, deadline in self._fired.items() if deadline > now}
+        return due
+
+    async def confirm(self, due: List[Reminder]) -> List[Reminder]:
+        """Оставляет напоминания, чьи задачи всё ещё существуют с тем же сроком."""
+        Task = models.Task
+        query = select(Task.id, Task.user_id, Task.title, Task.deadline).where(
+            Task.id.in_([reminder.task_id for reminder in due])
+        )
+        async with AsyncSessionLocal() as db:
+            current = {row.id: row for row in await db.execute(query)}
+        confirmed = []
+        for reminder in due:
+            row = current.get(reminder.task_id)
+            if row is None:
+                continue
+            if row.deadline is not None and utc_naive(row.deadline) == reminder.deadline:
+                confirmed.append(reminder)
+            else:
+                # Срок перенесли на другом воркере — планируем заново
+                self._schedule(row.id, row.user_id, row.title, row.deadline)
+        return confirmed
+
+    async def _dispatch(self, reminder: Reminder) -> None:
+        self.fired += 1
+        self._fired[reminder.task_id] = reminder.deadline
+        for handler in self.handlers:
+            try:
+                result = handler(reminder)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception:
+                logger.exception("Ошибка обработчика напоминания о задаче %s", reminder.task_id)
+
+    async def load(self) -> int:
+        # Будущие сроки читаются потоком, куча строится за O(n)
+        now = datetime.utcnow()
+        Task = models.Task
+        query = (
+            select(Task.id, Task.user_id, Task.title, Task.deadline)
+            .where(Task.deadline > now)
+            .execution_options(yield_per=DEADLINE_LOAD_BATCH_SIZE)
+        )
+        self._heap.clear()
+        self._entries.clear()
+        self._synced_at = now
+        async with AsyncSessionLocal() as db:
+            result = await db.stream(query)
+            async for row in result:
+                seq = next(self._seq)
+                reminder = Reminder(row.id, row.user_id, row.title, row.deadline)
+                self._entries[row.id] = (seq, reminder)
+                self._heap.append((row.deadline - self.lead, seq, row.id))
+        heapq.heapify(self._heap)
+        return len(self._heap)
+
+    async def sync(self) -> int:
+        """Подтягивает задачи, изменённые с прошлой синхронизации, в том числе другими воркерами."""
+        started = datetime.utcnow()
+        Task = models.Task
+        query = select(Task.id, Task.user_id, Task.title, Task.deadline).where(
+            Task.updated_at > self._synced_at - DEADLINE_SYNC_OVERLAP
+        )
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(query)).all()
+        for row in rows:
+            self._schedule(row.id, row.user_id, row.title, row.deadline)
+        self._synced_at = started
+        return len(rows)
+
+    @staticmethod
+    def _shared() -> bool:
+        # SQLite в тестах и локально — один процесс: ни блокировка, ни сверка не нужны
+        return async_engine.dialect.name == "postgresql"
+
+    async def _acquire_lock(self) -> bool:
+        if not self._shared():
+            return True
+        connection = await async_engine.connect()
+        try:
+            locked = await connection.scalar(text("SELECT pg_try_advisory_lock(:key)"), {"key": DEADLINE_LOCK_KEY})
+            # Блокировка сессионная и переживает commit; транзакцию открытой не держим
+            await connection.commit()
+        except Exception:
+            await connection.close()
+            raise
+        if not locked:
+            await connection.close()
+            return False
+        self._lock_connection = connection
+        return True
+
+    async def _release_lock(self) -> None:
+        connection, self._lock_connection = self._lock_connection, None
+        if connection is None:
+            return
+        try:
+            # Соединение вернётся в пул, поэтому блокировку снимаем явно
+            await connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": DEADLINE_LOCK_KEY})
+            await connection.commit()
+        except Exception:
+            # Закрытие самого соединения тоже снимает блокировку
+            await connection.invalidate()
+        await connection.close()
+
+    async def _lead(self) -> int:
+        # Пока блокировку держит другой воркер, ждём: он может остановиться
+        while True:
+            try:
+                if await self._acquire_lock():
+                    return await self.load()
+            except Exception:
+                logger.exception("Планировщик сроков не запустился, повтор через %s с", DEADLINE_SYNC_INTERVAL)
+                await self._release_lock()
+            await asyncio.sleep(DEADLINE_SYNC_INTERVAL)
+
+    async def _tick(self) -> None:
+        due = self.pop_due(datetime.utcnow())
+        if not due:
+            return
+        try:
+            due = await self.confirm(due)
+        except Exception:
+            logger.exception("Не удалось перечитать задачи перед напоминанием, отправляем без проверки")
+        for reminder in due:
+            await self._dispatch(reminder)
+
+    async def _run(self) -> None:
+        loaded = await self._lead()
+        self.active = True
+        logger.info("Планировщик сроков: загружено %s задач", loaded)
+        loop = asyncio.get_running_loop()
+        next_sync = loop.time() + DEADLINE_SYNC_INTERVAL if self._shared() else None
+        while True:
+            self._wakeup.clear()
+            if next_sync is not None and loop.time() >= next_sync:
+                try:
+                    await self.sync()
+                except Exception:
+                    logger.exception("Не удалось синхронизировать сроки задач с базой")
+                next_sync = loop.time() + DEADLINE_SYNC_INTERVAL
+            await self._tick()
+            # Без сверки и без сроков корутина спит, пока schedule() её не разбудит
+            timeouts = [] if next_sync is None else [next_sync - loop.time()]
+            fire_at = self.next_fire_at()
+            if fire_at is not None:
+                timeouts.append((fire_at - datetime.utcnow()).total_seconds())
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), max(min(timeouts), 0) if timeouts else None)
+            except asyncio.TimeoutError:
+                pass
+
+    async def start(self) -> None:
+        self._wakeup = asyncio.Event()
+        self._runner = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            self._runner.cancel()
+            try:
+                await self._runner
+            except asyncio.CancelledError:
+                pass
+        self._runner = None
+        self._wakeup = None
+        self.active = False
+        self._heap.clear()
+        self._entries.clear()
+        self._fired.clear()
+        await self._release_lock()
+
+
+deadline_scheduler = DeadlineScheduler(timedelta(minutes=DEADLINE_REMINDER_LEAD_MINUTES))
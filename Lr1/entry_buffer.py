@@ -0,0 +1,211 @@
+# app/entry_buffer.py
+# Отложенная запись (write-behind) для POST /tasks/{id}/time_entries.
+# Агент присылает запись раз в минуту на пользователя; транзакция на каждую
+# запись нагружает базу сильнее, чем сами данные. В этом режиме записи копятся
+# в памяти процесса и пишутся одним многострочным INSERT раз в
+# TIME_ENTRY_FLUSH_INTERVAL_MS или при накоплении TIME_ENTRY_FLUSH_ROWS строк.
+# Буфер ограничен: при заполнении запрос ждёт места не дольше
+# TIME_ENTRY_BUFFER_WAIT, затем получает 503. Без TIME_ENTRY_DURABLE ответ
+# отдаётся сразу (202) и записи в буфере теряются при падении процесса;
+# с ним запрос ждёт сброса своей записи и получает её id.
+import asyncio
+import logging
+import os
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional
+
+from sqlalchemy import exc
+
+import crud
+from database import AsyncSessionLocal, replica_set
+
+logger = logging.getLogger(__name__)
+
+TIME_ENTRY_WRITE_BEHIND = os.getenv("TIME_ENTRY_WRITE_BEHIND", "0") == "1"
+TIME_ENTRY_FLUSH_INTERVAL_MS = int(os.getenv("TIME_ENTRY_FLUSH_INTERVAL_MS", "200"))
+TIME_ENTRY_FLUSH_ROWS = int(os.getenv("TIME_ENTRY_FLUSH_ROWS", "1000"))
+TIME_ENTRY_BUFFER_LIMIT = int(os.getenv("TIME_ENTRY_BUFFER_LIMIT", "50000"))
+TIME_ENTRY_BUFFER_WAIT = float(os.getenv("TIME_ENTRY_BUFFER_WAIT", "1"))
+TIME_ENTRY_DURABLE = os.getenv("TIME_ENTRY_DURABLE", "0") == "1"
+# Сколько раз запись без ожидающего клиента пробуют записать после ошибки базы
+TIME_ENTRY_MAX_ATTEMPTS = 3
+
+
+class TimeEntryBufferFull(Exception):
+    """Буфер записей переполнен; main.py превращает это в 503."""
+
+
+class TaskGone(Exception):
+    """Задачу удалили, пока запись ждала в буфере."""
+
+
+@dataclass
+class PendingEntry:
+    user_id: int
+    task_id: int
+    duration: int
+    created_at: datetime
+    waiter: Optional[asyncio.Future] = None
+    attempts: int = field(default=0)
+
+
+class TimeEntryBuffer:
+    def __init__(self, interval_ms: int, flush_rows: int, limit: int, wait: float, durable: bool, enabled: bool):
+        self.interval = interval_ms / 1000
+        self.flush_rows = flush_rows
+        self.limit = limit
+        self.wait = wait
+        self.durable = durable
+        self.enabled = enabled
+        self._pending: Deque[PendingEntry] = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._drained: Optional[asyncio.Event] = None
+        self._runner: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.flushed = 0
+        self.flushes = 0
+        self.rejected = 0
+        self.dropped = 0
+
+    @property
+    def running(self) -> bool:
+        return self._runner is not None
+
+    async def add(self, user_id: int, task_id: int, duration: int) -> Dict[str, Any]:
+        """Ставит запись в очередь; возвращает содержимое ответа (id только в durable-режиме)."""
+        deadline = asyncio.get_running_loop().time() + self.wait
+        while len(self._pending) >= self.limit:
+            # Обратное давление: ждём ближайшего сброса, а не растим очередь
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                self.rejected += 1
+                raise TimeEntryBufferFull()
+            self._wakeup.set()
+            try:
+                await asyncio.wait_for(self._drained.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+        entry = PendingEntry(user_id, task_id, duration, datetime.utcnow())
+        if self.durable:
+            entry.waiter = asyncio.get_running_loop().create_future()
+        self._pending.append(entry)
+        if len(self._pending) >= self.flush_rows:
+            self._wakeup.set()
+        entry_id = await entry.waiter if entry.waiter is not None else None
+        return {"duration": duration, "id": entry_id, "created_at": entry.created_at}
+
+    async def flush(self) -> int:
+        """Сбрасывает одну пачку; возвращает число снятых с очереди записей, 0 — при ошибке."""
+        batch = [self._pending.popleft() for _ in range(min(self.flush_rows, len(self._pending)))]
+        if not batch:
+            return 0
+        taken = len(batch)
+        try:
+            ids = await self._write(batch)
+        except exc.IntegrityError:
+            # Скорее всего задачу удалили, пока запись ждала: такие записи отбрасываем
+            async with AsyncSessionLocal() as db:
+                existing = await crud.get_existing_task_ids(db, {entry.task_id for entry in batch})
+            gone = [entry for entry in batch if entry.task_id not in existing]
+            for entry in gone:
+                self._fail(entry, TaskGone())
+            batch = [entry for entry in batch if entry.task_id in existing]
+            try:
+                ids = await self._write(batch)
+            except Exception as e:
+                self._retry(batch, e)
+                return 0
+        except Exception as e:
+            self._retry(batch, e)
+            return 0
+        for entry, entry_id in zip(batch, ids):
+            if entry.waiter is not None and not entry.waiter.done():
+                entry.waiter.set_result(entry_id)
+        for user_id in {entry.user_id for entry in batch}:
+            replica_set.mark_write(user_id)
+        self.flushed += len(batch)
+        self.flushes += 1
+        return taken
+
+    async def _write(self, batch: List[PendingEntry]) -> List[int]:
+        async with AsyncSessionLocal() as db:
+            return await crud.create_time_entries_for_users(
+                db, [(entry.user_id, entry.task_id, entry.duration, entry.created_at) for entry in batch]
+            )
+
+    def _fail(self, entry: PendingEntry, error: Exception) -> None:
+        self.dropped += 1
+        if entry.waiter is not None and not entry.waiter.done():
+            entry.waiter.set_exception(error)
+        else:
+            logger.warning("Запись времени для задачи %s отброшена: %r", entry.task_id, error)
+
+    def _retry(self, batch: List[PendingEntry], error: Exception) -> None:
+        # Ожидающий клиент получает ошибку сразу; остальные записи возвращаются в начало очереди
+        logger.error("Не удалось записать %s записей времени", len(batch), exc_info=error)
+        for entry in reversed(batch):
+            entry.attempts += 1
+            if entry.waiter is not None or entry.attempts >= TIME_ENTRY_MAX_ATTEMPTS:
+                self._fail(entry, error)
+            else:
+                self._pending.appendleft(entry)
+
+    async def _run(self) -> None:
+        # Цикл не отменяется снаружи: отмена посреди _write потеряла бы уже снятую с очереди пачку
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            while self._pending:
+                if not await self.flush():
+                    break
+                if len(self._pending) < self.flush_rows:
+                    break
+            self._drained.set()
+            self._drained.clear()
+
+    async def start(self) -> None:
+        self._wakeup = asyncio.Event()
+        self._drained = asyncio.Event()
+        self._stopping = False
+        self._runner = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            # Просим цикл выйти после текущего сброса и ждём его, не отменяя
+            self._stopping = True
+            self._wakeup.set()
+            await self._runner
+        self._runner = None
+        # Плановая остановка: всё накопленное записывается до выхода
+        while self._pending:
+            if not await self.flush():
+                break
+        if self._pending:
+            logger.error("При остановке не записано %s записей времени", len(self._pending))
+
+    def snapshot(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "durable": self.durable,
+            "pending": len(self._pending),
+            "limit": self.limit,
+            "flushed": self.flushed,
+            "flushes": self.flushes,
+            "rejected": self.rejected,
+            "dropped": self.dropped,
+        }
+
+
+time_entry_buffer = TimeEntryBuffer(
+    TIME_ENTRY_FLUSH_INTERVAL_MS,
+    TIME_ENTRY_FLUSH_ROWS,
+    TIME_ENTRY_BUFFER_LIMIT,
+    TIME_ENTRY_BUFFER_WAIT,
+    TIME_ENTRY_DURABLE,
+    TIME_ENTRY_WRITE_BEHIND,
+)
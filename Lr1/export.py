@@ -0,0 +1,55 @@
+# app/export.py
+import csv
+import io
+import os
+from typing import AsyncIterator, List
+
+import orjson
+from sqlalchemy.engine import Row
+
+import crud
+from database import AsyncReadSessionLocal
+
+# Сколько строк читается из серверного курсора за раз
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "1000"))
+
+EXPORT_COLUMNS = [
+    "task_id", "title", "description", "deadline", "priority", "time_entry_id", "duration", "created_at",
+]
+
+
+async def export_partitions(user_id: int, chunk_size: int = EXPORT_CHUNK_SIZE) -> AsyncIterator[List[Row]]:
+    # Сессия своя: ответ отдаётся уже после выхода из зависимостей запроса.
+    # stream() + yield_per читают результат серверным курсором порциями,
+    # поэтому в памяти одновременно находится не больше chunk_size строк
+    async with AsyncReadSessionLocal() as session:
+        query = crud.task_export_query(user_id).execution_options(yield_per=chunk_size)
+        result = await session.stream(query)
+        async for partition in result.partitions():
+            yield partition
+
+
+def _value(value):
+    return value.isoformat() if hasattr(value, "isoformat") else value
+
+
+async def ndjson_chunks(user_id: int) -> AsyncIterator[bytes]:
+    # orjson с теми же правилами, что у ORJSONResponse: даты в том же формате, что и в ответах API
+    async for partition in export_partitions(user_id):
+        yield b"".join(
+            orjson.dumps(dict(zip(EXPORT_COLUMNS, row)), option=orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE)
+            for row in partition
+        )
+
+
+async def csv_chunks(user_id: int) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    async for partition in export_partitions(user_id):
+        writer.writerows([_value(value) for value in row] for row in partition)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
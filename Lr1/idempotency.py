@@ -0,0 +1,151 @@
+# app/idempotency.py
+# Поддержка заголовка Idempotency-Key для эндпоинтов создания.
+# Первый запрос с ключом "захватывает" строку в idempotencykey (INSERT ... ON CONFLICT
+# DO NOTHING), выполняет действие и сохраняет ответ. Повторы получают сохранённый ответ,
+# не вызывая crud. Параллельный дубликат ждёт, пока первый запрос не запишет ответ:
+# строка общая для всех воркеров, поэтому ожидание работает и между процессами.
+import asyncio
+import hashlib
+import os
+import random
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Optional
+
+import orjson
+from fastapi import HTTPException, Response
+from sqlalchemy import and_, delete, select, update
+
+import crud
+import models
+from database import AsyncSessionLocal
+
+IDEMPOTENCY_TTL = int(os.getenv("IDEMPOTENCY_TTL", str(24 * 3600)))
+# Сколько дубликат ждёт первый запрос, прежде чем получить 409
+IDEMPOTENCY_WAIT_TIMEOUT = float(os.getenv("IDEMPOTENCY_WAIT_TIMEOUT", "30"))
+# Незавершённый захват старше этого считается брошенным (воркер упал) и перехватывается
+IDEMPOTENCY_LOCK_TIMEOUT = float(os.getenv("IDEMPOTENCY_LOCK_TIMEOUT", "60"))
+IDEMPOTENCY_POLL_INTERVAL = 0.05
+# Доля захватов, после которых удаляются просроченные ключи
+IDEMPOTENCY_PURGE_PROBABILITY = 0.01
+MAX_KEY_LENGTH = 255
+
+REPLAYED_HEADER = "Idempotency-Replayed"
+
+
+def fingerprint(route: str, payload: Any) -> str:
+    # Ключ привязан к эндпоинту и телу запроса: тот же ключ с другим запросом — ошибка клиента
+    raw = orjson.dumps([route, payload], option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+    return hashlib.sha256(raw).hexdigest()
+
+
+def _replay(record: models.IdempotencyKey) -> Response:
+    return Response(
+        content=record.response_body,
+        status_code=record.status_code,
+        media_type="application/json",
+        headers={REPLAYED_HEADER: "true"},
+    )
+
+
+def _key_filter(scope: str, key: str):
+    Key = models.IdempotencyKey
+    return and_(Key.scope == scope, Key.key == key)
+
+
+async def _claim(scope: str, key: str, request_hash: str) -> bool:
+    Key = models.IdempotencyKey
+    now = datetime.utcnow()
+    async with AsyncSessionLocal() as db:
+        # Просроченный ключ можно использовать заново
+        await db.execute(delete(Key).where(_key_filter(scope, key), Key.created_at < now - timedelta(seconds=IDEMPOTENCY_TTL)))
+        stmt = crud.dialect_insert(db.get_bind().dialect.name, Key).values(
+            scope=scope, key=key, request_hash=request_hash, created_at=now
+        )
+        claimed = (await db.execute(stmt.on_conflict_do_nothing().returning(Key.key))).first() is not None
+        if not claimed:
+            # Брошенный захват того же запроса перехватываем
+            result = await db.execute(
+                update(Key)
+                .where(
+                    _key_filter(scope, key),
+                    Key.request_hash == request_hash,
+                    Key.status_code.is_(None),
+                    Key.created_at < now - timedelta(seconds=IDEMPOTENCY_LOCK_TIMEOUT),
+                )
+                .values(created_at=now)
+            )
+            claimed = result.rowcount == 1
+        if claimed and random.random() < IDEMPOTENCY_PURGE_PROBABILITY:
+            await db.execute(delete(Key).where(Key.created_at < now - timedelta(seconds=IDEMPOTENCY_TTL)))
+        await db.commit()
+    return claimed
+
+
+async def _load(scope: str, key: str) -> Optional[models.IdempotencyKey]:
+    async with AsyncSessionLocal() as db:
+        return await db.scalar(select(models.IdempotencyKey).where(_key_filter(scope, key)))
+
+
+async def _store(scope: str, key: str, status_code: int, body: bytes) -> None:
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            update(models.IdempotencyKey)
+            .where(_key_filter(scope, key))
+            .values(status_code=status_code, response_body=body.decode())
+        )
+        await db.commit()
+
+
+async def _release(scope: str, key: str) -> None:
+    # Действие упало без ответа — освобождаем ключ, чтобы повтор выполнил его заново
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(models.IdempotencyKey).where(_key_filter(scope, key)))
+        await db.commit()
+
+
+async def run(
+    key: Optional[str],
+    user_id: Optional[int],
+    route: str,
+    payload: Any,
+    action: Callable[[], Awaitable[Any]],
+    status_code: int = 200,
+) -> Response:
+    """Выполняет action (возвращает JSON-совместимое содержимое ответа) не более одного раза на ключ."""
+    if key is None:
+        return Response(orjson.dumps(await action()), status_code=status_code, media_type="application/json")
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"Idempotency-Key должен быть от 1 до {MAX_KEY_LENGTH} символов")
+    scope = f"user:{user_id}" if user_id is not None else "anonymous"
+    request_hash = fingerprint(route, payload)
+
+    deadline = asyncio.get_running_loop().time() + IDEMPOTENCY_WAIT_TIMEOUT
+    while not await _claim(scope, key, request_hash):
+        record = await _load(scope, key)
+        if record is None:
+            # Первый запрос освободил ключ — пробуем захватить снова
+            continue
+        if record.request_hash != request_hash:
+            raise HTTPException(status_code=422, detail="Idempotency-Key уже использован с другим запросом")
+        if record.status_code is not None:
+            return _replay(record)
+        if asyncio.get_running_loop().time() >= deadline:
+            raise HTTPException(status_code=409, detail="Запрос с этим Idempotency-Key ещё выполняется")
+        await asyncio.sleep(IDEMPOTENCY_POLL_INTERVAL)
+
+    try:
+        content = await action()
+    except HTTPException as e:
+        if e.status_code >= 500:
+            await _release(scope, key)
+            raise
+        # Ошибки клиента (404, 400) тоже результат запроса: повтор получит тот же ответ
+        await _store(scope, key, e.status_code, orjson.dumps({"detail": e.detail}))
+        raise
+    except Exception:
+        # Отмена запроса сюда не попадает: такой захват перехватит повтор через IDEMPOTENCY_LOCK_TIMEOUT
+        await _release(scope, key)
+        raise
+    body = orjson.dumps(content)
+    await _store(scope, key, status_code, body)
+    return Response(body, status_code=status_code, media_type="application/json")
@@ -0,0 +1,310 @@
+#!/usr/bin/env python
+# Нагрузочный прогон Time Manager API.
+# Поднимает приложение (uvicorn) на локальной базе, накатывает миграции,
+# наполняет её через seed.py и гоняет смешанный сценарий асинхронным
+# клиентом с заданной конкурентностью. Результат — JSON с RPS и
+# p50/p95/p99 по каждому эндпоинту, который можно сравнивать между коммитами.
+#
+#   python loadtest.py --users 200 --tasks-per-user 50 --concurrency 32 --duration 30 --output run.json
+#   python loadtest.py --reuse --compare run.json
+#   python loadtest.py --url http://localhost:8000 --duration 60     # уже запущенный сервер
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import secrets
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DATABASE_URL = f"sqlite+aiosqlite:///{os.path.join(tempfile.gettempdir(), 'time_manager_loadtest.db')}"
+DEFAULT_MIX = "list_tasks=50,get_task=30,add_time_entry=15,login=5"
+PASSWORD = "password"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _parse_mix(mix: str) -> Dict[str, int]:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in SCENARIOS:
+            raise SystemExit(f"Неизвестный сценарий: {name}")
+        weights[name.strip()] = int(weight or 1)
+    return weights
+
+
+def prepare_database(args, env: Dict[str, str]) -> None:
+    # Свежая база: миграции и seed.py в отдельных процессах с тем же окружением, что у сервера
+    if args.database_url.startswith("sqlite") and not args.reuse:
+        path = args.database_url.split(":///", 1)[1]
+        if os.path.exists(path):
+            os.remove(path)
+    subprocess.run([sys.executable, "-m", "alembic", "upgrade", "head"], cwd=HERE, env=env, check=True)
+    if not args.reuse:
+        subprocess.run(
+            [
+                sys.executable, "seed.py",
+                "--users", str(args.users),
+                "--tasks-per-user", str(args.tasks_per_user),
+                "--entries-per-task", str(args.entries_per_task),
+                "--seed", str(args.seed),
+                "--password", PASSWORD,
+            ],
+            cwd=HERE, env=env, check=True,
+        )
+
+
+def start_server(port: int, env: Dict[str, str], workers: int) -> subprocess.Popen:
+    command = [
+        sys.executable, "-m", "uvicorn", "main:app",
+        "--host", "127.0.0.1", "--port", str(port),
+        "--workers", str(workers), "--log-level", "warning",
+    ]
+    return subprocess.Popen(command, cwd=HERE, env=env)
+
+
+async def wait_ready(client: httpx.AsyncClient, server: Optional[subprocess.Popen], timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server is not None and server.poll() is not None:
+            raise SystemExit("Сервер завершился при запуске")
+        try:
+            if (await client.get("/metrics")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise SystemExit("Сервер не ответил за отведённое время")
+
+
+class VirtualUser:
+    def __init__(self, username: str):
+        self.username = username
+        self.headers: Dict[str, str] = {}
+        self.task_ids: List[int] = []
+
+
+async def _login(client: httpx.AsyncClient, user: VirtualUser) -> httpx.Response:
+    response = await client.post("/auth/login", data={"username": user.username, "password": PASSWORD})
+    if response.status_code == 200:
+        user.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    return response
+
+
+async def list_tasks(client: httpx.AsyncClient, user: VirtualUser, rng: random.Random) -> httpx.Response:
+    return await client.get("/tasks/", params={"limit": 50}, headers=user.headers)
+
+
+async def get_task(client: httpx.AsyncClient, user: VirtualUser, rng: random.Random) -> httpx.Response:
+    return await client.get(f"/tasks/{rng.choice(user.task_ids)}", headers=user.headers)
+
+
+async def add_time_entry(client: httpx.AsyncClient, user: VirtualUser, rng: random.Random) -> httpx.Response:
+    return await client.post(
+        f"/tasks/{rng.choice(user.task_ids)}/time_entries",
+        json={"duration": rng.randint(5, 120)},
+        headers=user.headers,
+    )
+
+
+async def login(client: httpx.AsyncClient, user: VirtualUser, rng: random.Random) -> httpx.Response:
+    return await _login(client, user)
+
+
+SCENARIOS = {
+    "list_tasks": list_tasks,
+    "get_task": get_task,
+    "add_time_entry": add_time_entry,
+    "login": login,
+}
+
+
+async def prepare_users(client: httpx.AsyncClient, count: int) -> List[VirtualUser]:
+    # Пользователи из seed.py: вход и список их задач до начала замера
+    response = await client.get("/users/", params={"limit": count})
+    response.raise_for_status()
+    users = [VirtualUser(item["username"]) for item in response.json()]
+    for user in users:
+        (await _login(client, user)).raise_for_status()
+        tasks = await client.get("/tasks/", params={"limit": 100, "include": ""}, headers=user.headers)
+        user.task_ids = [task["id"] for task in tasks.json()]
+    users = [user for user in users if user.task_ids]
+    if not users:
+        raise SystemExit("В базе нет пользователей с задачами")
+    return users
+
+
+async def drive(
+    client: httpx.AsyncClient, users: List[VirtualUser], weights: Dict[str, int], args
+) -> Tuple[Dict[str, List[float]], Dict[str, int], float]:
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    names, cumulative = list(weights), list(weights.values())
+    started = time.monotonic()
+    measure_from = started + args.warmup
+    stop_at = measure_from + args.duration
+
+    async def worker(index: int) -> None:
+        rng = random.Random(args.seed * 1000 + index)
+        user = users[index % len(users)]
+        while True:
+            now = time.monotonic()
+            if now >= stop_at:
+                return
+            name = rng.choices(names, cumulative)[0]
+            request_started = time.perf_counter()
+            try:
+                response = await SCENARIOS[name](client, user, rng)
+                failed = response.status_code >= 400
+            except httpx.HTTPError:
+                failed = True
+            elapsed = time.perf_counter() - request_started
+            if now >= measure_from:
+                latencies[name].append(elapsed)
+                if failed:
+                    errors[name] += 1
+
+    await asyncio.gather(*(worker(index) for index in range(args.concurrency)))
+    return latencies, errors, time.monotonic() - measure_from
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    # Ближайший ранг: значение, не меньше которого q% наблюдений
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(q / 100 * len(sorted_values)) - 1, 0)
+    return sorted_values[rank]
+
+
+def summarize(values: List[float], errors: int, seconds: float) -> dict:
+    values = sorted(values)
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "rps": round(len(values) / seconds, 1) if seconds else 0.0,
+        "p50_ms": round(percentile(values, 50) * 1000, 2),
+        "p95_ms": round(percentile(values, 95) * 1000, 2),
+        "p99_ms": round(percentile(values, 99) * 1000, 2),
+        "mean_ms": round(sum(values) / len(values) * 1000, 2) if values else 0.0,
+        "max_ms": round(values[-1] * 1000, 2) if values else 0.0,
+    }
+
+
+def build_report(latencies, errors, seconds: float, args) -> dict:
+    everything = [value for values in latencies.values() for value in values]
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "database": args.url or args.database_url.split("://", 1)[0],
+            "concurrency": args.concurrency,
+            "duration_s": round(seconds, 2),
+            "mix": args.mix,
+            "dataset": {
+                "users": args.users,
+                "tasks_per_user": args.tasks_per_user,
+                "entries_per_task": args.entries_per_task,
+                "seed": args.seed,
+            },
+        },
+        "total": summarize(everything, sum(errors.values()), seconds),
+        "endpoints": {name: summarize(latencies[name], errors[name], seconds) for name in sorted(latencies)},
+    }
+
+
+def print_comparison(report: dict, baseline: dict) -> None:
+    print(f"{'endpoint':<16} {'rps':>24} {'p50, мс':>24} {'p99, мс':>24}", file=sys.stderr)
+    rows = [("total", report["total"], baseline.get("total", {}))]
+    rows += [(name, stats, baseline.get("endpoints", {}).get(name, {})) for name, stats in report["endpoints"].items()]
+    for name, current, previous in rows:
+        cells = []
+        for key in ("rps", "p50_ms", "p99_ms"):
+            before, after = previous.get(key), current[key]
+            change = f" ({(after - before) / before * 100:+.0f}%)" if before else ""
+            cells.append(f"{before if before is not None else '-'} -> {after}{change}")
+        print(f"{name:<16} {cells[0]:>24} {cells[1]:>24} {cells[2]:>24}", file=sys.stderr)
+
+
+async def run(args) -> dict:
+    weights = _parse_mix(args.mix)
+    server = None
+    base_url = args.url
+    if base_url is None:
+        env = {**os.environ, "DATABASE_URL": args.database_url}
+        env.pop("SYNC_DB_URL", None)
+        # Прогон меряет пропускную способность: лимит частоты на пользователя её бы скрыл
+        env.setdefault("RATE_LIMIT_ENABLED", "0")
+        # Один ключ на все воркеры сервера, иначе токен одного не примет другой
+        env.setdefault("SECRET_KEY", secrets.token_urlsafe(32))
+        prepare_database(args, env)
+        port = _free_port()
+        server = start_server(port, env, args.server_workers)
+        base_url = f"http://127.0.0.1:{port}"
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+            await wait_ready(client, server)
+            users = await prepare_users(client, args.clients)
+            latencies, errors, seconds = await drive(client, users, weights, args)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+    return build_report(latencies, errors, seconds, args)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Нагрузочный прогон Time Manager API")
+    parser.add_argument("--url", help="адрес уже запущенного сервера; без него сервер поднимается локально")
+    parser.add_argument("--database-url", default=os.getenv("LOADTEST_DATABASE_URL", DEFAULT_DATABASE_URL))
+    parser.add_argument("--reuse", action="store_true", help="не пересоздавать и не наполнять базу")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--tasks-per-user", type=int, default=20)
+    parser.add_argument("--entries-per-task", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--clients", type=int, default=50, help="сколько пользователей участвуют в прогоне")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=30, help="секунд замера")
+    parser.add_argument("--warmup", type=float, default=3, help="секунд прогрева, не входящих в замер")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--server-workers", type=int, default=1)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="веса сценариев: имя=вес через запятую")
+    parser.add_argument("--output", help="куда записать JSON-отчёт")
+    parser.add_argument("--compare", help="JSON-отчёт предыдущего прогона для сравнения")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run(args))
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            output.write(text + "\n")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as baseline:
+            print_comparison(report, json.load(baseline))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,69 @@
 # app/main.py
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from tasks import router as tasks_router
 from auth import router as auth_router
 from users import router as users_router
 from parser import router as parse_router
+from reports import router as reports_router
+from teams import router as teams_router
+from participants import router as participants_router
+from monitoring import router as monitoring_router
+from timers import router as timers_router
+from passwords import PasswordHasherBusy, hasher
+from deadlines import DEADLINE_SCHEDULER_ENABLED, deadline_scheduler
+from metrics import MetricsMiddleware
+from admission import AdmissionMiddleware
+from database import replica_set
+from entry_buffer import TimeEntryBufferFull, time_entry_buffer
 
 
-app = FastAPI(title="Time Manager API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if DEADLINE_SCHEDULER_ENABLED:
+        await deadline_scheduler.start()
+    await replica_set.start()
+    if time_entry_buffer.enabled:
+        await time_entry_buffer.start()
+    yield
+    # Буфер записей сбрасывается, пока соединения с базой ещё открыты
+    await time_entry_buffer.stop()
+    await replica_set.stop()
+    await deadline_scheduler.stop()
+    await hasher.shutdown()
+
+
+app = FastAPI(title="Time Manager API", lifespan=lifespan)
+# Допуск внутри метрик: отклонённые 429/503 тоже попадают в статистику
+app.add_middleware(AdmissionMiddleware)
+app.add_middleware(MetricsMiddleware)
+
+
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusy):
+    # Сбрасываем нагрузку вместо того, чтобы копить очередь на bcrypt
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Сервис перегружен, повторите попытку позже"},
+        headers={"Retry-After": "1"},
+    )
+
+
+@app.exception_handler(TimeEntryBufferFull)
+async def time_entry_buffer_full_handler(request: Request, exc: TimeEntryBufferFull):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Сервис перегружен, повторите попытку позже"},
+        headers={"Retry-After": "1"},
+    )
 
 app.include_router(auth_router, prefix="/auth", tags=["auth"])
 app.include_router(tasks_router, prefix="/tasks", tags=["tasks"])
+app.include_router(timers_router, prefix="/timers", tags=["timers"])
 app.include_router(users_router, prefix="/users", tags=["users"])
+app.include_router(reports_router, prefix="/reports", tags=["reports"])
+app.include_router(teams_router, prefix="/teams", tags=["teams"])
+app.include_router(participants_router, prefix="/participants", tags=["participants"])
 app.include_router(parse_router, prefix="/parse", tags=["parse"])
+app.include_router(monitoring_router, tags=["monitoring"])
@@ -0,0 +1,295 @@
+# app/metrics.py
+# Метрики процесса, которые собираются без внешних зависимостей
+# и отдаются в текстовом формате Prometheus (GET /metrics).
+# Пул соединений: счётчики из событий пула SQLAlchemy (connect, checkout,
+# checkin, invalidate), текущее состояние из самого пула и гистограмма
+# ожидания соединения. У пула нет события "перед checkout", поэтому
+# ожидание и таймауты меряет подкласс пула вокруг _do_get.
+# Запросы: ASGI-middleware пишет задержку по шаблону маршрута, а события
+# before/after_cursor_execute считают SQL-запросы и время в базе текущего запроса.
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import Pool
+
+logger = logging.getLogger(__name__)
+
+# Больше SQL-запросов на один HTTP-запрос — вероятный N+1, пишем предупреждение
+SQL_QUERY_BUDGET = int(os.getenv("SQL_QUERY_BUDGET", "20"))
+
+# Границы корзин в секундах (как у prometheus_client по умолчанию)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+
+class Histogram:
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def cumulative(self) -> Dict[str, int]:
+        # {"0.005": n, ..., "+Inf": count} — накопленные значения, как в Prometheus
+        result, total = {}, 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            result["+Inf" if bound == float("inf") else repr(bound)] = total
+        return result
+
+    def snapshot(self) -> dict:
+        return {"buckets": self.cumulative(), "sum": self.sum, "count": self.count}
+
+
+class PoolMetrics:
+    def __init__(self, name: str):
+        self.name = name
+        self.pool: Optional[Pool] = None
+        self.wait = Histogram(POOL_WAIT_BUCKETS)
+        self.timeouts = 0
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+
+    def attach(self, engine: Engine) -> None:
+        # Слушатели на Engine распространяются и на пулы, созданные после dispose()
+        event.listen(engine, "connect", self._on_connect)
+        event.listen(engine, "checkout", self._on_checkout)
+        event.listen(engine, "checkin", self._on_checkin)
+        event.listen(engine, "invalidate", self._on_invalidate)
+        self.pool = engine.pool
+
+    def _on_connect(self, dbapi_connection, connection_record) -> None:
+        self.connects += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy) -> None:
+        self.checkouts += 1
+
+    def _on_checkin(self, dbapi_connection, connection_record) -> None:
+        self.checkins += 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception) -> None:
+        self.invalidations += 1
+
+    def snapshot(self) -> dict:
+        state = {}
+        pool = self.pool
+        if pool is not None and hasattr(pool, "checkedout"):
+            state = {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+                "timeout": pool.timeout(),
+            }
+        return {
+            **state,
+            "connects": self.connects,
+            "checkouts": self.checkouts,
+            "checkins": self.checkins,
+            "invalidations": self.invalidations,
+            "checkout_timeouts": self.timeouts,
+            "checkout_wait_seconds": self.wait.snapshot(),
+        }
+
+
+def instrumented_pool(base: type, metrics: PoolMetrics) -> type:
+    # Отдельный подкласс на каждый движок: recreate() после dispose()
+    # создаёт пул того же класса, и метрики продолжают собираться
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = base._do_get(self)
+        except exc.TimeoutError:
+            metrics.timeouts += 1
+            metrics.wait.observe(time.perf_counter() - started)
+            raise
+        metrics.wait.observe(time.perf_counter() - started)
+        metrics.pool = self
+        return connection
+
+    return type(f"Instrumented{base.__name__}", (base,), {"_do_get": _do_get})
+
+
+pool_metrics = {"async": PoolMetrics("async"), "sync": PoolMetrics("sync")}
+
+
+@dataclass
+class RequestStats:
+    statements: int = 0
+    db_time: float = 0.0
+
+
+class RouteStats:
+    def __init__(self):
+        self.latency = Histogram()
+        self.statements = Histogram(STATEMENT_BUCKETS)
+        self.db_time = 0.0
+        self.statuses: Dict[int, int] = {}
+
+
+# Статистика текущего HTTP-запроса; SQLAlchemy передаёт контекст в greenlet и потоки
+_current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+class RequestMetrics:
+    def __init__(self, query_budget: int):
+        self.query_budget = query_budget
+        self.routes: Dict[Tuple[str, str], RouteStats] = {}
+        self.over_budget = 0
+        self._lock = threading.Lock()
+
+    def attach(self, engine: Engine) -> None:
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+
+    @staticmethod
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @staticmethod
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        started = conn.info["query_started"].pop()
+        stats = _current_request.get()
+        if stats is not None:
+            stats.statements += 1
+            stats.db_time += time.perf_counter() - started
+
+    def route(self, method: str, route: str) -> RouteStats:
+        key = (method, route)
+        stats = self.routes.get(key)
+        if stats is None:
+            with self._lock:
+                stats = self.routes.setdefault(key, RouteStats())
+        return stats
+
+    def record(self, method: str, route: str, status: int, elapsed: float, request: RequestStats) -> None:
+        stats = self.route(method, route)
+        stats.latency.observe(elapsed)
+        stats.statements.observe(request.statements)
+        with self._lock:
+            stats.db_time += request.db_time
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+        if request.statements > self.query_budget:
+            self.over_budget += 1
+            logger.warning(
+                "Вероятный N+1: %s %s выполнил %s SQL-запросов (бюджет %s), %.1f мс в базе из %.1f мс",
+                method, route, request.statements, self.query_budget, request.db_time * 1000, elapsed * 1000,
+            )
+
+
+request_metrics = RequestMetrics(SQL_QUERY_BUDGET)
+
+
+class MetricsMiddleware:
+    # Чистое ASGI-middleware: время считается до конца отправки тела,
+    # поэтому потоковые ответы (выгрузка) учитываются целиком
+    def __init__(self, app, metrics: RequestMetrics = request_metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats()
+        token = _current_request.set(stats)
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_request.reset(token)
+            # Шаблон маршрута (/tasks/{task_id}), а не фактический путь — иначе метки не ограничены
+            route = scope.get("route")
+            template = getattr(route, "path", None) or "<unmatched>"
+            self.metrics.record(scope["method"], template, status, time.perf_counter() - started, stats)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _histogram_lines(name: str, histogram: Histogram, **labels) -> List[str]:
+    lines = [f"{name}_bucket{_labels(**labels, le=bound)} {count}" for bound, count in histogram.cumulative().items()]
+    lines.append(f"{name}_sum{_labels(**labels)} {histogram.sum}")
+    lines.append(f"{name}_count{_labels(**labels)} {histogram.count}")
+    return lines
+
+
+def render_prometheus() -> str:
+    lines = [
+        "# HELP http_request_duration_seconds Время обработки запроса по шаблону маршрута",
+        "# TYPE http_request_duration_seconds histogram",
+    ]
+    routes = sorted(request_metrics.routes.items())
+    for (method, route), stats in routes:
+        lines += _histogram_lines("http_request_duration_seconds", stats.latency, method=method, route=route)
+    lines += ["# HELP http_requests_total Число запросов по маршруту и коду ответа", "# TYPE http_requests_total counter"]
+    for (method, route), stats in routes:
+        for status, count in sorted(stats.statuses.items()):
+            lines.append(f"http_requests_total{_labels(method=method, route=route, status=status)} {count}")
+    lines += ["# HELP http_request_db_statements SQL-запросов на один HTTP-запрос", "# TYPE http_request_db_statements histogram"]
+    for (method, route), stats in routes:
+        lines += _histogram_lines("http_request_db_statements", stats.statements, method=method, route=route)
+    lines += ["# HELP http_request_db_seconds_total Время в базе по маршруту", "# TYPE http_request_db_seconds_total counter"]
+    for (method, route), stats in routes:
+        lines.append(f"http_request_db_seconds_total{_labels(method=method, route=route)} {stats.db_time}")
+    lines += [
+        "# HELP http_requests_over_query_budget_total Запросы сверх SQL_QUERY_BUDGET",
+        "# TYPE http_requests_over_query_budget_total counter",
+        f"http_requests_over_query_budget_total {request_metrics.over_budget}",
+    ]
+
+    pools = [(name, metrics, metrics.snapshot()) for name, metrics in sorted(pool_metrics.items())]
+    for key, kind, help_text in (
+        ("checked_out", "gauge", "Выданные соединения"),
+        ("overflow", "gauge", "Соединения сверх pool_size"),
+        ("size", "gauge", "Размер пула"),
+    ):
+        lines += [f"# HELP db_pool_{key} {help_text}", f"# TYPE db_pool_{key} {kind}"]
+        lines += [f"db_pool_{key}{_labels(pool=name)} {snap[key]}" for name, _, snap in pools if key in snap]
+    for key, help_text in (
+        ("checkouts", "Выдачи соединений из пула"),
+        ("connects", "Новые соединения с базой"),
+        ("invalidations", "Инвалидированные соединения"),
+        ("checkout_timeouts", "Таймауты ожидания соединения"),
+    ):
+        lines += [f"# HELP db_pool_{key}_total {help_text}", f"# TYPE db_pool_{key}_total counter"]
+        lines += [f"db_pool_{key}_total{_labels(pool=name)} {snap[key]}" for name, _, snap in pools]
+    lines += ["# HELP db_pool_checkout_wait_seconds Ожидание соединения из пула", "# TYPE db_pool_checkout_wait_seconds histogram"]
+    for name, metrics, _ in pools:
+        lines += _histogram_lines("db_pool_checkout_wait_seconds", metrics.wait, pool=name)
+    return "\n".join(lines) + "\n"
@@ -1,6 +1,8 @@
+import os
 from typing import Optional, List
+from sqlalchemy import DDL, Index, event
 from sqlmodel import SQLModel, Field, Relationship
-from datetime import datetime
+from datetime import date, datetime
 
 
 class User(SQLModel, table=True):
@@ -9,24 +11,85 @@ class User(SQLModel, table=True):
     email: str = Field(index=True, nullable=False)
     hashed_password: str
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    # Увеличивается при любом изменении задач пользователя; основа ETag списка задач
+    tasks_version: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
 
     tasks: List["Task"] = Relationship(back_populates="owner")
 
 
 class Task(SQLModel, table=True):
+    # Индексы под keyset-пагинацию списка задач пользователя и выборку по сроку
+    __table_args__ = (
+        Index("ix_task_user_id_id", "user_id", "id"),
+        Index("ix_task_user_id_priority_deadline_id", "user_id", "priority", "deadline", "id"),
+        Index("ix_task_user_id_deadline", "user_id", "deadline"),
+        Index("ix_task_updated_at", "updated_at"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     title: str
     description: Optional[str] = None
     deadline: Optional[datetime] = None
     priority: int = Field(default=1)
     user_id: Optional[int] = Field(default=None, foreign_key="user.id")
+    # Время последнего изменения; по нему планировщик сроков видит изменения других воркеров.
+    # У строк, созданных до миграции 0006 и загруженных seed.py, пусто
+    updated_at: Optional[datetime] = Field(
+        default_factory=datetime.utcnow, sa_column_kwargs={"onupdate": datetime.utcnow}
+    )
 
     owner: Optional[User] = Relationship(back_populates="tasks")
     time_entries: List["TimeEntry"] = Relationship(back_populates="task")
     tags: List["TaskTag"] = Relationship(back_populates="task")
 
 
+# Полнотекстовый поиск (search.py). DDL привязан к таблице здесь, а не в search.py:
+# create_all создаёт task_fts/search_vector, даже если search.py ещё не импортирован
+TASK_SEARCH_CONFIG = os.getenv("TASK_SEARCH_CONFIG", "simple")
+
+TASK_SEARCH_POSTGRES_DDL = [
+    f"""ALTER TABLE task ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        to_tsvector('{TASK_SEARCH_CONFIG}'::regconfig, coalesce(title, '') || ' ' || coalesce(description, ''))
+    ) STORED""",
+    "CREATE INDEX IF NOT EXISTS ix_task_search_vector ON task USING gin (search_vector)",
+]
+
+TASK_SEARCH_SQLITE_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS task_fts
+    USING fts5(title, description, content='task', content_rowid='id')""",
+    """CREATE TRIGGER IF NOT EXISTS task_fts_ai AFTER INSERT ON task BEGIN
+        INSERT INTO task_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS task_fts_ad AFTER DELETE ON task BEGIN
+        INSERT INTO task_fts(task_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS task_fts_au AFTER UPDATE OF title, description ON task BEGIN
+        INSERT INTO task_fts(task_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO task_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+]
+
+for statement in TASK_SEARCH_POSTGRES_DDL:
+    event.listen(Task.__table__, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+for statement in TASK_SEARCH_SQLITE_DDL:
+    event.listen(Task.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+# Триггеры уходят вместе с task, а внешняя FTS5-таблица осталась бы с чужими rowid
+event.listen(Task.__table__, "after_drop", DDL("DROP TABLE IF EXISTS task_fts").execute_if(dialect="sqlite"))
+
+
 class TimeEntry(SQLModel, table=True):
+    # (task_id, id) обслуживает selectinload записей задачи и выгрузку в порядке id;
+    # в PostgreSQL индекс покрывающий, данные записи читаются без обращения к таблице
+    __table_args__ = (
+        Index(
+            "ix_timeentry_task_id_id", "task_id", "id", postgresql_include=["duration", "created_at"]
+        ),
+        Index("ix_timeentry_created_at", "created_at"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     duration: int
     created_at: datetime = Field(default_factory=datetime.utcnow)
@@ -35,6 +98,19 @@ class TimeEntry(SQLModel, table=True):
     task: Optional[Task] = Relationship(back_populates="time_entries")
 
 
+class TimeRollup(SQLModel, table=True):
+    # Инкрементальные суммы TimeEntry.duration по (пользователь, задача, день).
+    # Отчёты читают эти строки, а не сырые записи учёта времени.
+    # Первичный ключ (user_id, day, task_id) покрывает отчёты; task_id — для удаления задачи
+    __table_args__ = (Index("ix_timerollup_task_id", "task_id"),)
+
+    user_id: int = Field(foreign_key="user.id", primary_key=True)
+    day: date = Field(primary_key=True)
+    task_id: int = Field(foreign_key="task.id", primary_key=True)
+    total_minutes: int = Field(default=0)
+    entry_count: int = Field(default=0)
+
+
 class Tag(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str = Field(unique=True)
@@ -43,6 +119,9 @@ class Tag(SQLModel, table=True):
 
 
 class TaskTag(SQLModel, table=True):
+    # Первичный ключ (task_id, tag_id) покрывает поиск по задаче; обратный путь — по метке
+    __table_args__ = (Index("ix_tasktag_tag_id", "tag_id"),)
+
     task_id: Optional[int] = Field(default=None, foreign_key="task.id", primary_key=True)
     tag_id: Optional[int] = Field(default=None, foreign_key="tag.id", primary_key=True)
     note: Optional[str] = None
@@ -67,5 +146,18 @@ class Participant(SQLModel, table=True):
     skill: str
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
-    team_id: Optional[int] = Field(default=None, foreign_key="team.id")
-    team: Optional[Team] = Relationship(back_populates="participants")
\ No newline at end of file
+    team_id: Optional[int] = Field(default=None, foreign_key="team.id", index=True)
+    team: Optional[Team] = Relationship(back_populates="participants")
+
+
+class IdempotencyKey(SQLModel, table=True):
+    # Сохранённые ответы на запросы с заголовком Idempotency-Key.
+    # status_code IS NULL — первый запрос с этим ключом ещё выполняется
+    __table_args__ = (Index("ix_idempotencykey_created_at", "created_at"),)
+
+    scope: str = Field(primary_key=True, max_length=64)
+    key: str = Field(primary_key=True, max_length=255)
+    request_hash: str = Field(max_length=64)
+    status_code: Optional[int] = None
+    response_body: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
@@ -0,0 +1,37 @@
+# app/routers/monitoring.py
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from admission import admission
+from database import replica_set
+from entry_buffer import time_entry_buffer
+from metrics import pool_metrics, render_prometheus
+
+router = APIRouter()
+
+
+# Задержки по маршрутам, SQL на запрос и пулы соединений в формате Prometheus
+@router.get("/metrics", response_class=PlainTextResponse)
+async def read_metrics():
+    text = render_prometheus() + "\n".join(admission.prometheus_lines()) + "\n"
+    return PlainTextResponse(text, media_type="text/plain; version=0.0.4")
+
+# Состояние пулов соединений: занятые соединения, overflow, ожидание и таймауты checkout
+@router.get("/metrics/pool")
+async def read_pool_metrics():
+    return {name: metrics.snapshot() for name, metrics in pool_metrics.items()}
+
+# Лимиты допуска: отклонённые по частоте запросы и загрузка лимита одновременности
+@router.get("/metrics/admission")
+async def read_admission_metrics():
+    return admission.snapshot()
+
+# Реплики для чтения: живые реплики и распределение чтений
+@router.get("/metrics/replicas")
+async def read_replica_metrics():
+    return replica_set.snapshot()
+
+# Буфер отложенной записи времени: очередь, сбросы, отказы
+@router.get("/metrics/time_entries")
+async def read_time_entry_buffer_metrics():
+    return time_entry_buffer.snapshot()
@@ -0,0 +1,91 @@
+# app/pagination.py
+import base64
+import json
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# Ключи сортировки для курсорной (keyset) пагинации.
+# Последним всегда идёт id, чтобы ключ был уникальным.
+TASK_SORT_KEYS: Dict[str, Tuple[str, ...]] = {
+    "id": ("id",),
+    "priority": ("priority", "deadline", "id"),
+}
+USER_SORT_KEYS: Tuple[str, ...] = ("id",)
+# Задачи с приближающимся сроком: по deadline, затем id
+DUE_SORT_KEYS: Tuple[str, ...] = ("deadline", "id")
+# Поиск: релевантность и id строки (score, Task)
+SEARCH_SORT_KEYS: Tuple[str, ...] = ("score", "id")
+
+
+# Столбцы id и priority — INTEGER; значение вне диапазона база отвергла бы с 500
+INT_MIN, INT_MAX = -2**31, 2**31 - 1
+
+
+def _int(value: Any) -> int:
+    # bool — подкласс int, но в курсоре это подделка
+    if isinstance(value, bool) or not isinstance(value, int) or not INT_MIN <= value <= INT_MAX:
+        raise ValueError("Некорректный курсор")
+    return value
+
+
+def _datetime(value: Any) -> Optional[datetime]:
+    # Срок может быть пустым: при сортировке по приоритету такие задачи идут последними
+    if value is None:
+        return None
+    if not isinstance(value, datetime):
+        raise ValueError("Некорректный курсор")
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _float(value: Any) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError("Некорректный курсор")
+    return float(value)
+
+
+# Ожидаемый тип значения курсора для каждого ключа сортировки
+KEY_TYPES: Dict[str, Callable[[Any], Any]] = {
+    "id": _int,
+    "priority": _int,
+    "deadline": _datetime,
+    "score": _float,
+}
+
+
+def _dump(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    return value
+
+
+def _load(value: Any) -> Any:
+    if isinstance(value, dict):
+        return datetime.fromisoformat(value["dt"])
+    return value
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw = json.dumps([_dump(value) for value in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, keys: Sequence[str]) -> List[Any]:
+    """Разбирает курсор; ValueError, если он повреждён, от другой сортировки или типы не те."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(keys):
+            raise ValueError("Некорректный курсор")
+        return [KEY_TYPES[key](_load(value)) for key, value in zip(keys, values)]
+    except (ValueError, TypeError, KeyError) as e:
+        raise ValueError("Некорректный курсор") from e
+
+
+def next_cursor(items: Sequence[Any], limit: int, keys: Sequence[str]) -> Optional[str]:
+    # Полная страница означает, что дальше могут быть ещё строки
+    if not items or len(items) < limit:
+        return None
+    last = items[-1]
+    return encode_cursor([getattr(last, key) for key in keys])
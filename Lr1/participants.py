@@ -0,0 +1,41 @@
+# app/routers/participants.py
+from fastapi import APIRouter, Body, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Dict, List
+import schemas, crud, models
+from database import get_async_session, get_read_session
+from auth import get_current_user
+from bulk import split_valid
+
+router = APIRouter()
+
+@router.get("/", response_model=List[schemas.ParticipantOut])
+async def read_participants(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_session),
+):
+    return await crud.get_participants(db, skip=skip, limit=limit)
+
+@router.post("/", response_model=schemas.ParticipantOut)
+async def create_participant(
+    participant: schemas.ParticipantCreate,
+    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session),
+):
+    if await crud.get_participant_by_nickname(db, participant.nickname):
+        raise HTTPException(status_code=400, detail="Участник с таким никнеймом уже существует")
+    return await crud.create_participant(db, participant)
+
+# Загрузка таблицы участников одним запросом: команды создаются по имени,
+# участники создаются или обновляются по nickname, всё в одной транзакции
+@router.post("/bulk", response_model=schemas.ParticipantBulkOut)
+async def upsert_participants_bulk(
+    items: List[Dict[str, Any]] = Body(...),
+    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session),
+):
+    participants, _, errors = split_valid(items, schemas.ParticipantCreate)
+    teams, participant_ids = await crud.upsert_participants_bulk(db, participants)
+    return {"teams": teams, "participants": participant_ids, "errors": errors}
@@ -0,0 +1,65 @@
+# app/passwords.py
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from passlib.context import CryptContext
+
+# Стоимость bcrypt. При её изменении старые хэши пересчитываются при следующем входе
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# bcrypt отпускает GIL, поэтому потоков достаточно; их число ограничивает нагрузку на CPU
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Сколько операций может ждать в очереди, прежде чем запросы начнут получать 503
+PASSWORD_HASH_QUEUE_LIMIT = int(os.getenv("PASSWORD_HASH_QUEUE_LIMIT", "64"))
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=BCRYPT_ROUNDS,
+    bcrypt__min_desired_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_desired_rounds=BCRYPT_ROUNDS,
+)
+
+
+class PasswordHasherBusy(Exception):
+    """Очередь хэширования переполнена; main.py превращает это в 503."""
+
+
+class PasswordHasher:
+    # Отдельный ограниченный пул для bcrypt: всплеск логинов не занимает
+    # общий threadpool и не блокирует event loop остальных эндпоинтов
+    def __init__(self, workers: int, queue_limit: int):
+        self.workers = workers
+        # Пул создаётся при первой операции: после shutdown() следующий lifespan получает новый
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.queue_limit = queue_limit
+        self.pending = 0
+
+    async def _run(self, func, *args):
+        # Счётчик меняется только из event loop, блокировка не нужна
+        if self.pending >= self.queue_limit:
+            raise PasswordHasherBusy()
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(pwd_context.hash, password)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        # Второй элемент — новый хэш, если сохранённый посчитан с другой стоимостью
+        return await self._run(pwd_context.verify_and_update, password, hashed_password)
+
+    async def shutdown(self) -> None:
+        # Начатые и ждущие в очереди хэши досчитываются: их запросы ещё ждут ответа
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            await asyncio.get_running_loop().run_in_executor(None, executor.shutdown)
+
+
+hasher = PasswordHasher(PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE_LIMIT)
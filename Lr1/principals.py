@@ -0,0 +1,39 @@
+# app/principals.py
+import os
+from typing import Optional
+
+from cachetools import TTLCache
+
+import models
+
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+PRINCIPAL_CACHE_TTL = int(os.getenv("PRINCIPAL_CACHE_TTL", "300"))
+
+
+class PrincipalCache:
+    # LRU-кэш пользователей по id с ограниченным временем жизни записи.
+    # Объекты отсоединены от сессий и используются только для чтения.
+    def __init__(self, maxsize: int, ttl: int):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int) -> Optional[models.User]:
+        user = self._cache.get(user_id)
+        if user is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return user
+
+    def put(self, user: models.User) -> None:
+        self._cache[user.id] = user
+
+    def invalidate(self, user_id: int) -> None:
+        self._cache.pop(user_id, None)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+
+principal_cache = PrincipalCache(PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL)
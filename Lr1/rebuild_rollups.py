@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+# Пересчёт таблицы time_rollup по сырым записям учёта времени (бэкфилл).
+# Вся таблица перестраивается в одной транзакции одним INSERT ... SELECT.
+import time
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+from database import SessionLocal
+import models
+
+
+def rebuild_rollups(session: Session) -> int:
+    day = func.date(models.TimeEntry.created_at)
+    aggregated = (
+        select(
+            models.Task.user_id,
+            day,
+            models.TimeEntry.task_id,
+            func.sum(models.TimeEntry.duration),
+            func.count(),
+        )
+        .join(models.Task, models.Task.id == models.TimeEntry.task_id)
+        .where(models.Task.user_id.is_not(None))
+        .group_by(models.Task.user_id, day, models.TimeEntry.task_id)
+    )
+    session.execute(delete(models.TimeRollup))
+    session.execute(
+        insert(models.TimeRollup).from_select(
+            ["user_id", "day", "task_id", "total_minutes", "entry_count"], aggregated
+        )
+    )
+    session.commit()
+    return session.scalar(select(func.count()).select_from(models.TimeRollup))
+
+
+def main():
+    session = SessionLocal()
+    try:
+        start_time = time.time()
+        buckets = rebuild_rollups(session)
+        print(f"Пересчитано групп: {buckets} за {time.time() - start_time:.2f} секунд.")
+    except Exception as e:
+        session.rollback()
+        print("Ошибка:", e)
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+# app/routers/reports.py
+from datetime import date
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+import schemas, crud, models
+from database import get_read_session
+from auth import get_current_user
+
+router = APIRouter()
+
+@router.get("/total", response_model=schemas.ReportTotals)
+async def report_total(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_session),
+):
+    row = await crud.report_total(db, current_user.id, date_from, date_to)
+    return {"total_minutes": row.total_minutes or 0, "entry_count": row.entry_count or 0}
+
+@router.get("/tasks", response_model=List[schemas.TaskReportRow])
+async def report_by_task(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_session),
+):
+    return await crud.report_by_task(db, current_user.id, date_from, date_to)
+
+@router.get("/days", response_model=List[schemas.DayReportRow])
+async def report_by_day(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_session),
+):
+    return await crud.report_by_day(db, current_user.id, date_from, date_to)
+
+@router.get("/tags", response_model=List[schemas.TagReportRow])
+async def report_by_tag(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_session),
+):
+    return await crud.report_by_tag(db, current_user.id, date_from, date_to)
@@ -1,6 +1,6 @@
 # app/schemas.py
-from datetime import datetime
-from typing import List, Optional
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
 from pydantic import BaseModel, EmailStr
 
 # Схемы для пользователей
@@ -22,6 +22,10 @@ class UserPasswordChange(BaseModel):
     old_password: str
     new_password: str
 
+class Token(BaseModel):
+    access_token: str
+    token_type: str
+
 # Схемы для меток
 class TagBase(BaseModel):
     name: str
@@ -47,6 +51,13 @@ class TaskTagOut(BaseModel):
     class Config:
         orm_mode = True
 
+class TaskTagLinkCreate(TaskTagBase):
+    task_id: int
+
+class TaskTagLinkOut(TaskTagLinkCreate):
+    class Config:
+        orm_mode = True
+
 # Схемы для задач
 class TaskBase(BaseModel):
     title: str
@@ -57,6 +68,13 @@ class TaskBase(BaseModel):
 class TaskCreate(TaskBase):
     pass
 
+class TaskShortOut(TaskBase):
+    id: int
+    user_id: Optional[int] = None
+
+    class Config:
+        orm_mode = True
+
 class TaskOut(TaskBase):
     id: int
     owner: UserOut
@@ -80,5 +98,101 @@ class TimeEntryOut(TimeEntryBase):
     class Config:
         orm_mode = True
 
+class TimerOut(BaseModel):
+    task_id: int
+    started_at: datetime
+    elapsed_seconds: int
+
+# Схемы для отчётов по учёту времени
+class ReportTotals(BaseModel):
+    total_minutes: int = 0
+    entry_count: int = 0
+
+class TaskReportRow(ReportTotals):
+    task_id: int
+
+    class Config:
+        orm_mode = True
+
+class DayReportRow(ReportTotals):
+    day: date
+
+    class Config:
+        orm_mode = True
+
+class TagReportRow(ReportTotals):
+    tag_id: int
+    name: str
+
+    class Config:
+        orm_mode = True
+
+# Схемы для команд и участников
+class TeamBase(BaseModel):
+    name: str
+
+class TeamCreate(TeamBase):
+    pass
+
+class TeamOut(TeamBase):
+    id: int
+
+    class Config:
+        orm_mode = True
+
+class ParticipantBase(BaseModel):
+    full_name: str
+    nickname: str
+    email: str
+    phone: str
+    skill: str
+
+class ParticipantCreate(ParticipantBase):
+    # Команда указывается по имени и создаётся, если её ещё нет
+    team_name: Optional[str] = None
+
+class ParticipantOut(ParticipantBase):
+    id: int
+    created_at: datetime
+    team_id: Optional[int] = None
+
+    class Config:
+        orm_mode = True
+
+# Отчёт об импорте записей учёта времени
+class ImportRowError(BaseModel):
+    line: int
+    detail: str
+
+class ImportReport(BaseModel):
+    imported: int
+    rejected: int
+    seconds: float
+    rows_per_second: float
+    errors: List[ImportRowError] = []
+
+# Схемы для пакетных операций
+class BulkItemError(BaseModel):
+    index: int
+    detail: Any
+
+class TaskBulkOut(BaseModel):
+    created: List[TaskShortOut] = []
+    errors: List[BulkItemError] = []
+
+class TimeEntryBulkOut(BaseModel):
+    created: List[TimeEntryOut] = []
+    errors: List[BulkItemError] = []
+
+class TaskTagBulkOut(BaseModel):
+    created: List[TaskTagLinkOut] = []
+    errors: List[BulkItemError] = []
+
+class ParticipantBulkOut(BaseModel):
+    # Соответствие имён и никнеймов их id после загрузки
+    teams: Dict[str, int] = {}
+    participants: Dict[str, int] = {}
+    errors: List[BulkItemError] = []
+
 # Для вложенности взаимных ссылок
 TaskOut.update_forward_refs()
@@ -0,0 +1,44 @@
+# app/search.py
+# Полнотекстовый поиск по title/description задач.
+# PostgreSQL: сгенерированная колонка task.search_vector (tsvector) с GIN-индексом,
+# её пересчитывает сама СУБД при любом INSERT/UPDATE, включая пакетные.
+# SQLite (тесты): внешняя FTS5-таблица task_fts, которую поддерживают триггеры.
+# DDL для обеих СУБД привязан к таблице task в models.py.
+from typing import Optional, Tuple
+
+from sqlalchemy import and_, column, func, literal_column, or_, select, table
+from sqlalchemy.sql.elements import ColumnElement
+
+import models
+from models import TASK_SEARCH_CONFIG
+
+task_fts = table("task_fts", column("rowid"))
+
+
+def _fts5_query(q: str) -> str:
+    # Каждое слово в кавычках: пользовательский ввод не трактуется как синтаксис FTS5
+    return " ".join('"' + word.replace('"', '""') + '"' for word in q.split())
+
+
+def search_query(dialect_name: str, user_id: int, q: str, after: Optional[Tuple[float, int]] = None):
+    """SELECT (Task, score) по релевантности (score по убыванию, затем id)."""
+    Task = models.Task
+    if dialect_name == "postgresql":
+        tsquery = func.websearch_to_tsquery(literal_column(f"'{TASK_SEARCH_CONFIG}'::regconfig"), q)
+        vector = literal_column("task.search_vector")
+        score: ColumnElement = func.ts_rank(vector, tsquery).label("score")
+        query = select(Task, score).where(vector.op("@@")(tsquery))
+    else:
+        fts = literal_column("task_fts")
+        # bm25 тем меньше, чем релевантнее; меняем знак, чтобы порядок совпадал с PostgreSQL
+        score = (-func.bm25(fts)).label("score")
+        query = (
+            select(Task, score)
+            .join(task_fts, task_fts.c.rowid == Task.id)
+            .where(fts.op("MATCH")(_fts5_query(q)))
+        )
+    query = query.where(Task.user_id == user_id)
+    if after is not None:
+        last_score, last_id = after
+        query = query.where(or_(score < last_score, and_(score == last_score, Task.id > last_id)))
+    return query.order_by(score.desc(), Task.id)
@@ -1,112 +1,229 @@
 #!/usr/bin/env python
+# Генератор синтетических данных для нагрузочного тестирования.
+#
+#   python seed.py --users 100000 --tasks-per-user 50 --entries-per-task 20 --seed 42 --workers 8
+#
+# Пароль хэшируется один раз и общий у всех пользователей. Идентификаторы
+# назначаются заранее от текущего max(id), поэтому процессы пишут свои
+# диапазоны пользователей независимо, без RETURNING и блокировок. Строки
+# копятся пачками и загружаются через COPY (PostgreSQL) или executemany (SQLite).
+# Данные пользователя зависят только от --seed и его номера, а не от числа процессов.
+import argparse
+import csv
+import io
+import os
 import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
-from database import SessionLocal
+from typing import Dict, List, Sequence, Tuple
+
+from sqlalchemy import Table, func, insert, select, text
+from sqlalchemy.engine import Connection
+
+import crud
 import models
-from passlib.context import CryptContext
-
-# Инициализируем контекст для хэширования паролей
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-def seed_users(session: Session):
-    users_data = [
-        {"username": "alice", "email": "alice@example.com", "password": "password"},
-        {"username": "bob", "email": "bob@example.com", "password": "password"},
-        {"username": "charlie", "email": "charlie@example.com", "password": "password"},
-    ]
-    users = []
-    for user_data in users_data:
-        hashed = pwd_context.hash(user_data["password"])
-        user = models.User(
-            username=user_data["username"],
-            email=user_data["email"],
-            hashed_password=hashed
-        )
-        session.add(user)
-        session.commit()
-        session.refresh(user)
-        users.append(user)
-        print(f"Создан пользователь: {user.username}")
-    return users
-
-def seed_tags(session: Session):
-    tag_names = ["urgent", "work", "personal", "home", "exercise"]
-    tags = []
-    for name in tag_names:
-        tag = models.Tag(name=name)
-        session.add(tag)
-        session.commit()
-        session.refresh(tag)
-        tags.append(tag)
-        print(f"Создана метка: {tag.name}")
-    return tags
-
-def seed_tasks(session: Session, users):
-    tasks = []
-    for user in users:
-        # Для каждого пользователя создаём 3 задачи
-        for i in range(3):
-            task = models.Task(
-                title=f"Task {i+1} для {user.username}",
-                description=f"Описание задачи {i+1} для пользователя {user.username}",
-                deadline=datetime.utcnow() + timedelta(days=random.randint(1, 10)),
-                priority=random.randint(1, 5),
-                user_id=user.id
-            )
-            session.add(task)
-            session.commit()
-            session.refresh(task)
-            tasks.append(task)
-            print(f"Создана задача: {task.title} для пользователя {user.username}")
-    return tasks
-
-def seed_time_entries(session: Session, tasks):
-    for task in tasks:
-        # Для каждой задачи создаём от 1 до 3 записей учёта времени
-        num_entries = random.randint(1, 3)
-        for _ in range(num_entries):
-            duration = random.randint(15, 120)
-            time_entry = models.TimeEntry(
-                task_id=task.id,
-                duration=duration,
-                created_at=datetime.utcnow() - timedelta(days=random.randint(0, 5))
+from database import engine
+from passwords import pwd_context
+
+TAG_NAMES = ["urgent", "work", "personal", "home", "exercise"]
+SEED_BATCH_SIZE = int(os.getenv("SEED_BATCH_SIZE", "50000"))
+
+USER_COLUMNS = ("id", "username", "email", "hashed_password", "created_at")
+TASK_COLUMNS = ("id", "title", "description", "deadline", "priority", "user_id")
+ENTRY_COLUMNS = ("id", "duration", "created_at", "task_id")
+TASK_TAG_COLUMNS = ("task_id", "tag_id", "note")
+ROLLUP_COLUMNS = ("user_id", "day", "task_id", "total_minutes", "entry_count")
+
+# Порядок загрузки соответствует внешним ключам
+TABLES: List[Tuple[Table, Sequence[str]]] = [
+    (models.User.__table__, USER_COLUMNS),
+    (models.Task.__table__, TASK_COLUMNS),
+    (models.TimeEntry.__table__, ENTRY_COLUMNS),
+    (models.TaskTag.__table__, TASK_TAG_COLUMNS),
+    (models.TimeRollup.__table__, ROLLUP_COLUMNS),
+]
+
+
+@dataclass
+class SeedPlan:
+    users: int
+    tasks_per_user: int
+    entries_per_task: int
+    seed: int
+    base_user_id: int
+    base_task_id: int
+    base_entry_id: int
+    tag_ids: List[int]
+    hashed_password: str
+    now: datetime
+    batch_size: int
+
+
+def _copy(connection: Connection, table: Table, columns: Sequence[str], rows: List[tuple]) -> None:
+    # COPY ... FROM STDIN через psycopg2; None записывается пустым полем и становится NULL
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    raw = connection.connection.driver_connection
+    with raw.cursor() as cursor:
+        cursor.copy_expert(f'COPY "{table.name}" ({", ".join(columns)}) FROM STDIN WITH (FORMAT csv)', buffer)
+
+
+def _write(connection: Connection, batches: Dict[str, List[tuple]]) -> int:
+    written = 0
+    for table, columns in TABLES:
+        rows = batches[table.name]
+        if not rows:
+            continue
+        if connection.dialect.name == "postgresql":
+            _copy(connection, table, columns, rows)
+        else:
+            connection.execute(insert(table), [dict(zip(columns, row)) for row in rows])
+        written += len(rows)
+        rows.clear()
+    connection.commit()
+    return written
+
+
+def _user_rows(plan: SeedPlan, index: int, batches: Dict[str, List[tuple]]) -> None:
+    # Все строки одного пользователя: сам пользователь, задачи, записи времени, метки и сводки
+    rng = random.Random(f"{plan.seed}:{index}")
+    user_id = plan.base_user_id + index + 1
+    created_at = plan.now - timedelta(days=rng.randint(30, 365))
+    batches["user"].append(
+        (user_id, f"user{user_id}", f"user{user_id}@example.com", plan.hashed_password, created_at)
+    )
+    entries = []
+    for t in range(plan.tasks_per_user):
+        task_number = index * plan.tasks_per_user + t
+        task_id = plan.base_task_id + task_number + 1
+        deadline = plan.now + timedelta(hours=rng.randint(-240, 720)) if rng.random() < 0.8 else None
+        batches["task"].append(
+            (
+                task_id,
+                f"Task {t + 1} для user{user_id}",
+                f"Описание задачи {t + 1} для пользователя user{user_id}",
+                deadline,
+                rng.randint(1, 5),
+                user_id,
             )
-            session.add(time_entry)
-        session.commit()
-        print(f"Добавлено {num_entries} записей учёта времени для задачи {task.title}")
-
-def seed_task_tags(session: Session, tasks, tags):
-    # Для каждой задачи случайным образом выбираем от 1 до 3 меток
-    for task in tasks:
-        num_tags = random.randint(1, 3)
-        chosen_tags = random.sample(tags, num_tags)
-        for tag in chosen_tags:
-            note = f"Комментарий для метки {tag.name} задачи {task.title}"
-            task_tag = models.TaskTag(
-                task_id=task.id,
-                tag_id=tag.id,
-                note=note
+        )
+        for e in range(plan.entries_per_task):
+            entry_id = plan.base_entry_id + task_number * plan.entries_per_task + e + 1
+            duration = rng.randint(15, 120)
+            entry_created_at = plan.now - timedelta(minutes=rng.randint(0, 60 * 24 * 90))
+            batches["timeentry"].append((entry_id, duration, entry_created_at, task_id))
+            entries.append((task_id, entry_created_at, duration))
+        for tag_id in rng.sample(plan.tag_ids, rng.randint(0, min(3, len(plan.tag_ids)))):
+            batches["tasktag"].append((task_id, tag_id, None))
+    # Сводки считаются той же функцией, что и при записи через API
+    for row in crud.rollup_rows(user_id, entries):
+        batches["timerollup"].append(tuple(row[column] for column in ROLLUP_COLUMNS))
+
+
+def seed_range(plan: SeedPlan, start: int, stop: int) -> int:
+    """Генерирует и загружает пользователей с номерами [start, stop); возвращает число строк."""
+    batches: Dict[str, List[tuple]] = {table.name: [] for table, _ in TABLES}
+    total = 0
+    with engine.connect() as connection:
+        for index in range(start, stop):
+            _user_rows(plan, index, batches)
+            if sum(map(len, batches.values())) >= plan.batch_size:
+                total += _write(connection, batches)
+        total += _write(connection, batches)
+    return total
+
+
+def _init_worker() -> None:
+    # Соединения родительского процесса после fork не используются
+    engine.dispose(close=False)
+
+
+def _ensure_tags(connection: Connection) -> List[int]:
+    Tag = models.Tag
+    existing = set(connection.scalars(select(Tag.name).where(Tag.name.in_(TAG_NAMES))))
+    missing = [{"name": name} for name in TAG_NAMES if name not in existing]
+    if missing:
+        connection.execute(insert(Tag), missing)
+    tag_ids = list(connection.scalars(select(Tag.id).where(Tag.name.in_(TAG_NAMES)).order_by(Tag.id)))
+    connection.commit()
+    return tag_ids
+
+
+def _max_id(connection: Connection, model) -> int:
+    return connection.scalar(select(func.max(model.id))) or 0
+
+
+def _reset_sequences(connection: Connection) -> None:
+    # Id назначены вручную, последовательности PostgreSQL нужно сдвинуть за них
+    for table in ("user", "task", "timeentry"):
+        connection.execute(
+            text(
+                f"SELECT setval(pg_get_serial_sequence('\"{table}\"', 'id'), "
+                f'(SELECT COALESCE(MAX(id), 1) FROM "{table}"))'
             )
-            session.add(task_tag)
-        session.commit()
-        print(f"Назначено {num_tags} меток для задачи {task.title}")
-
-def main():
-    session = SessionLocal()
-    try:
-        print("Начало наполнения базы данных синтетическими данными...")
-        users = seed_users(session)
-        tags = seed_tags(session)
-        tasks = seed_tasks(session, users)
-        seed_time_entries(session, tasks)
-        seed_task_tags(session, tasks, tags)
-        print("Наполнение базы данных завершено.")
-    except Exception as e:
-        session.rollback()
-        print("Ошибка:", e)
-    finally:
-        session.close()
+        )
+    connection.commit()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Наполнение базы синтетическими данными")
+    parser.add_argument("--users", type=int, default=3)
+    parser.add_argument("--tasks-per-user", type=int, default=3)
+    parser.add_argument("--entries-per-task", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--password", default="password", help="общий пароль всех пользователей")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-users", type=int, default=1000, help="пользователей на одно задание процесса")
+    parser.add_argument("--batch-size", type=int, default=SEED_BATCH_SIZE, help="строк на одну загрузку")
+    args = parser.parse_args(argv)
+
+    print("Начало наполнения базы данных синтетическими данными...")
+    with engine.connect() as connection:
+        dialect = connection.dialect.name
+        plan = SeedPlan(
+            users=args.users,
+            tasks_per_user=args.tasks_per_user,
+            entries_per_task=args.entries_per_task,
+            seed=args.seed,
+            base_user_id=_max_id(connection, models.User),
+            base_task_id=_max_id(connection, models.Task),
+            base_entry_id=_max_id(connection, models.TimeEntry),
+            tag_ids=_ensure_tags(connection),
+            # Один bcrypt на весь прогон вместо хэша на каждого пользователя
+            hashed_password=pwd_context.hash(args.password),
+            now=datetime.utcnow(),
+            batch_size=args.batch_size,
+        )
+    # SQLite не допускает параллельной записи из нескольких процессов
+    workers = args.workers if dialect == "postgresql" else 1
+    ranges = [(start, min(start + args.chunk_users, args.users)) for start in range(0, args.users, args.chunk_users)]
+
+    start_time = time.perf_counter()
+    done_users = total_rows = 0
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+            futures = {executor.submit(seed_range, plan, start, stop): stop - start for start, stop in ranges}
+            for future in as_completed(futures):
+                done_users += futures[future]
+                total_rows += future.result()
+                elapsed = time.perf_counter() - start_time
+                print(f"Пользователей: {done_users}/{args.users}, строк: {total_rows} ({total_rows / elapsed:.0f} строк/с)")
+    else:
+        for start, stop in ranges:
+            done_users += stop - start
+            total_rows += seed_range(plan, start, stop)
+            elapsed = time.perf_counter() - start_time
+            print(f"Пользователей: {done_users}/{args.users}, строк: {total_rows} ({total_rows / elapsed:.0f} строк/с)")
+
+    if dialect == "postgresql":
+        with engine.connect() as connection:
+            _reset_sequences(connection)
+    elapsed = time.perf_counter() - start_time
+    print(f"Наполнение базы данных завершено: {total_rows} строк за {elapsed:.1f} секунд.")
+
 
 if __name__ == "__main__":
     main()
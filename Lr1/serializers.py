@@ -0,0 +1,76 @@
+# app/serializers.py
+# Быстрый путь сериализации ответов: ORM-объекты переводятся в dict вручную,
+# а dict сразу кодируется orjson. Валидация response_model (from_attributes)
+# для больших списков стоила дороже самого запроса к базе.
+# Поля и их порядок совпадают со схемами UserOut/TaskOut/TimeEntryOut/TaskTagOut,
+# response_model у эндпоинтов остаётся для документации OpenAPI.
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional
+
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+from pydantic import TypeAdapter
+
+import models
+
+
+def user_to_dict(user: models.User) -> Dict[str, Any]:
+    return {"username": user.username, "email": user.email, "id": user.id, "created_at": user.created_at}
+
+
+def time_entry_to_dict(entry: models.TimeEntry) -> Dict[str, Any]:
+    return {"duration": entry.duration, "id": entry.id, "created_at": entry.created_at}
+
+
+def task_tag_to_dict(task_tag: models.TaskTag) -> Dict[str, Any]:
+    return {"tag": {"name": task_tag.tag.name, "id": task_tag.tag.id}, "note": task_tag.note}
+
+
+def task_to_dict(task: models.Task) -> Dict[str, Any]:
+    # Незагруженные коллекции (noload) уже пустые списки
+    return {
+        "title": task.title,
+        "description": task.description,
+        "deadline": task.deadline,
+        "priority": task.priority,
+        "id": task.id,
+        "owner": user_to_dict(task.owner),
+        "time_entries": [time_entry_to_dict(entry) for entry in task.time_entries],
+        "tags": [task_tag_to_dict(task_tag) for task_tag in task.tags],
+    }
+
+
+def timer_to_dict(task_id: int, started_at: float, now: float) -> Dict[str, Any]:
+    # Время запуска хранится как unix-время; наружу — UTC без пояса, как created_at
+    return {
+        "task_id": task_id,
+        "started_at": datetime.fromtimestamp(started_at, timezone.utc).replace(tzinfo=None),
+        "elapsed_seconds": int(now - started_at),
+    }
+
+
+def tasks_to_list(tasks: Iterable[models.Task]) -> List[Dict[str, Any]]:
+    return [task_to_dict(task) for task in tasks]
+
+
+def users_to_list(users: Iterable[models.User]) -> List[Dict[str, Any]]:
+    return [user_to_dict(user) for user in users]
+
+
+def json_response(content: Any, response: Optional[Response] = None) -> ORJSONResponse:
+    # Возвращённый Response FastAPI отдаёт как есть, поэтому заголовки
+    # (ETag, X-Next-Cursor), выставленные на response, переносим явно
+    headers = dict(response.headers) if response is not None else None
+    return ORJSONResponse(content, headers=headers)
+
+
+@lru_cache(maxsize=None)
+def _adapter(schema) -> TypeAdapter:
+    return TypeAdapter(schema)
+
+
+def dump(schema, value: Any) -> Any:
+    # Общий путь для ответов без ручного сериализатора: схема отсекает лишние поля
+    adapter = _adapter(schema)
+    return adapter.dump_python(adapter.validate_python(value, from_attributes=True), mode="json")
@@ -1,37 +1,384 @@
 # app/routers/tasks.py
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-import schemas, crud, auth, models
-from database import get_db
+import hashlib
+import io
+import math
+import time
+from datetime import timedelta
+from fastapi import APIRouter, Body, Depends, File, Header, HTTPException, Query, Response, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Dict, List, Literal, Optional
+import schemas, crud, auth, models, pagination, etag, export, importer, serializers, idempotency
+from database import engine, get_async_session, get_read_session
+from entry_buffer import TaskGone, time_entry_buffer
+from admission import release_db_slot
+from bulk import split_valid
+from auth import get_current_user
+from cache import task_cache
+from timer_store import timer_store
+
+router = APIRouter(default_response_class=ORJSONResponse)
+
+
+def parse_include(include: Optional[str]) -> tuple:
+    # ?include=tags,time_entries — какие вложенные коллекции загружать; по умолчанию все
+    if include is None:
+        return crud.TASK_RELATIONS
+    names = tuple(name.strip() for name in include.split(",") if name.strip())
+    unknown = set(names) - set(crud.TASK_RELATIONS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Неизвестные значения include: {', '.join(sorted(unknown))}")
+    return names
+
+
+def file_digest(file: UploadFile) -> str:
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: file.file.read(1 << 20), b""):
+        digest.update(chunk)
+    file.file.seek(0)
+    return digest.hexdigest()
+
+
+async def get_owned_task(db: AsyncSession, task_id: int, user: models.User, include=None) -> models.Task:
+    # Чужие задачи для пользователя не существуют
+    task = await crud.get_task(db, task_id, include=include)
+    if not task or task.user_id != user.id:
+        raise HTTPException(status_code=404, detail="Задача не найдена")
+    return task
 
-router = APIRouter()
 
 @router.post("/", response_model=schemas.TaskOut)
-def create_task(task: schemas.TaskCreate, db: Session = Depends(get_db)):
-    return
+async def create_task(
+    task: schemas.TaskCreate,
+    idempotency_key: Optional[str] = Header(None),
+    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session),
+):
+    async def create():
+        return serializers.task_to_dict(await crud.create_task(db, task, user_id=current_user.id))
+
+    return await idempotency.run(idempotency_key, current_user.id, "POST /tasks/", task.dict(), create)
+
+@router.post("/bulk", response_model=schemas.TaskBulkOut)
+async def create_tasks_bulk(
+    items: List[Dict[str, Any]] = Body(...),
+    idempotency_key: Optional[str] = Header(None),
+    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session),
+):
+    async def create():
+        tasks, _, errors = split_valid(items, schemas.TaskCreate)
+        created = await crud.create_tasks_bulk(db, tasks, user_id=current_user.id)
+        return serializers.dump(schemas.TaskBulkOut, {"created": created, "errors": errors})
+
+    return await idempotency.run(idempotency_key, current_user.id, "POST /tasks/bulk", items, create)
+
+@router.post("/tags/bulk", response_model=schemas.TaskTagBulkOut)
+async def add_tags_bulk(
+    items: List[Dict[str, Any]] = Body(...),
+    idempotency_key: Optional[str] = Header(None),
+    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session),
+):
+    async def create():
+        links, indexes, errors = split_valid(items, schemas.TaskTagLinkCreate)
+        created, db_errors = await crud.add_tags_to_tasks_bulk(db, links, user_id=current_user.id)
+        errors += [schemas.BulkItemError(index=indexes[position], detail=detail) for position, detail in db_errors]
+        errors.sort(key=lambda error: error.index)
+        return serializers.dump(schemas.TaskTagBulkOut, {"created": created, "errors": errors})
+
+    return await idempotency.run(idempotency_key, current_user.id, "POST /tasks/tags/bulk", items, create)
+
+@router.get("/cache/stats")
+async def read_cache_stats(current_user: models.User = Depends(get_current_user)):
+    return task_cache.stats()
+
+# Потоковая выгрузка задач и записей учёта времени; память не зависит от объёма
+@router.get("/export")
+async def export_tasks(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    current_user: models.User = Depends(get_current_user),
+):
+    if format == "csv":
+        return StreamingResponse(
+            export.csv_chunks(current_user.id),
+            media_type="text/csv",
+            headers={"Content-Disposition": 'attachment; filename="tasks.csv"'},
+        )
+    return StreamingResponse(export.ndjson_chunks(current_user.id), media_type="application/x-ndjson")
+
+# Импорт исторических записей учёта времени из CSV (task_id,duration[,created_at])
+@router.post("/import", response_model=schemas.ImportReport)
+async def import_time_entries(
+    file: UploadFile = File(...),
+    idempotency_key: Optional[str] = Header(None),
+    current_user: models.User = Depends(get_current_user),
+):
+    def run():
+        # Загрузка идёт через синхронный движок: COPY доступен в psycopg2
+        source = io.TextIOWrapper(file.file, encoding="utf-8", newline="")
+        with engine.connect() as connection:
+            return importer.import_time_entries(
+                connection,
+                current_user.id,
+                source,
+                on_progress=lambda report: importer.logger.info(
+                    "Импорт пользователя %s: %s строк, %.0f строк/с",
+                    current_user.id, report.imported, report.rows_per_second,
+                ),
+            )
+
+    async def create():
+        try:
+            report = await run_in_threadpool(run)
+        except (ValueError, UnicodeDecodeError) as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return report.as_dict()
+
+    # Повтор импорта узнаётся по содержимому файла; без ключа файл не хэшируется
+    digest = await run_in_threadpool(file_digest, file) if idempotency_key else None
+    return await idempotency.run(idempotency_key, current_user.id, "POST /tasks/import", digest, create)
+
+# Полнотекстовый поиск по названию и описанию; результаты по убыванию релевантности
+@router.get("/search", response_model=List[schemas.TaskOut])
+async def search_tasks(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    include: Optional[str] = None,
+    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_session),
+):
+    # Из одних пробелов не получается ни одного слова для поиска
+    q = q.strip()
+    if not q:
+        raise HTTPException(status_code=400, detail="Пустой поисковый запрос")
+    after = None
+    if cursor:
+        try:
+            after = pagination.decode_cursor(cursor, pagination.SEARCH_SORT_KEYS)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    rows = await crud.search_tasks(
+        db, current_user.id, q, limit=limit, after=after, include=parse_include(include)
+    )
+    if len(rows) == limit:
+        response.headers["X-Next-Cursor"] = pagination.encode_cursor([rows[-1].score, rows[-1].Task.id])
+    return serializers.json_response(serializers.tasks_to_list(row.Task for row in rows), response)
+
+# Задачи, срок которых наступает в ближайшие within часов
+@router.get("/due", response_model=List[schemas.TaskOut])
+async def read_due_tasks(
+    response: Response,
+    within: float = Query(24, gt=0, le=24 * 366),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    include: Optional[str] = None,
+    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_session),
+):
+    after = None
+    if cursor:
+        try:
+            after = pagination.decode_cursor(cursor, pagination.DUE_SORT_KEYS)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    tasks = await crud.get_due_tasks(
+        db, current_user.id, timedelta(hours=within), limit=limit, after=after, include=parse_include(include)
+    )
+    next_cursor = pagination.next_cursor(tasks, limit, pagination.DUE_SORT_KEYS)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return serializers.json_response(serializers.tasks_to_list(tasks), response)
+
 @router.get("/", response_model=List[schemas.TaskOut])
-def read_tasks(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return 
+async def read_tasks(
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    sort: Literal["id", "priority"] = "id",
+    cursor: Optional[str] = None,
+    include: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_session),
+):
+    # С cursor страница ищется по индексу, skip игнорируется.
+    # Курсор следующей страницы возвращается в заголовке X-Next-Cursor.
+    keys = pagination.TASK_SORT_KEYS[sort]
+    include_names = parse_include(include)
+    # Если у клиента актуальная версия, отвечаем 304, не загружая и не сериализуя задачи
+    version = await crud.get_tasks_version(db, current_user.id)
+    task_etag = etag.make_etag(
+        "tasks", current_user.id, version, sort, skip, limit, cursor or "", ",".join(sorted(include_names))
+    )
+    if etag.etag_matches(if_none_match, task_etag):
+        return Response(status_code=304, headers={"ETag": task_etag})
+    response.headers["ETag"] = task_etag
+    cache_key = task_cache.key(
+        current_user.id, version, "list", sort, skip, limit, cursor or "", ",".join(sorted(include_names))
+    )
+    page = await task_cache.get(cache_key)
+    if page is None:
+        after = None
+        if cursor:
+            try:
+                after = pagination.decode_cursor(cursor, keys)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+        tasks = await crud.get_tasks(
+            db, user_id=current_user.id, skip=skip, limit=limit, sort=sort, after=after, include=include_names
+        )
+        page = {
+            "items": serializers.tasks_to_list(tasks),
+            "next_cursor": pagination.next_cursor(tasks, limit, keys),
+        }
+        await task_cache.set(cache_key, page)
+    if page["next_cursor"]:
+        response.headers["X-Next-Cursor"] = page["next_cursor"]
+    return serializers.json_response(page["items"], response)
 
 @router.get("/{task_id}", response_model=schemas.TaskOut)
-def read_task(task_id: int, db: Session = Depends(get_db)):
-    return
+async def read_task(
+    task_id: int,
+    include: Optional[str] = None,
+    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_session),
+):
+    include_names = parse_include(include)
+    version = await crud.get_tasks_version(db, current_user.id)
+    cache_key = task_cache.key(current_user.id, version, "task", task_id, ",".join(sorted(include_names)))
+    task = await task_cache.get(cache_key)
+    if task is None:
+        task = await get_owned_task(db, task_id, current_user, include=include_names)
+        task = serializers.task_to_dict(task)
+        await task_cache.set(cache_key, task)
+    return serializers.json_response(task)
 
 @router.put("/{task_id}", response_model=schemas.TaskOut)
-def update_task(task_id: int, task_update: schemas.TaskCreate, db: Session = Depends(get_db)):
-    return 
+async def update_task(
+    task_id: int,
+    task_update: schemas.TaskCreate,
+    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session),
+):
+    await get_owned_task(db, task_id, current_user)
+    task = await crud.update_task(db, task_id, task_update)
+    return serializers.json_response(serializers.task_to_dict(task))
 
 @router.delete("/{task_id}")
-def delete_task(task_id: int, db: Session = Depends(get_db)):
-    return
+async def delete_task(
+    task_id: int,
+    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session),
+):
+    await get_owned_task(db, task_id, current_user)
+    await crud.delete_task(db, task_id)
+    return {"ok": True}
 
 # Эндпоинт для добавления записи учёта времени к задаче
 @router.post("/{task_id}/time_entries", response_model=schemas.TimeEntryOut)
-def add_time_entry(task_id: int, time_entry: schemas.TimeEntryCreate, db: Session = Depends(get_db)):
-    return 
+async def add_time_entry(
+    task_id: int,
+    time_entry: schemas.TimeEntryCreate,
+    idempotency_key: Optional[str] = Header(None),
+    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session),
+):
+    buffered = time_entry_buffer.running
+
+    async def create():
+        await get_owned_task(db, task_id, current_user)
+        if buffered:
+            # Пока запись ждёт сброса, соединение и место под лимитом базы не держим
+            await db.close()
+            release_db_slot()
+            try:
+                return await time_entry_buffer.add(current_user.id, task_id, time_entry.duration)
+            except TaskGone:
+                raise HTTPException(status_code=404, detail="Задача не найдена")
+        entry = await crud.create_time_entry(db, task_id, time_entry, user_id=current_user.id)
+        return serializers.time_entry_to_dict(entry)
+
+    # Без durable-режима запись ещё в буфере: 202 и id = null
+    status_code = 202 if buffered and not time_entry_buffer.durable else 200
+    route = f"POST /tasks/{task_id}/time_entries"
+    return await idempotency.run(idempotency_key, current_user.id, route, time_entry.dict(), create, status_code)
+
+@router.post("/{task_id}/time_entries/bulk", response_model=schemas.TimeEntryBulkOut)
+async def add_time_entries_bulk(
+    task_id: int,
+    items: List[Dict[str, Any]] = Body(...),
+    idempotency_key: Optional[str] = Header(None),
+    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session),
+):
+    async def create():
+        await get_owned_task(db, task_id, current_user)
+        entries, _, errors = split_valid(items, schemas.TimeEntryCreate)
+        created = await crud.create_time_entries_bulk(db, task_id, entries, user_id=current_user.id)
+        return serializers.dump(schemas.TimeEntryBulkOut, {"created": created, "errors": errors})
+
+    route = f"POST /tasks/{task_id}/time_entries/bulk"
+    return await idempotency.run(idempotency_key, current_user.id, route, items, create)
+
+# Таймер на сервере: пока он идёт, база не трогается; запись учёта времени создаётся при остановке
+@router.post("/{task_id}/timer/start", response_model=schemas.TimerOut)
+async def start_timer(
+    task_id: int,
+    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_session),
+):
+    await get_owned_task(db, task_id, current_user)
+    started_at = time.time()
+    if not await timer_store.start(current_user.id, task_id, started_at):
+        raise HTTPException(status_code=409, detail="Таймер уже запущен")
+    return serializers.json_response(serializers.timer_to_dict(task_id, started_at, started_at))
+
+@router.post("/{task_id}/timer/stop", response_model=schemas.TimeEntryOut)
+async def stop_timer(
+    task_id: int,
+    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session),
+):
+    # Таймер снимается атомарно: параллельная остановка не создаст вторую запись
+    started_at = await timer_store.stop(current_user.id, task_id)
+    if started_at is None:
+        raise HTTPException(status_code=409, detail="Таймер не запущен")
+    # Если задачу удалили, таймер просто пропадает вместе с ней
+    await get_owned_task(db, task_id, current_user)
+    # Длительность в минутах, как у записей, отправленных клиентом; начатая минута
+    # считается целиком, чтобы короткий запуск не давал записи длиной 0
+    time_entry = schemas.TimeEntryCreate(duration=max(1, math.ceil((time.time() - started_at) / 60)))
+    try:
+        entry = await crud.create_time_entry(db, task_id, time_entry, user_id=current_user.id)
+    except Exception:
+        # Запись не сохранилась — таймер продолжает идти с прежнего момента
+        await timer_store.start(current_user.id, task_id, started_at)
+        raise
+    return serializers.json_response(serializers.time_entry_to_dict(entry))
 
 # Эндпоинт для добавления метки к задаче (many-to-many через ассоциативную сущность)
 @router.post("/{task_id}/tags", response_model=schemas.TaskTagOut)
-def add_tag(task_id: int, task_tag: schemas.TaskTagBase, db: Session = Depends(get_db)):
-    return 
+async def add_tag(
+    task_id: int,
+    task_tag: schemas.TaskTagBase,
+    idempotency_key: Optional[str] = Header(None),
+    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session),
+):
+    async def create():
+        await get_owned_task(db, task_id, current_user)
+        if not await crud.get_tag(db, task_tag.tag_id):
+            raise HTTPException(status_code=404, detail="Метка не найдена")
+        if await crud.get_task_tag(db, task_id, task_tag.tag_id):
+            raise HTTPException(status_code=409, detail="Метка уже назначена задаче")
+        db_task_tag = await crud.add_tag_to_task(db, task_id, task_tag, user_id=current_user.id)
+        if db_task_tag is None:
+            raise HTTPException(status_code=409, detail="Метка уже назначена задаче")
+        return serializers.task_tag_to_dict(db_task_tag)
+
+    route = f"POST /tasks/{task_id}/tags"
+    return await idempotency.run(idempotency_key, current_user.id, route, task_tag.dict(), create)
@@ -0,0 +1,55 @@
+# app/routers/teams.py
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+import schemas, crud, models
+from database import get_async_session, get_read_session
+from auth import get_current_user
+
+router = APIRouter()
+
+@router.get("/", response_model=List[schemas.TeamOut])
+async def read_teams(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_session),
+):
+    return await crud.get_teams(db, skip=skip, limit=limit)
+
+@router.post("/", response_model=schemas.TeamOut)
+async def create_team(
+    team: schemas.TeamCreate,
+    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session),
+):
+    if await crud.get_team_by_name(db, team.name):
+        raise HTTPException(status_code=400, detail="Команда с таким названием уже существует")
+    return await crud.create_team(db, team)
+
+@router.get("/{team_id}/participants/", response_model=List[schemas.ParticipantOut])
+async def read_team_participants(
+    team_id: int,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_session),
+):
+    if not await crud.get_team(db, team_id):
+        raise HTTPException(status_code=404, detail="Команда не найдена")
+    return await crud.get_participants(db, skip=skip, limit=limit, team_id=team_id)
+
+# Добавление участника в команду (используется скриптами импорта из task_2)
+@router.patch("/{team_id}/participants/", response_model=schemas.ParticipantOut)
+async def add_participant_to_team(
+    team_id: int,
+    participant_id: int,
+    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session),
+):
+    if not await crud.get_team(db, team_id):
+        raise HTTPException(status_code=404, detail="Команда не найдена")
+    participant = await crud.get_participant(db, participant_id)
+    if not participant:
+        raise HTTPException(status_code=404, detail="Участник не найден")
+    return await crud.set_participant_team(db, participant, team_id)
@@ -0,0 +1,54 @@
+# Тесты гоняются на файле SQLite (aiosqlite для API, sqlite3 для синхронного движка).
+# Окружение выставляется до импорта модулей приложения: они читают его при импорте.
+import os
+import sys
+import tempfile
+
+_DB_PATH = os.path.join(tempfile.mkdtemp(prefix="time_manager_tests_"), "test.db")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_DB_PATH}"
+os.environ.pop("SYNC_DB_URL", None)
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+os.environ.setdefault("DEADLINE_SCHEDULER_ENABLED", "0")
+for name in ("TASK_CACHE_REDIS_URL", "RATE_LIMIT_REDIS_URL", "TIMER_REDIS_URL", "DB_REPLICA_URLS"):
+    os.environ.pop(name, None)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import SQLModel
+
+import database
+import models  # noqa: F401  регистрирует таблицы в metadata
+
+
+@pytest.fixture(autouse=True)
+def schema():
+    # Чистая схема на каждый тест. Версии задач начинаются заново, поэтому
+    # и кэш ответов, ключи которого строятся по версии, тоже очищается
+    from cache import task_cache
+
+    SQLModel.metadata.drop_all(database.engine)
+    SQLModel.metadata.create_all(database.engine)
+    task_cache.local.clear()
+    yield
+
+
+@pytest.fixture
+def client():
+    from main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def register(client: TestClient, username: str, password: str = "password") -> dict:
+    """Регистрирует пользователя и возвращает заголовок авторизации."""
+    response = client.post(
+        "/auth/register", json={"username": username, "email": f"{username}@example.com", "password": password}
+    )
+    assert response.status_code == 200, response.text
+    token = client.post("/auth/login", data={"username": username, "password": password}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
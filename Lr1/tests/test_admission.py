@@ -0,0 +1,163 @@
+import asyncio
+
+import orjson
+import pytest
+
+import admission
+
+
+def _scope(path: str = "/tasks/", method: str = "GET", ip: str = "10.0.0.1") -> dict:
+    return {"type": "http", "method": method, "path": path, "headers": [], "client": (ip, 1234)}
+
+
+async def _call(middleware, scope) -> tuple:
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        messages.append(message)
+
+    await middleware(scope, receive, send)
+    start = messages[0]
+    headers = dict(start.get("headers", []))
+    return start["status"], headers, messages[-1].get("body", b"")
+
+
+def _controller(limit: int = 1, wait: float = 0.05, queue: int = 1, enabled: bool = False):
+    limiter = admission.ConcurrencyLimiter(limit, wait, queue)
+    return admission.AdmissionController(admission.TokenBuckets(1000), limiter, enabled=enabled)
+
+
+def _app(gate: asyncio.Event = None, early_release: bool = False, fail: bool = False):
+    async def app(scope, receive, send):
+        if early_release:
+            admission.release_db_slot()
+        if gate is not None:
+            await gate.wait()
+        if fail:
+            raise RuntimeError("ошибка обработчика")
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    return app
+
+
+def test_busy_db_slots_return_503():
+    controller = _controller()
+
+    async def scenario():
+        gate = asyncio.Event()
+        middleware = admission.AdmissionMiddleware(_app(gate), controller)
+        first = asyncio.create_task(_call(middleware, _scope()))
+        await asyncio.sleep(0)
+        assert controller.limiter.in_flight == 1
+        rejected = await _call(middleware, _scope())
+        gate.set()
+        return rejected, await first, await _call(middleware, _scope())
+
+    (status, headers, body), first, after = asyncio.run(scenario())
+    assert status == 503
+    assert headers[b"retry-after"] == b"1"
+    assert orjson.loads(body)["detail"] == "Сервис перегружен, повторите попытку позже"
+    assert (first[0], after[0]) == (200, 200)
+    assert (controller.limiter.in_flight, controller.limiter.rejected) == (0, 1)
+
+
+def test_full_queue_is_rejected_without_waiting():
+    controller = _controller(wait=10, queue=0)
+
+    async def scenario():
+        gate = asyncio.Event()
+        middleware = admission.AdmissionMiddleware(_app(gate), controller)
+        first = asyncio.create_task(_call(middleware, _scope()))
+        await asyncio.sleep(0)
+        rejected = await asyncio.wait_for(_call(middleware, _scope()), 1)
+        gate.set()
+        await first
+        return rejected
+
+    assert asyncio.run(scenario())[0] == 503
+
+
+def test_released_slot_admits_next_request():
+    controller = _controller(wait=1)
+
+    async def scenario():
+        gate = asyncio.Event()
+        # Первый запрос отпускает место и ждёт, не держа соединения
+        waiting = admission.AdmissionMiddleware(_app(gate, early_release=True), controller)
+        first = asyncio.create_task(_call(waiting, _scope()))
+        await asyncio.sleep(0)
+        assert controller.limiter.in_flight == 0
+        second = await _call(admission.AdmissionMiddleware(_app(), controller), _scope())
+        gate.set()
+        return second, await first
+
+    second, first = asyncio.run(scenario())
+    assert (second[0], first[0]) == (200, 200)
+    # Место не освобождается второй раз по окончании запроса
+    assert controller.limiter.in_flight == 0
+    assert controller.limiter._semaphore._value == 1
+
+
+def test_slot_is_released_when_handler_fails():
+    controller = _controller()
+    middleware = admission.AdmissionMiddleware(_app(fail=True), controller)
+    with pytest.raises(RuntimeError):
+        asyncio.run(_call(middleware, _scope()))
+    assert controller.limiter.in_flight == 0
+    assert controller.limiter._semaphore._value == 1
+
+
+def test_db_free_routes_take_no_slot():
+    controller = _controller(limit=1)
+
+    async def scenario():
+        gate = asyncio.Event()
+        middleware = admission.AdmissionMiddleware(_app(gate), controller)
+        first = asyncio.create_task(_call(middleware, _scope()))
+        await asyncio.sleep(0)
+        timers = await _call(admission.AdmissionMiddleware(_app(), controller), _scope("/timers/active"))
+        gate.set()
+        await first
+        return timers
+
+    assert asyncio.run(scenario())[0] == 200
+    assert controller.limiter.rejected == 0
+
+
+def test_rate_limit_returns_429_per_identity(monkeypatch):
+    monkeypatch.setitem(admission.RATE_LIMITS, "read", (0.5, 2))
+    controller = _controller(limit=10, enabled=True)
+    middleware = admission.AdmissionMiddleware(_app(), controller)
+
+    async def scenario():
+        statuses = [(await _call(middleware, _scope()))[0] for _ in range(2)]
+        throttled = await _call(middleware, _scope())
+        other = await _call(middleware, _scope(ip="10.0.0.2"))
+        # Запись считается отдельно от чтения
+        write = await _call(middleware, _scope(method="POST"))
+        return statuses, throttled, other[0], write[0]
+
+    statuses, (status, headers, _), other, write = asyncio.run(scenario())
+    assert statuses == [200, 200]
+    assert status == 429
+    assert headers[b"retry-after"] == b"2"
+    assert (other, write) == (200, 200)
+    assert controller.throttled["read"] == 1
+
+
+def test_token_bucket_refills():
+    buckets = admission.TokenBuckets(10)
+
+    async def scenario():
+        waits = [await buckets.take("read:user:1", 100, 1) for _ in range(2)]
+        await asyncio.sleep(0.02)
+        return waits, await buckets.take("read:user:1", 100, 1)
+
+    (first, second), refilled = asyncio.run(scenario())
+    assert first == 0
+    assert 0 < second <= 0.01
+    assert refilled == 0
@@ -0,0 +1,89 @@
+from sqlmodel import Session, func, select
+
+from conftest import register
+import database
+import models
+
+
+def _tag(name: str) -> int:
+    with Session(database.engine) as session:
+        tag = models.Tag(name=name)
+        session.add(tag)
+        session.commit()
+        return tag.id
+
+
+def _count(model) -> int:
+    with Session(database.engine) as session:
+        return session.exec(select(func.count()).select_from(model)).one()
+
+
+def test_tasks_bulk_keeps_valid_items(client):
+    headers = register(client, "owner")
+    items = [
+        {"title": "Первая", "priority": 1},
+        {"title": "Без приоритета"},
+        {"title": "Вторая", "priority": 2, "deadline": "2030-01-01T12:00:00"},
+    ]
+    response = client.post("/tasks/bulk", json=items, headers=headers)
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert sorted(task["title"] for task in body["created"]) == ["Вторая", "Первая"]
+    assert [error["index"] for error in body["errors"]] == [1]
+    assert body["errors"][0]["detail"][0]["loc"] == ["priority"]
+    assert len(client.get("/tasks/", headers=headers).json()) == 2
+
+
+def test_time_entries_bulk(client):
+    headers = register(client, "owner")
+    task_id = client.post("/tasks/", json={"title": "Задача", "priority": 1}, headers=headers).json()["id"]
+    items = [{"duration": 30}, {"duration": "долго"}, {"duration": 15}]
+    response = client.post(f"/tasks/{task_id}/time_entries/bulk", json=items, headers=headers)
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert sorted(entry["duration"] for entry in body["created"]) == [15, 30]
+    assert [error["index"] for error in body["errors"]] == [1]
+    # Итоги отчёта обновляются в той же транзакции
+    assert client.get("/reports/total", headers=headers).json()["total_minutes"] == 45
+
+
+def test_time_entries_bulk_for_foreign_task_is_not_found(client):
+    owner, other = register(client, "owner"), register(client, "other")
+    task_id = client.post("/tasks/", json={"title": "Задача", "priority": 1}, headers=owner).json()["id"]
+    response = client.post(f"/tasks/{task_id}/time_entries/bulk", json=[{"duration": 5}], headers=other)
+    assert response.status_code == 404
+    assert _count(models.TimeEntry) == 0
+
+
+def test_tags_bulk_reports_each_failed_link(client):
+    owner, other = register(client, "owner"), register(client, "other")
+    task_id = client.post("/tasks/", json={"title": "Моя", "priority": 1}, headers=owner).json()["id"]
+    foreign_id = client.post("/tasks/", json={"title": "Чужая", "priority": 1}, headers=other).json()["id"]
+    urgent, later = _tag("срочно"), _tag("потом")
+    items = [
+        {"task_id": task_id, "tag_id": urgent, "note": "к пятнице"},
+        {"task_id": task_id, "tag_id": urgent},
+        {"task_id": foreign_id, "tag_id": later},
+        {"task_id": task_id, "tag_id": 999},
+        {"task_id": task_id},
+        {"task_id": task_id, "tag_id": later},
+    ]
+    response = client.post("/tasks/tags/bulk", json=items, headers=owner)
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert sorted(link["tag_id"] for link in body["created"]) == [urgent, later]
+    errors = {error["index"]: error["detail"] for error in body["errors"]}
+    assert errors[1] == "Метка уже назначена задаче"
+    assert errors[2] == "Задача не найдена"
+    assert errors[3] == "Метка не найдена"
+    assert errors[4][0]["loc"] == ["tag_id"]
+    assert sorted(errors) == [1, 2, 3, 4]
+    assert _count(models.TaskTag) == 2
+
+
+def test_bulk_size_is_limited(client):
+    headers = register(client, "owner")
+    items = [{"title": "Задача", "priority": 1}] * 1001
+    response = client.post("/tasks/bulk", json=items, headers=headers)
+    assert response.status_code == 413
+    assert _count(models.Task) == 0
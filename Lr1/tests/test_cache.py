@@ -0,0 +1,93 @@
+import asyncio
+
+from sqlalchemy import update
+from sqlmodel import Session
+
+from conftest import register
+import cache
+import crud
+import database
+import models
+
+
+def test_miss_then_hit():
+    task_cache = cache.TaskCache(100, 60)
+
+    async def scenario():
+        key = task_cache.key(1, 0, "list")
+        assert await task_cache.get(key) is None
+        await task_cache.set(key, {"items": [1]})
+        return await task_cache.get(key)
+
+    assert asyncio.run(scenario()) == {"items": [1]}
+    assert (task_cache.hits, task_cache.misses) == (1, 1)
+
+
+def test_shared_redis_level_serves_other_worker():
+    # Два воркера с общим Redis: второй берёт ответ из Redis и кладёт его в свой локальный уровень
+    redis = cache.InMemoryRedis()
+    first, second = cache.TaskCache(100, 60, redis=redis), cache.TaskCache(100, 60, redis=redis)
+
+    async def scenario():
+        key = first.key(1, 3, "task", 7)
+        await first.set(key, {"id": 7})
+        return await second.get(key), await second.get(key)
+
+    assert asyncio.run(scenario()) == ({"id": 7}, {"id": 7})
+    assert (second.redis_hits, second.hits) == (1, 1)
+
+
+def test_disabled_cache_stores_nothing():
+    task_cache = cache.TaskCache(100, 60, enabled=False)
+
+    async def scenario():
+        await task_cache.set("tasks:1:0:list", [1])
+        return await task_cache.get("tasks:1:0:list")
+
+    assert asyncio.run(scenario()) is None
+
+
+def _stats(client, headers) -> dict:
+    return client.get("/tasks/cache/stats", headers=headers).json()
+
+
+def test_read_is_cached_until_task_write(client):
+    headers = register(client, "owner")
+    task_id = client.post("/tasks/", json={"title": "Было", "priority": 1}, headers=headers).json()["id"]
+    client.get(f"/tasks/{task_id}", headers=headers)
+    hits = _stats(client, headers)["hits"]
+    assert client.get(f"/tasks/{task_id}", headers=headers).json()["title"] == "Было"
+    assert _stats(client, headers)["hits"] == hits + 1
+
+    client.put(f"/tasks/{task_id}", json={"title": "Стало", "priority": 1}, headers=headers)
+    assert client.get(f"/tasks/{task_id}", headers=headers).json()["title"] == "Стало"
+    assert [task["title"] for task in client.get("/tasks/", headers=headers).json()] == ["Стало"]
+
+
+def test_write_from_another_worker_is_seen(client):
+    # Другой воркер меняет задачу и увеличивает tasks_version; локальный кэш этого процесса не трогается
+    headers = register(client, "owner")
+    task_id = client.post("/tasks/", json={"title": "Было", "priority": 1}, headers=headers).json()["id"]
+    assert [task["title"] for task in client.get("/tasks/", headers=headers).json()] == ["Было"]
+    with Session(database.engine) as session:
+        task = session.get(models.Task, task_id)
+        task.title = "Стало"
+        session.execute(crud.tasks_version_bump(task.user_id))
+        session.commit()
+    assert [task["title"] for task in client.get("/tasks/", headers=headers).json()] == ["Стало"]
+    assert client.get(f"/tasks/{task_id}", headers=headers).json()["title"] == "Стало"
+
+
+def test_cache_is_per_user(client):
+    owner, other = register(client, "owner"), register(client, "other")
+    task_id = client.post("/tasks/", json={"title": "Моя", "priority": 1}, headers=owner).json()["id"]
+    assert client.get(f"/tasks/{task_id}", headers=owner).status_code == 200
+    # Закэшированная задача владельца не отдаётся другому пользователю
+    assert client.get(f"/tasks/{task_id}", headers=other).status_code == 404
+    assert client.get("/tasks/", headers=other).json() == []
+    # Запись другого пользователя не меняет версию владельца
+    with Session(database.engine) as session:
+        before = session.get(models.User, 1).tasks_version
+    client.post("/tasks/", json={"title": "Чужая", "priority": 1}, headers=other)
+    with Session(database.engine) as session:
+        assert session.get(models.User, 1).tasks_version == before
@@ -0,0 +1,95 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlmodel import Session
+
+import database
+import deadlines
+import models
+
+
+def _user() -> int:
+    with Session(database.engine) as session:
+        user = models.User(username="owner", email="owner@example.com", hashed_password="x")
+        session.add(user)
+        session.commit()
+        return user.id
+
+
+def _task(user_id: int, deadline: datetime) -> int:
+    # Задача, созданная в обход планировщика, как на другом воркере
+    with Session(database.engine) as session:
+        task = models.Task(title="Задача", priority=1, user_id=user_id, deadline=deadline)
+        session.add(task)
+        session.commit()
+        return task.id
+
+
+def test_inactive_scheduler_keeps_nothing():
+    scheduler = deadlines.DeadlineScheduler(timedelta(minutes=15))
+    scheduler.schedule(1, 1, "Задача", datetime.utcnow() + timedelta(hours=1))
+    assert len(scheduler) == 0
+    assert scheduler.next_fire_at() is None
+
+
+def test_sync_picks_up_tasks_changed_elsewhere():
+    user_id = _user()
+    scheduler = deadlines.DeadlineScheduler(timedelta(minutes=15))
+    asyncio.run(scheduler.load())
+    task_id = _task(user_id, datetime.utcnow() + timedelta(hours=1))
+    assert asyncio.run(scheduler.sync()) == 1
+    assert len(scheduler) == 1
+
+    with Session(database.engine) as session:
+        session.get(models.Task, task_id).deadline = None
+        session.commit()
+    asyncio.run(scheduler.sync())
+    assert len(scheduler) == 0
+
+
+def test_confirm_drops_deleted_and_moved_tasks():
+    user_id = _user()
+    soon = datetime.utcnow() + timedelta(minutes=5)
+    kept, deleted, moved = (_task(user_id, soon) for _ in range(3))
+    scheduler = deadlines.DeadlineScheduler(timedelta(minutes=15))
+    asyncio.run(scheduler.load())
+    with Session(database.engine) as session:
+        session.delete(session.get(models.Task, deleted))
+        session.get(models.Task, moved).deadline = soon + timedelta(days=1)
+        session.commit()
+
+    due = scheduler.pop_due(datetime.utcnow())
+    assert {reminder.task_id for reminder in due} == {kept, deleted, moved}
+    confirmed = asyncio.run(scheduler.confirm(due))
+    assert [reminder.task_id for reminder in confirmed] == [kept]
+    # Перенесённая задача снова в куче, уже с новым сроком
+    assert len(scheduler) == 1
+    assert scheduler.next_fire_at() == soon + timedelta(days=1) - timedelta(minutes=15)
+
+
+def test_single_process_runner_fires_without_sync(monkeypatch):
+    # С SQLite сверки с базой нет: ведущий спит до срока, а новые сроки приходят через schedule()
+    monkeypatch.setattr(deadlines, "DEADLINE_SYNC_INTERVAL", 0.01)
+    user_id = _user()
+    scheduler = deadlines.DeadlineScheduler(timedelta(minutes=15))
+    synced, fired = [], []
+    monkeypatch.setattr(scheduler, "sync", lambda: synced.append(True))
+    scheduler.handlers.append(fired.append)
+
+    async def scenario():
+        await scheduler.start()
+        while not scheduler.active:
+            await asyncio.sleep(0.01)
+        deadline = datetime.utcnow() + timedelta(minutes=15, seconds=0.3)
+        task_id = _task(user_id, deadline)
+        scheduler.schedule(task_id, user_id, "Задача", deadline)
+        for _ in range(300):
+            if fired:
+                break
+            await asyncio.sleep(0.01)
+        await scheduler.stop()
+        return task_id
+
+    task_id = asyncio.run(scenario())
+    assert [reminder.task_id for reminder in fired] == [task_id]
+    assert synced == []
@@ -0,0 +1,76 @@
+import asyncio
+
+from sqlmodel import Session, func, select
+
+import crud
+import database
+import entry_buffer
+import models
+
+
+def _task() -> tuple:
+    with Session(database.engine) as session:
+        user = models.User(username="agent", email="agent@example.com", hashed_password="x")
+        session.add(user)
+        session.commit()
+        task = models.Task(title="Задача", priority=1, user_id=user.id)
+        session.add(task)
+        session.commit()
+        return user.id, task.id
+
+
+def _entry_count() -> int:
+    with Session(database.engine) as session:
+        return session.exec(select(func.count()).select_from(models.TimeEntry)).one()
+
+
+def _slow_write(monkeypatch, started: list):
+    original = crud.create_time_entries_for_users
+
+    async def slow(db, entries):
+        started.append(len(entries))
+        await asyncio.sleep(0.3)
+        return await original(db, entries)
+
+    monkeypatch.setattr(crud, "create_time_entries_for_users", slow)
+
+
+def test_stop_during_slow_write_keeps_batch(monkeypatch):
+    user_id, task_id = _task()
+    started = []
+    _slow_write(monkeypatch, started)
+    buffer = entry_buffer.TimeEntryBuffer(50, 100, 1000, 1, durable=False, enabled=True)
+
+    async def scenario():
+        await buffer.start()
+        for duration in range(1, 6):
+            await buffer.add(user_id, task_id, duration)
+        while not started:
+            await asyncio.sleep(0.01)
+        # Сброс идёт прямо сейчас: остановка должна его дождаться
+        await buffer.stop()
+
+    asyncio.run(scenario())
+    assert _entry_count() == 5
+    assert buffer.snapshot()["flushed"] == 5
+    assert buffer.snapshot()["pending"] == 0
+    assert buffer.snapshot()["dropped"] == 0
+
+
+def test_stop_during_slow_write_resolves_durable_waiters(monkeypatch):
+    user_id, task_id = _task()
+    started = []
+    _slow_write(monkeypatch, started)
+    buffer = entry_buffer.TimeEntryBuffer(50, 2, 1000, 1, durable=True, enabled=True)
+
+    async def scenario():
+        await buffer.start()
+        waiters = [asyncio.create_task(buffer.add(user_id, task_id, duration)) for duration in range(1, 6)]
+        while not started:
+            await asyncio.sleep(0.01)
+        await buffer.stop()
+        return await asyncio.wait_for(asyncio.gather(*waiters), 1)
+
+    results = asyncio.run(scenario())
+    assert sorted(result["id"] for result in results) == [1, 2, 3, 4, 5]
+    assert _entry_count() == 5
@@ -0,0 +1,51 @@
+from conftest import register
+import etag
+
+
+def test_etag_matches():
+    tag = etag.make_etag("tasks", 1, 0)
+    assert tag.startswith('W/"')
+    assert etag.etag_matches(tag, tag)
+    assert etag.etag_matches(f'"other", {tag.removeprefix("W/")}', tag)
+    assert etag.etag_matches("*", tag)
+    assert not etag.etag_matches(None, tag)
+    assert not etag.etag_matches('W/"other"', tag)
+
+
+def test_task_list_not_modified_until_write(client):
+    headers = register(client, "owner")
+    task_id = client.post("/tasks/", json={"title": "Задача", "priority": 1}, headers=headers).json()["id"]
+    first = client.get("/tasks/", headers=headers)
+    tag = first.headers["ETag"]
+
+    cached = client.get("/tasks/", headers={**headers, "If-None-Match": tag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["ETag"] == tag
+    # Другие параметры страницы — другой ETag
+    assert client.get("/tasks/", params={"limit": 10}, headers=headers).headers["ETag"] != tag
+
+    # Запись учёта времени меняет вложенные time_entries, а значит и версию списка
+    client.post(f"/tasks/{task_id}/time_entries", json={"duration": 5}, headers=headers)
+    changed = client.get("/tasks/", headers={**headers, "If-None-Match": tag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != tag
+    assert changed.json()[0]["time_entries"][0]["duration"] == 5
+
+
+def test_task_list_etag_is_per_user(client):
+    owner, other = register(client, "owner"), register(client, "other")
+    tag = client.get("/tasks/", headers=owner).headers["ETag"]
+    client.post("/tasks/", json={"title": "Чужая", "priority": 1}, headers=other)
+    assert client.get("/tasks/", headers={**owner, "If-None-Match": tag}).status_code == 304
+    assert client.get("/tasks/", headers={**other, "If-None-Match": tag}).status_code == 200
+
+
+def test_user_list_changes_on_registration(client):
+    headers = register(client, "owner")
+    tag = client.get("/users/", headers=headers).headers["ETag"]
+    assert client.get("/users/", headers={**headers, "If-None-Match": tag}).status_code == 304
+    register(client, "other")
+    response = client.get("/users/", headers={**headers, "If-None-Match": tag})
+    assert response.status_code == 200
+    assert [user["username"] for user in response.json()] == ["owner", "other"]
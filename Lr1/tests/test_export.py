@@ -0,0 +1,70 @@
+import asyncio
+import csv
+import io
+import json
+
+from conftest import register
+import export
+
+
+def _seed(client) -> tuple:
+    owner, other = register(client, "owner"), register(client, "other")
+    first = client.post("/tasks/", json={"title": "Отчёт, «квартал»", "priority": 1}, headers=owner).json()["id"]
+    second = client.post(
+        "/tasks/", json={"title": "Без записей", "priority": 2, "deadline": "2030-01-01T09:30:00"}, headers=owner
+    ).json()["id"]
+    entries = [
+        client.post(f"/tasks/{first}/time_entries", json={"duration": minutes}, headers=owner).json()
+        for minutes in (30, 45)
+    ]
+    client.post("/tasks/", json={"title": "Чужая", "priority": 1}, headers=other)
+    return owner, first, second, entries
+
+
+def test_ndjson_export(client):
+    owner, first, second, entries = _seed(client)
+    response = client.get("/tasks/export", headers=owner)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [(row["task_id"], row["time_entry_id"]) for row in rows] == [
+        (first, entries[0]["id"]), (first, entries[1]["id"]), (second, None),
+    ]
+    assert rows[0]["title"] == "Отчёт, «квартал»"
+    # UTF-8 без \u-экранирования, как в остальных ответах API
+    assert '"title":"Отчёт, «квартал»"' in response.text
+    assert [row["duration"] for row in rows] == [30, 45, None]
+    # Даты в том же формате, что и в ответах API
+    assert [row["created_at"] for row in rows[:2]] == [entry["created_at"] for entry in entries]
+    assert rows[2]["deadline"] == "2030-01-01T09:30:00"
+
+
+def test_csv_export(client):
+    owner, first, second, entries = _seed(client)
+    response = client.get("/tasks/export", params={"format": "csv"}, headers=owner)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert "attachment" in response.headers["content-disposition"]
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows[0] == export.EXPORT_COLUMNS
+    assert [(row[0], row[5], row[6]) for row in rows[1:]] == [
+        (str(first), str(entries[0]["id"]), "30"),
+        (str(first), str(entries[1]["id"]), "45"),
+        (str(second), "", ""),
+    ]
+    assert rows[1][1] == "Отчёт, «квартал»"
+
+
+def test_unknown_format_is_rejected(client):
+    owner = register(client, "owner")
+    assert client.get("/tasks/export", params={"format": "xml"}, headers=owner).status_code == 422
+
+
+def test_export_reads_in_partitions(client):
+    owner = _seed(client)[0]
+    user_id = client.get("/users/me", headers=owner).json()["id"]
+
+    async def sizes():
+        return [len(partition) async for partition in export.export_partitions(user_id, chunk_size=2)]
+
+    assert asyncio.run(sizes()) == [2, 1]
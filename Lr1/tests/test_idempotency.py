@@ -0,0 +1,106 @@
+import asyncio
+
+import orjson
+import pytest
+from sqlmodel import Session, func, select
+
+from conftest import register
+import crud
+import database
+import idempotency
+import models
+
+
+def _count(model) -> int:
+    with Session(database.engine) as session:
+        return session.exec(select(func.count()).select_from(model)).one()
+
+
+def test_replay_returns_stored_response(client):
+    headers = {**register(client, "owner"), "Idempotency-Key": "create-1"}
+    task = {"title": "Задача", "priority": 1}
+    first = client.post("/tasks/", json=task, headers=headers)
+    second = client.post("/tasks/", json=task, headers=headers)
+    assert first.status_code == second.status_code == 200
+    assert second.json() == first.json()
+    assert second.headers[idempotency.REPLAYED_HEADER] == "true"
+    assert idempotency.REPLAYED_HEADER not in first.headers
+    assert _count(models.Task) == 1
+
+
+def test_same_key_with_other_body_is_rejected(client):
+    headers = {**register(client, "owner"), "Idempotency-Key": "create-1"}
+    client.post("/tasks/", json={"title": "Задача", "priority": 1}, headers=headers)
+    response = client.post("/tasks/", json={"title": "Другая", "priority": 1}, headers=headers)
+    assert response.status_code == 422
+    assert response.json()["detail"] == "Idempotency-Key уже использован с другим запросом"
+    assert _count(models.Task) == 1
+
+
+def test_keys_are_scoped_per_user(client):
+    owner, other = register(client, "owner"), register(client, "other")
+    task = {"title": "Задача", "priority": 1}
+    client.post("/tasks/", json=task, headers={**owner, "Idempotency-Key": "same"})
+    response = client.post("/tasks/", json=task, headers={**other, "Idempotency-Key": "same"})
+    assert idempotency.REPLAYED_HEADER not in response.headers
+    assert _count(models.Task) == 2
+
+
+def test_client_error_is_replayed(client):
+    headers = {**register(client, "owner"), "Idempotency-Key": "entry-1"}
+    first = client.post("/tasks/999/time_entries", json={"duration": 5}, headers=headers)
+    second = client.post("/tasks/999/time_entries", json={"duration": 5}, headers=headers)
+    assert first.status_code == second.status_code == 404
+    assert second.json() == first.json()
+    assert second.headers[idempotency.REPLAYED_HEADER] == "true"
+
+
+def test_failed_action_releases_key(client, monkeypatch):
+    headers = {**register(client, "owner"), "Idempotency-Key": "create-1"}
+    original = crud.create_task
+
+    async def failing(*args, **kwargs):
+        raise RuntimeError("база недоступна")
+
+    monkeypatch.setattr(crud, "create_task", failing)
+    with pytest.raises(RuntimeError):
+        client.post("/tasks/", json={"title": "Задача", "priority": 1}, headers=headers)
+    monkeypatch.setattr(crud, "create_task", original)
+    response = client.post("/tasks/", json={"title": "Задача", "priority": 1}, headers=headers)
+    assert response.status_code == 200
+    assert idempotency.REPLAYED_HEADER not in response.headers
+    assert _count(models.Task) == 1
+
+
+def test_invalid_key_is_rejected(client):
+    headers = {**register(client, "owner"), "Idempotency-Key": "k" * (idempotency.MAX_KEY_LENGTH + 1)}
+    assert client.post("/tasks/", json={"title": "Задача", "priority": 1}, headers=headers).status_code == 400
+
+
+def test_register_is_idempotent(client):
+    user = {"username": "owner", "email": "owner@example.com", "password": "password"}
+    first = client.post("/auth/register", json=user, headers={"Idempotency-Key": "signup"})
+    second = client.post("/auth/register", json=user, headers={"Idempotency-Key": "signup"})
+    assert first.status_code == second.status_code == 200
+    assert second.json() == first.json()
+    assert _count(models.User) == 1
+
+
+def test_concurrent_duplicate_waits_for_first(monkeypatch):
+    monkeypatch.setattr(idempotency, "IDEMPOTENCY_POLL_INTERVAL", 0.01)
+    calls = []
+
+    async def action():
+        calls.append(True)
+        await asyncio.sleep(0.1)
+        return {"id": len(calls)}
+
+    async def scenario():
+        return await asyncio.gather(*(idempotency.run("key", 1, "POST /x", {"a": 1}, action) for _ in range(3)))
+
+    responses = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert [orjson.loads(response.body) for response in responses] == [{"id": 1}] * 3
+    assert sorted(response.headers.get(idempotency.REPLAYED_HEADER, "") for response in responses) == [
+        "", "true", "true"
+    ]
@@ -0,0 +1,192 @@
+import io
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy.exc import DataError
+from sqlmodel import Session, select
+
+from conftest import register
+import database
+import importer
+import models
+
+
+def _tasks() -> tuple:
+    # Пользователь с двумя задачами и чужая задача
+    with Session(database.engine) as session:
+        owner = models.User(username="owner", email="owner@example.com", hashed_password="x")
+        other = models.User(username="other", email="other@example.com", hashed_password="x")
+        session.add_all([owner, other])
+        session.commit()
+        tasks = [models.Task(title=f"Задача {i}", priority=1, user_id=owner.id) for i in range(2)]
+        foreign = models.Task(title="Чужая", priority=1, user_id=other.id)
+        session.add_all(tasks + [foreign])
+        session.commit()
+        return owner.id, tasks[0].id, tasks[1].id, foreign.id
+
+
+def _import(user_id: int, text: str, batch_size: int = 1000) -> importer.ImportReport:
+    with database.engine.connect() as connection:
+        return importer.import_time_entries(connection, user_id, io.StringIO(text), batch_size=batch_size)
+
+
+def _entries() -> list:
+    with Session(database.engine) as session:
+        return session.exec(
+            select(models.TimeEntry.task_id, models.TimeEntry.duration).order_by(models.TimeEntry.id)
+        ).all()
+
+
+def _rollups() -> dict:
+    with Session(database.engine) as session:
+        rows = session.exec(select(models.TimeRollup)).all()
+        return {(row.task_id, row.day): (row.total_minutes, row.entry_count) for row in rows}
+
+
+def _tasks_version(user_id: int) -> int:
+    with Session(database.engine) as session:
+        return session.get(models.User, user_id).tasks_version
+
+
+def test_import_csv():
+    user_id, first, second, _ = _tasks()
+    report = _import(
+        user_id,
+        "task_id,duration,created_at\n"
+        f"{first},30,2026-10-01T09:00:00\n"
+        f"{first},15,2026-10-01T17:00:00\n"
+        f"{second},45,2026-10-02T10:00:00\n",
+    )
+    assert (report.imported, report.rejected, report.errors) == (3, 0, [])
+    assert _entries() == [(first, 30), (first, 15), (second, 45)]
+    assert _rollups() == {(first, date(2026, 10, 1)): (45, 2), (second, date(2026, 10, 2)): (45, 1)}
+
+
+def test_bad_rows_are_reported_by_line():
+    user_id, first, _, foreign = _tasks()
+    report = _import(
+        user_id,
+        "task_id,duration\n"
+        f"{first},10\n"
+        f"{first},abc\n"
+        f"{first},-5\n"
+        f"{foreign},20\n"
+        "999,20\n"
+        f"{first},\n"
+        f"{first},25\n",
+    )
+    assert report.imported == 2
+    assert report.rejected == 5
+    # Строка 1 — заголовок, данные начинаются со строки 2
+    assert sorted(error["line"] for error in report.errors) == [3, 4, 5, 6, 7]
+    details = {error["line"]: error["detail"] for error in report.errors}
+    assert details[4] == "duration не может быть отрицательной"
+    assert details[5] == details[6] == "Задача не найдена"
+    assert _entries() == [(first, 10), (first, 25)]
+
+
+def test_missing_columns_are_rejected():
+    user_id, *_ = _tasks()
+    with pytest.raises(ValueError, match="duration"):
+        _import(user_id, "task_id,minutes\n1,10\n")
+    assert _entries() == []
+
+
+def test_failure_mid_import_rolls_back_current_batch(monkeypatch):
+    user_id, first, second, _ = _tasks()
+    original = importer._insert_rows
+    calls = []
+
+    def insert_then_fail(connection, rows):
+        # Вторая пачка успевает вставить строки, затем соединение с базой рвётся
+        original(connection, rows)
+        calls.append(len(rows))
+        if len(calls) == 2:
+            raise RuntimeError("соединение потеряно")
+
+    monkeypatch.setattr(importer, "_insert_rows", insert_then_fail)
+    lines = [f"{first},10,2026-10-01T09:00:00", f"{first},20,2026-10-01T10:00:00"]
+    lines += [f"{second},30,2026-10-02T09:00:00", f"{second},40,2026-10-02T10:00:00"]
+    with pytest.raises(RuntimeError):
+        _import(user_id, "task_id,duration,created_at\n" + "\n".join(lines) + "\n", batch_size=2)
+
+    # Первая пачка закоммичена целиком, вторая откатилась вместе со сводкой и версией задач
+    assert calls == [2, 2]
+    assert _entries() == [(first, 10), (first, 20)]
+    assert _rollups() == {(first, date(2026, 10, 1)): (30, 2)}
+    assert _tasks_version(user_id) == 1
+
+
+def test_import_endpoint(client):
+    headers = register(client, "owner")
+    task_id = client.post("/tasks/", json={"title": "Задача", "priority": 1}, headers=headers).json()["id"]
+    csv_file = f"task_id,duration\n{task_id},30\n{task_id},x\n".encode()
+    response = client.post("/tasks/import", files={"file": ("entries.csv", csv_file, "text/csv")}, headers=headers)
+    assert response.status_code == 200, response.text
+    report = response.json()
+    assert (report["imported"], report["rejected"]) == (1, 1)
+    assert report["errors"][0]["line"] == 3
+
+    response = client.post("/tasks/import", files={"file": ("bad.csv", b"id\n1\n", "text/csv")}, headers=headers)
+    assert response.status_code == 400
+
+
+def test_exported_csv_imports_back(client):
+    # Выгрузка CSV содержит колонки task_id, duration и created_at и годится для импорта
+    headers = register(client, "owner")
+    task_id = client.post("/tasks/", json={"title": "Задача", "priority": 1}, headers=headers).json()["id"]
+    for duration in (10, 20):
+        client.post(f"/tasks/{task_id}/time_entries", json={"duration": duration}, headers=headers)
+    exported = client.get("/tasks/export", params={"format": "csv"}, headers=headers).content
+    response = client.post("/tasks/import", files={"file": ("tasks.csv", exported, "text/csv")}, headers=headers)
+    assert response.json()["imported"] == 2
+    assert sorted(duration for _, duration in _entries()) == [10, 10, 20, 20]
+
+
+def test_out_of_range_values_are_rejected_per_row():
+    user_id, first, *_ = _tasks()
+    report = _import(user_id, f"task_id,duration\n{first},99999999999\n99999999999,10\n{first},5\n")
+    assert report.imported == 1
+    assert sorted(error["line"] for error in report.errors) == [2, 3]
+
+
+def test_created_at_with_offset_is_stored_as_utc():
+    user_id, first, *_ = _tasks()
+    _import(user_id, f"task_id,duration,created_at\n{first},10,2026-10-01T02:30:00+03:00\n")
+    with Session(database.engine) as session:
+        created_at = session.exec(select(models.TimeEntry.created_at)).one()
+    assert created_at == datetime(2026, 9, 30, 23, 30)
+    # Сводка считается по дню в UTC
+    assert _rollups() == {(first, date(2026, 9, 30)): (10, 1)}
+
+
+def test_database_error_reports_failing_batch(monkeypatch):
+    user_id, first, *_ = _tasks()
+    original = importer._insert_rows
+    calls = []
+
+    def fail_second(connection, rows):
+        calls.append(len(rows))
+        if len(calls) == 2:
+            raise DataError("INSERT", {}, Exception("integer out of range"))
+        original(connection, rows)
+
+    monkeypatch.setattr(importer, "_insert_rows", fail_second)
+    lines = "".join(f"{first},{minutes}\n" for minutes in (1, 2, 3, 4))
+    with pytest.raises(importer.ImportBatchError, match="Строки 4–5 не загружены.*ранее загружено 2 строк"):
+        _import(user_id, "task_id,duration\n" + lines, batch_size=2)
+    assert _entries() == [(first, 1), (first, 2)]
+
+
+def test_import_endpoint_turns_database_error_into_bad_request(client, monkeypatch):
+    headers = register(client, "owner")
+    task_id = client.post("/tasks/", json={"title": "Задача", "priority": 1}, headers=headers).json()["id"]
+
+    def fail(connection, rows):
+        raise DataError("INSERT", {}, Exception("integer out of range"))
+
+    monkeypatch.setattr(importer, "_insert_rows", fail)
+    csv_file = f"task_id,duration\n{task_id},30\n".encode()
+    response = client.post("/tasks/import", files={"file": ("entries.csv", csv_file, "text/csv")}, headers=headers)
+    assert response.status_code == 400
+    assert "Строки 2–2 не загружены" in response.json()["detail"]
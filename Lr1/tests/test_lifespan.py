@@ -0,0 +1,12 @@
+from fastapi.testclient import TestClient
+
+from conftest import register
+from main import app
+
+
+def test_app_restarts_in_same_process():
+    # Второй lifespan в том же процессе: пул bcrypt и фоновые задачи поднимаются заново
+    for attempt in range(2):
+        with TestClient(app) as client:
+            headers = register(client, f"user{attempt}")
+            assert client.get("/tasks/", headers=headers).status_code == 200
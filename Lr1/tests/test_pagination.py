@@ -0,0 +1,59 @@
+import base64
+import json
+from datetime import datetime
+
+import pytest
+
+from conftest import register
+import pagination
+
+
+def _raw(values) -> str:
+    # Курсор в обход encode_cursor, как его мог бы собрать клиент
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+
+
+def test_round_trip():
+    deadline = datetime(2026, 10, 18, 12, 30)
+    cursor = pagination.encode_cursor([2, deadline, 15])
+    assert pagination.decode_cursor(cursor, pagination.TASK_SORT_KEYS["priority"]) == [2, deadline, 15]
+    cursor = pagination.encode_cursor([0.25, 7])
+    assert pagination.decode_cursor(cursor, pagination.SEARCH_SORT_KEYS) == [0.25, 7]
+
+
+def test_priority_cursor_allows_empty_deadline():
+    cursor = pagination.encode_cursor([1, None, 3])
+    assert pagination.decode_cursor(cursor, pagination.TASK_SORT_KEYS["priority"]) == [1, None, 3]
+
+
+@pytest.mark.parametrize(
+    "values, keys",
+    [
+        (["1"], pagination.USER_SORT_KEYS),
+        ([True], pagination.USER_SORT_KEYS),
+        ([2**40], pagination.USER_SORT_KEYS),
+        ([1.5], pagination.USER_SORT_KEYS),
+        (["2026-10-18T00:00:00", 1], pagination.DUE_SORT_KEYS),
+        ([{"dt": "вчера"}, 1], pagination.DUE_SORT_KEYS),
+        ([{"x": 1}, 1], pagination.DUE_SORT_KEYS),
+        (["high", 1], pagination.SEARCH_SORT_KEYS),
+        ([[1], 1], pagination.SEARCH_SORT_KEYS),
+        ([1], pagination.SEARCH_SORT_KEYS),
+        ({"id": 1}, pagination.USER_SORT_KEYS),
+    ],
+)
+def test_wrong_types_are_rejected(values, keys):
+    with pytest.raises(ValueError):
+        pagination.decode_cursor(_raw(values), keys)
+
+
+def test_aware_deadline_is_normalized_to_utc():
+    cursor = _raw([{"dt": "2026-10-18T15:00:00+03:00"}, 1])
+    assert pagination.decode_cursor(cursor, pagination.DUE_SORT_KEYS) == [datetime(2026, 10, 18, 12, 0), 1]
+
+
+def test_bad_cursor_is_bad_request(client):
+    headers = register(client, "owner")
+    response = client.get("/tasks/", params={"sort": "priority", "cursor": _raw(["1", "x", 1])}, headers=headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Некорректный курсор"
@@ -0,0 +1,76 @@
+from conftest import register
+
+
+def _participant(nickname: str, team_name=None, **fields) -> dict:
+    item = {
+        "full_name": f"Участник {nickname}",
+        "nickname": nickname,
+        "email": f"{nickname}@example.com",
+        "phone": "+70000000000",
+        "skill": "python",
+        **fields,
+    }
+    if team_name is not None:
+        item["team_name"] = team_name
+    return item
+
+
+def test_bulk_creates_teams_and_participants(client):
+    headers = register(client, "owner")
+    existing = client.post("/teams/", json={"name": "Альфа"}, headers=headers).json()["id"]
+    items = [_participant("ann", "Альфа"), _participant("bob", "Бета"), _participant("cid")]
+    response = client.post("/participants/bulk", json=items, headers=headers)
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["errors"] == []
+    assert body["teams"]["Альфа"] == existing
+    assert set(body["teams"]) == {"Альфа", "Бета"}
+    assert set(body["participants"]) == {"ann", "bob", "cid"}
+
+    members = client.get(f"/teams/{existing}/participants/", headers=headers).json()
+    assert [(member["nickname"], member["id"]) for member in members] == [("ann", body["participants"]["ann"])]
+    assert len(client.get("/teams/", headers=headers).json()) == 2
+
+
+def test_bulk_reports_invalid_items_and_keeps_the_rest(client):
+    headers = register(client, "owner")
+    items = [_participant("ann"), {"nickname": "broken"}, _participant("bob", skill=None)]
+    body = client.post("/participants/bulk", json=items, headers=headers).json()
+    assert list(body["participants"]) == ["ann"]
+    errors = {error["index"]: error["detail"] for error in body["errors"]}
+    assert sorted(errors) == [1, 2]
+    assert {error["loc"][0] for error in errors[1]} == {"full_name", "email", "phone", "skill"}
+    assert [error["loc"] for error in errors[2]] == [["skill"]]
+
+
+def test_bulk_upserts_by_nickname(client):
+    headers = register(client, "owner")
+    first = client.post("/participants/bulk", json=[_participant("ann", "Альфа")], headers=headers).json()
+    # Повтор обновляет поля, а без team_name команда участника сохраняется
+    second = client.post(
+        "/participants/bulk", json=[_participant("ann", skill="go"), _participant("ann", skill="rust")], headers=headers
+    ).json()
+    assert second["participants"] == first["participants"]
+    participants = client.get("/participants/", headers=headers).json()
+    assert [(p["nickname"], p["skill"], p["team_id"]) for p in participants] == [
+        ("ann", "rust", first["teams"]["Альфа"])
+    ]
+
+
+def test_bulk_requires_auth(client):
+    assert client.post("/participants/bulk", json=[_participant("ann")]).status_code == 401
+
+
+def test_bulk_size_is_limited(client):
+    headers = register(client, "owner")
+    items = [_participant(f"user{number}") for number in range(1001)]
+    assert client.post("/participants/bulk", json=items, headers=headers).status_code == 413
+
+
+def test_list_bounds_are_validated(client):
+    headers = register(client, "owner")
+    team_id = client.post("/teams/", json={"name": "Альфа"}, headers=headers).json()["id"]
+    for path in ("/teams/", "/participants/", f"/teams/{team_id}/participants/"):
+        for params in ({"skip": -1}, {"limit": 0}, {"limit": 1001}):
+            assert client.get(path, params=params, headers=headers).status_code == 422, (path, params)
+        assert client.get(path, params={"skip": 0, "limit": 1000}, headers=headers).status_code == 200
@@ -0,0 +1,56 @@
+import os
+import tempfile
+
+import pytest
+from sqlalchemy import create_engine, exc, text
+from sqlalchemy.pool import QueuePool
+
+from conftest import register
+import metrics
+
+
+def test_pool_endpoint_reports_both_pools(client):
+    headers = register(client, "owner")
+    before = client.get("/metrics/pool").json()
+    client.get("/tasks/", headers=headers)
+    after = client.get("/metrics/pool").json()
+
+    assert set(after) == {"async", "sync"}
+    pool = after["async"]
+    assert {"size", "checked_out", "overflow", "timeout", "checkout_wait_seconds"} <= set(pool)
+    assert pool["checkouts"] > before["async"]["checkouts"]
+    # Между запросами все соединения возвращены в пул
+    assert pool["checked_out"] == 0
+    assert pool["checkout_wait_seconds"]["count"] >= pool["checkouts"] - before["async"]["checkouts"]
+
+
+def test_pool_metrics_in_prometheus_text(client):
+    register(client, "owner")
+    body = client.get("/metrics").text
+    assert 'db_pool_checked_out{pool="async"} ' in body
+    assert 'db_pool_checkouts_total{pool="async"} ' in body
+    assert 'db_pool_checkout_wait_seconds_bucket{pool="async",le="+Inf"} ' in body
+
+
+def test_checkout_timeout_is_counted():
+    pool_metrics = metrics.PoolMetrics("test")
+    path = os.path.join(tempfile.mkdtemp(), "pool.db")
+    engine = create_engine(
+        f"sqlite:///{path}",
+        poolclass=metrics.instrumented_pool(QueuePool, pool_metrics),
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+    )
+    pool_metrics.attach(engine)
+    try:
+        with engine.connect() as held:
+            held.execute(text("SELECT 1"))
+            assert pool_metrics.snapshot()["checked_out"] == 1
+            with pytest.raises(exc.TimeoutError):
+                engine.connect()
+        snapshot = pool_metrics.snapshot()
+        assert (snapshot["checkout_timeouts"], snapshot["checkouts"], snapshot["checked_out"]) == (1, 1, 0)
+        assert snapshot["checkout_wait_seconds"]["count"] == 2
+    finally:
+        engine.dispose()
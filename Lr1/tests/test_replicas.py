@@ -0,0 +1,92 @@
+import asyncio
+import os
+import tempfile
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import Session, SQLModel
+
+import database
+import models
+
+
+def _replica(name: str):
+    # Отдельная база SQLite с одним пользователем, по имени которого видно, откуда пришло чтение
+    path = os.path.join(tempfile.mkdtemp(prefix=f"{name}_"), "replica.db")
+    sync = create_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(sync)
+    with Session(sync) as session:
+        session.add(models.User(username=name, email=f"{name}@example.com", hashed_password="x"))
+        session.commit()
+    sync.dispose()
+    return create_async_engine(f"sqlite+aiosqlite:///{path}")
+
+
+@pytest.fixture
+def replicas(monkeypatch):
+    with Session(database.engine) as session:
+        session.add(models.User(username="primary", email="primary@example.com", hashed_password="x"))
+        session.commit()
+    replica_set = database.ReplicaSet(
+        database.async_engine, {"replica0": _replica("replica0"), "replica1": _replica("replica1")}, 60
+    )
+    monkeypatch.setattr(database, "replica_set", replica_set)
+    yield replica_set
+    asyncio.run(replica_set.stop())
+
+
+def _read_username(session_factory=database.AsyncReadSessionLocal, user_id=None) -> str:
+    async def scenario():
+        token = database.current_user_id.set(user_id)
+        try:
+            async with session_factory() as db:
+                return await db.scalar(select(models.User.username))
+        finally:
+            database.current_user_id.reset(token)
+
+    return asyncio.run(scenario())
+
+
+def test_reads_go_round_robin_to_replicas(replicas):
+    assert [_read_username() for _ in range(4)] == ["replica0", "replica1", "replica0", "replica1"]
+    assert replicas.reads == {"primary": 0, "replica0": 2, "replica1": 2}
+
+
+def test_write_sessions_use_primary(replicas):
+    assert _read_username(database.AsyncSessionLocal) == "primary"
+    assert sum(replicas.reads.values()) == 0
+
+
+def test_writer_reads_own_writes_from_primary(replicas):
+    async def write():
+        token = database.current_user_id.set(7)
+        try:
+            async with database.AsyncSessionLocal() as db:
+                db.add(models.Tag(name="срочно"))
+                await db.commit()
+        finally:
+            database.current_user_id.reset(token)
+
+    asyncio.run(write())
+    assert replicas.is_sticky(7)
+    assert _read_username(user_id=7) == "primary"
+    assert _read_username(user_id=8) == "replica0"
+
+
+def test_unhealthy_replicas_are_skipped(replicas):
+    replicas.mark_down("replica0")
+    assert [_read_username() for _ in range(2)] == ["replica1", "replica1"]
+    replicas.mark_down("replica1")
+    assert _read_username() == "primary"
+    # Фоновая проверка возвращает ожившие реплики
+    asyncio.run(replicas.check())
+    assert replicas.healthy == ["replica0", "replica1"]
+
+
+def test_failed_health_check_marks_replica_down(replicas, monkeypatch):
+    broken = create_async_engine("sqlite+aiosqlite:////nonexistent/dir/replica.db")
+    monkeypatch.setitem(replicas.replicas, "replica1", broken)
+    asyncio.run(replicas.check())
+    assert replicas.healthy == ["replica0"]
+    assert replicas.snapshot()["healthy"] == ["replica0"]
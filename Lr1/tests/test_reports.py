@@ -0,0 +1,83 @@
+from datetime import date, datetime
+
+from sqlmodel import Session, select
+
+from conftest import register
+import database
+import models
+import rebuild_rollups
+
+
+def _task(client, headers, title: str) -> int:
+    return client.post("/tasks/", json={"title": title, "priority": 1}, headers=headers).json()["id"]
+
+
+def _tag(task_id: int, name: str) -> int:
+    with Session(database.engine) as session:
+        tag = models.Tag(name=name)
+        session.add(tag)
+        session.flush()
+        session.add(models.TaskTag(task_id=task_id, tag_id=tag.id))
+        session.commit()
+        return tag.id
+
+
+def _rollups() -> list:
+    with Session(database.engine) as session:
+        rows = session.exec(select(models.TimeRollup)).all()
+        return sorted((row.user_id, row.day, row.task_id, row.total_minutes, row.entry_count) for row in rows)
+
+
+def test_reports_follow_new_entries(client):
+    owner, other = register(client, "owner"), register(client, "other")
+    first, second = _task(client, owner, "Первая"), _task(client, owner, "Вторая")
+    tag_id = _tag(second, "встречи")
+    client.post(f"/tasks/{first}/time_entries", json={"duration": 30}, headers=owner)
+    client.post(f"/tasks/{first}/time_entries", json={"duration": 15}, headers=owner)
+    client.post(f"/tasks/{second}/time_entries/bulk", json=[{"duration": 60}, {"duration": 5}], headers=owner)
+    foreign = _task(client, other, "Чужая")
+    client.post(f"/tasks/{foreign}/time_entries", json={"duration": 100}, headers=other)
+
+    assert client.get("/reports/total", headers=owner).json() == {"total_minutes": 110, "entry_count": 4}
+    assert client.get("/reports/tasks", headers=owner).json() == [
+        {"task_id": first, "total_minutes": 45, "entry_count": 2},
+        {"task_id": second, "total_minutes": 65, "entry_count": 2},
+    ]
+    today = datetime.utcnow().date().isoformat()
+    assert client.get("/reports/days", headers=owner).json() == [
+        {"day": today, "total_minutes": 110, "entry_count": 4}
+    ]
+    assert client.get("/reports/tags", headers=owner).json() == [
+        {"tag_id": tag_id, "name": "встречи", "total_minutes": 65, "entry_count": 2}
+    ]
+    assert client.get("/reports/total", headers=other).json()["total_minutes"] == 100
+
+
+def test_rebuild_backfills_from_raw_entries(client):
+    headers = register(client, "owner")
+    task_id = _task(client, headers, "Задача")
+    client.post(f"/tasks/{task_id}/time_entries", json={"duration": 20}, headers=headers)
+    # Исторические записи, внесённые в обход crud, в сводке не учтены
+    with Session(database.engine) as session:
+        session.add_all([
+            models.TimeEntry(task_id=task_id, duration=40, created_at=datetime(2024, 3, 1, 9)),
+            models.TimeEntry(task_id=task_id, duration=10, created_at=datetime(2024, 3, 1, 18)),
+            models.TimeEntry(task_id=task_id, duration=5, created_at=datetime(2024, 3, 2, 12)),
+        ])
+        session.commit()
+    incremental = _rollups()
+    assert len(incremental) == 1
+
+    with database.SessionLocal() as session:
+        assert rebuild_rollups.rebuild_rollups(session) == 3
+    user_id = incremental[0][0]
+    assert _rollups() == [
+        (user_id, date(2024, 3, 1), task_id, 50, 2),
+        (user_id, date(2024, 3, 2), task_id, 5, 1),
+        incremental[0],
+    ]
+    march = client.get("/reports/days", params={"date_from": "2024-03-01", "date_to": "2024-03-31"}, headers=headers)
+    assert march.json() == [
+        {"day": "2024-03-01", "total_minutes": 50, "entry_count": 2},
+        {"day": "2024-03-02", "total_minutes": 5, "entry_count": 1},
+    ]
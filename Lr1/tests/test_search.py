@@ -0,0 +1,89 @@
+import os
+import subprocess
+import sys
+
+from conftest import register
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _create(client, headers, title: str, description: str = None) -> int:
+    response = client.post(
+        "/tasks/", json={"title": title, "description": description, "priority": 1}, headers=headers
+    )
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+def test_ranking(client):
+    headers = register(client, "owner")
+    weak = _create(client, headers, "Отчёт", "квартальный отчёт и прочее, прочее, прочее, прочее")
+    strong = _create(client, headers, "Отчёт отчёт", "отчёт")
+    _create(client, headers, "Совсем другое")
+    response = client.get("/tasks/search", params={"q": "отчёт"}, headers=headers)
+    assert response.status_code == 200, response.text
+    assert [task["id"] for task in response.json()] == [strong, weak]
+
+
+def test_search_is_per_user(client):
+    _create(client, register(client, "owner"), "Секретный отчёт")
+    response = client.get("/tasks/search", params={"q": "отчёт"}, headers=register(client, "intruder"))
+    assert response.json() == []
+
+
+def test_cursor_pages_through_all_results(client):
+    headers = register(client, "owner")
+    created = {_create(client, headers, f"Отчёт номер {i}") for i in range(5)}
+    seen, cursor = [], None
+    while True:
+        params = {"q": "отчёт", "limit": 2, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/tasks/search", params=params, headers=headers)
+        assert response.status_code == 200, response.text
+        seen += [task["id"] for task in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+    assert sorted(seen) == sorted(created)
+    assert len(seen) == len(set(seen))
+
+
+def test_blank_query_is_bad_request(client):
+    headers = register(client, "owner")
+    response = client.get("/tasks/search", params={"q": "   "}, headers=headers)
+    assert response.status_code == 400
+    assert client.get("/tasks/search", params={"q": ""}, headers=headers).status_code == 422
+
+
+def test_fts_syntax_is_not_interpreted(client):
+    headers = register(client, "owner")
+    task_id = _create(client, headers, 'Задача "в кавычках" AND NOT')
+    for q in ['"', "AND", "NOT*", "title:x", "("]:
+        assert client.get("/tasks/search", params={"q": q}, headers=headers).status_code == 200
+    response = client.get("/tasks/search", params={"q": '"кавычках'}, headers=headers)
+    assert [task["id"] for task in response.json()] == [task_id]
+
+
+def test_index_follows_updates_and_deletes(client):
+    # На SQLite индекс task_fts поддерживают триггеры
+    headers = register(client, "owner")
+    task_id = _create(client, headers, "Старое название")
+    client.put(f"/tasks/{task_id}", json={"title": "Новое название", "priority": 1}, headers=headers)
+    assert client.get("/tasks/search", params={"q": "старое"}, headers=headers).json() == []
+    assert [t["id"] for t in client.get("/tasks/search", params={"q": "новое"}, headers=headers).json()] == [task_id]
+    client.delete(f"/tasks/{task_id}", headers=headers)
+    assert client.get("/tasks/search", params={"q": "новое"}, headers=headers).json() == []
+
+
+def test_create_all_without_search_module_creates_fts(tmp_path):
+    # Индекс поиска создаётся вместе со схемой, даже если search.py не импортирован
+    script = (
+        "import sqlite3, sys\n"
+        "from sqlmodel import SQLModel, create_engine\n"
+        "import models\n"
+        "assert 'search' not in sys.modules\n"
+        f"SQLModel.metadata.create_all(create_engine('sqlite:///{tmp_path}/fresh.db'))\n"
+        f"names = {{row[0] for row in sqlite3.connect('{tmp_path}/fresh.db').execute('SELECT name FROM sqlite_master')}}\n"
+        "assert {'task_fts', 'task_fts_ai', 'task_fts_ad', 'task_fts_au'} <= names, names\n"
+    )
+    result = subprocess.run([sys.executable, "-c", script], cwd=APP_DIR, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
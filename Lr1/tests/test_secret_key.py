@@ -0,0 +1,22 @@
+import os
+import subprocess
+import sys
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _import_auth(**env) -> subprocess.CompletedProcess:
+    environ = {key: value for key, value in os.environ.items() if not key.startswith("SECRET_KEY")}
+    return subprocess.run(
+        [sys.executable, "-c", "import auth"], cwd=APP_DIR, env={**environ, **env}, capture_output=True, text=True
+    )
+
+
+def test_missing_secret_key_fails_at_startup():
+    result = _import_auth()
+    assert result.returncode != 0
+    assert "Не задан SECRET_KEY" in result.stderr
+
+
+def test_dev_flag_generates_key():
+    assert _import_auth(SECRET_KEY_DEV="1").returncode == 0
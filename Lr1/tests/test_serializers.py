@@ -0,0 +1,64 @@
+from datetime import datetime
+
+import orjson
+from sqlmodel import Session
+
+from conftest import register
+import database
+import models
+import schemas
+import serializers
+
+
+def _task() -> models.Task:
+    with Session(database.engine) as session:
+        user = models.User(username="owner", email="owner@example.com", hashed_password="x")
+        tag = models.Tag(name="срочно")
+        session.add_all([user, tag])
+        session.flush()
+        task = models.Task(
+            title="Задача", description="Описание", deadline=datetime(2030, 1, 1, 9, 30), priority=2, user_id=user.id
+        )
+        session.add(task)
+        session.flush()
+        session.add_all([
+            models.TimeEntry(task_id=task.id, duration=15, created_at=datetime(2024, 3, 1, 12, 0, 0, 123456)),
+            models.TaskTag(task_id=task.id, tag_id=tag.id, note="к пятнице"),
+        ])
+        session.commit()
+        task = session.get(models.Task, task.id)
+        # Загружаем связи до закрытия сессии, как это делает crud
+        task.owner, task.time_entries, task.tags, [task_tag.tag for task_tag in task.tags]
+        return task
+
+
+def test_manual_serializers_match_schemas():
+    task = _task()
+    expected = schemas.TaskOut.model_validate(task, from_attributes=True).model_dump(mode="json")
+    assert orjson.loads(orjson.dumps(serializers.task_to_dict(task))) == expected
+    assert list(serializers.task_to_dict(task)) == list(expected)
+    user = schemas.UserOut.model_validate(task.owner, from_attributes=True).model_dump(mode="json")
+    assert orjson.loads(orjson.dumps(serializers.user_to_dict(task.owner))) == user
+
+
+def test_task_response_is_orjson_encoded(client):
+    headers = register(client, "owner")
+    task_id = client.post(
+        "/tasks/", json={"title": "Задача", "priority": 1, "deadline": "2030-01-01T09:30:00"}, headers=headers
+    ).json()["id"]
+    client.post(f"/tasks/{task_id}/time_entries", json={"duration": 15}, headers=headers)
+
+    response = client.get(f"/tasks/{task_id}", headers=headers)
+    assert response.headers["content-type"] == "application/json"
+    body = response.json()
+    # Тело совпадает побайтно с тем, что даёт orjson для того же dict, а поля — со схемой TaskOut
+    assert response.content == orjson.dumps(body)
+    assert schemas.TaskOut.model_validate(body).model_dump(mode="json") == body
+    assert body["deadline"] == "2030-01-01T09:30:00"
+
+
+def test_dump_drops_fields_outside_schema():
+    value = {"created": [], "errors": [{"index": 0, "detail": "ошибка", "extra": 1}]}
+    assert serializers.dump(schemas.TaskBulkOut, value) == {
+        "created": [], "errors": [{"index": 0, "detail": "ошибка"}]
+    }
@@ -0,0 +1,55 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select
+
+from conftest import register
+import crud
+import database
+import models
+
+
+def _pages(client, headers, sort: str, limit: int) -> list:
+    seen, cursor = [], None
+    while True:
+        params = {"sort": sort, "limit": limit, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/tasks/", params=params, headers=headers)
+        assert response.status_code == 200, response.text
+        seen += [task["id"] for task in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return seen
+
+
+def test_priority_keyset_matches_full_listing(client):
+    headers = register(client, "owner")
+    for i, (priority, deadline) in enumerate(
+        [(2, None), (1, "2026-12-01T00:00:00"), (1, None), (2, "2026-11-01T00:00:00"), (1, "2026-11-01T00:00:00")] * 3
+    ):
+        task = {"title": f"Задача {i}", "priority": priority, "deadline": deadline}
+        assert client.post("/tasks/", json=task, headers=headers).status_code == 200
+    full = [task["id"] for task in client.get("/tasks/", params={"sort": "priority"}, headers=headers).json()]
+    assert len(full) == 15
+    for limit in (1, 2, 4):
+        assert _pages(client, headers, "priority", limit) == full
+
+
+def test_priority_keyset_uses_index_range():
+    # Без ведущей границы priority >= SQLite читал бы индекс пользователя с начала
+    Task = models.Task
+    query = (
+        select(Task.id)
+        .where(Task.user_id == 1, crud._tasks_after_priority(2, datetime(2026, 11, 1), 5))
+        .order_by(Task.priority, Task.deadline.asc().nulls_last(), Task.id)
+    )
+    sql = str(query.compile(database.engine, compile_kwargs={"literal_binds": True}))
+    with database.engine.connect() as connection:
+        plan = " ".join(row[-1] for row in connection.exec_driver_sql("EXPLAIN QUERY PLAN " + sql))
+    assert "ix_task_user_id_priority_deadline_id (user_id=? AND priority>?)" in plan
+
+
+@pytest.mark.parametrize("params", [{"limit": -1}, {"limit": 0}, {"limit": 1001}, {"skip": -1}])
+def test_listing_bounds(client, params):
+    headers = register(client, "owner")
+    assert client.get("/tasks/", params=params, headers=headers).status_code == 422
+    assert client.get("/users/", params=params, headers=headers).status_code == 422
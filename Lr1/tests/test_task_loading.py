@@ -0,0 +1,73 @@
+import asyncio
+
+from sqlalchemy import event
+from sqlmodel import Session
+
+from conftest import register
+import crud
+import database
+import models
+
+
+def _seed(tasks: int) -> int:
+    # Задачи с записями времени и меткой — все вложенные коллекции TaskOut не пусты
+    with Session(database.engine) as session:
+        user = models.User(username="owner", email="owner@example.com", hashed_password="x")
+        tag = models.Tag(name="срочно")
+        session.add_all([user, tag])
+        session.commit()
+        for number in range(tasks):
+            task = models.Task(title=f"Задача {number}", priority=1, user_id=user.id)
+            session.add(task)
+            session.flush()
+            session.add_all([models.TimeEntry(task_id=task.id, duration=minutes) for minutes in (10, 20)])
+            session.add(models.TaskTag(task_id=task.id, tag_id=tag.id))
+        session.commit()
+        return user.id
+
+
+def _load(user_id: int, include=crud.TASK_RELATIONS) -> tuple:
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    async def scenario():
+        async with database.AsyncSessionLocal() as db:
+            tasks = await crud.get_tasks(db, user_id, include=include)
+            # Обращение к связям после загрузки не должно порождать запросов
+            return [(task.owner.username, len(task.time_entries), len(task.tags)) for task in tasks]
+
+    event.listen(database.async_engine.sync_engine, "before_cursor_execute", count)
+    try:
+        return asyncio.run(scenario()), len(statements)
+    finally:
+        event.remove(database.async_engine.sync_engine, "before_cursor_execute", count)
+
+
+def test_page_query_count_does_not_grow_with_size():
+    user_id = _seed(30)
+    tasks, queries = _load(user_id)
+    assert tasks == [("owner", 2, 1)] * 30
+    # Задачи с владельцами, записи времени, метки со связанными Tag
+    assert queries == 3
+
+
+def test_excluded_collections_are_not_queried():
+    user_id = _seed(5)
+    tasks, queries = _load(user_id, include=("tags",))
+    assert tasks == [("owner", 0, 1)] * 5
+    assert queries == 2
+
+
+def test_include_parameter(client):
+    headers = register(client, "owner")
+    task_id = client.post("/tasks/", json={"title": "Задача", "priority": 1}, headers=headers).json()["id"]
+    client.post(f"/tasks/{task_id}/time_entries", json={"duration": 15}, headers=headers)
+
+    full = client.get("/tasks/", headers=headers).json()
+    assert [len(task["time_entries"]) for task in full] == [1]
+    short = client.get("/tasks/", params={"include": "tags"}, headers=headers).json()
+    assert [task["time_entries"] for task in short] == [[]]
+    response = client.get("/tasks/", params={"include": "owner,comments"}, headers=headers)
+    assert response.status_code == 400
@@ -0,0 +1,70 @@
+from sqlmodel import Session
+
+from conftest import register
+import database
+import models
+
+
+def _tag(name: str = "срочно") -> int:
+    with Session(database.engine) as session:
+        tag = models.Tag(name=name)
+        session.add(tag)
+        session.commit()
+        return tag.id
+
+
+def _create_task(client, headers) -> int:
+    response = client.post("/tasks/", json={"title": "Задача", "priority": 1}, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+def test_add_tag(client):
+    headers = register(client, "owner")
+    task_id, tag_id = _create_task(client, headers), _tag()
+    response = client.post(f"/tasks/{task_id}/tags", json={"tag_id": tag_id, "note": "к пятнице"}, headers=headers)
+    assert response.status_code == 200, response.text
+    assert response.json() == {"tag": {"id": tag_id, "name": "срочно"}, "note": "к пятнице"}
+
+
+def test_add_tag_twice_is_conflict(client):
+    headers = register(client, "owner")
+    task_id, tag_id = _create_task(client, headers), _tag()
+    assert client.post(f"/tasks/{task_id}/tags", json={"tag_id": tag_id}, headers=headers).status_code == 200
+    response = client.post(f"/tasks/{task_id}/tags", json={"tag_id": tag_id}, headers=headers)
+    assert response.status_code == 409
+    assert response.json()["detail"] == "Метка уже назначена задаче"
+
+
+def test_add_unknown_tag_is_not_found(client):
+    headers = register(client, "owner")
+    task_id = _create_task(client, headers)
+    response = client.post(f"/tasks/{task_id}/tags", json={"tag_id": 999}, headers=headers)
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Метка не найдена"
+
+
+def test_add_tag_to_foreign_task_is_not_found(client):
+    # Метки общие; чужой для пользователя является задача
+    task_id = _create_task(client, register(client, "owner"))
+    tag_id = _tag()
+    response = client.post(f"/tasks/{task_id}/tags", json={"tag_id": tag_id}, headers=register(client, "intruder"))
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Задача не найдена"
+
+
+def test_add_tag_race_is_conflict(client, monkeypatch):
+    # Параллельный запрос успел вставить связь между проверкой и commit
+    import crud
+
+    headers = register(client, "owner")
+    task_id, tag_id = _create_task(client, headers), _tag()
+    assert client.post(f"/tasks/{task_id}/tags", json={"tag_id": tag_id}, headers=headers).status_code == 200
+
+    async def missing(db, task_id, tag_id):
+        return None
+
+    monkeypatch.setattr(crud, "get_task_tag", missing)
+    response = client.post(f"/tasks/{task_id}/tags", json={"tag_id": tag_id}, headers=headers)
+    assert response.status_code == 409
+    assert len(client.get(f"/tasks/{task_id}", headers=headers).json()["tags"]) == 1
@@ -0,0 +1,126 @@
+import asyncio
+import os
+import time
+
+import pytest
+from sqlmodel import Session, select
+
+from conftest import register
+import database
+import models
+import tasks
+import timer_store
+import timers
+
+# Настоящий Redis для проверки Lua-скрипта; без него RedisTimerStore гоняется на подделке ниже
+TEST_REDIS_URL = os.getenv("TEST_REDIS_URL")
+
+
+class FakeRedis:
+    # Команды, которыми пользуется RedisTimerStore, с decode_responses=True
+    def __init__(self):
+        self.hashes = {}
+
+    async def hsetnx(self, key, field, value):
+        fields = self.hashes.setdefault(key, {})
+        if str(field) in fields:
+            return 0
+        fields[str(field)] = str(value)
+        return 1
+
+    async def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    def register_script(self, script):
+        assert script == timer_store.STOP_SCRIPT
+
+        async def stop(keys, args):
+            # HGET + HDEL, как в STOP_SCRIPT
+            fields = self.hashes.get(keys[0], {})
+            return fields.pop(str(args[0]), None)
+
+        return stop
+
+
+def _redis_store():
+    if TEST_REDIS_URL is None:
+        return timer_store.RedisTimerStore(FakeRedis())
+    import redis
+    import redis.asyncio
+
+    sync = redis.Redis.from_url(TEST_REDIS_URL)
+    keys = sync.keys("timers:*")
+    if keys:
+        sync.delete(*keys)
+    return timer_store.RedisTimerStore(redis.asyncio.from_url(TEST_REDIS_URL, decode_responses=True))
+
+
+@pytest.fixture(params=["memory", "redis"])
+def store(request, monkeypatch):
+    store = timer_store.TimerStore() if request.param == "memory" else _redis_store()
+    monkeypatch.setattr(tasks, "timer_store", store)
+    monkeypatch.setattr(timers, "timer_store", store)
+    return store
+
+
+def test_store_start_stop(store):
+    async def scenario():
+        assert await store.start(1, 10, 100.5)
+        assert not await store.start(1, 10, 200.0)
+        assert await store.start(1, 11, 150.0)
+        assert await store.start(2, 10, 300.0)
+        assert await store.active(1) == [(10, 100.5), (11, 150.0)]
+        first, second = await store.stop(1, 10), await store.stop(1, 10)
+        return first, second, await store.active(1), await store.active(2)
+
+    if TEST_REDIS_URL is not None and isinstance(store, timer_store.RedisTimerStore):
+        pytest.skip("клиент Redis привязан к циклу событий; на настоящем Redis проверяется через API")
+    assert asyncio.run(scenario()) == (100.5, None, [(11, 150.0)], [(10, 300.0)])
+
+
+def _entries(task_id: int) -> list:
+    with Session(database.engine) as session:
+        return session.exec(select(models.TimeEntry.duration).where(models.TimeEntry.task_id == task_id)).all()
+
+
+def _task(client, headers) -> int:
+    return client.post("/tasks/", json={"title": "Таймер", "priority": 1}, headers=headers).json()["id"]
+
+
+def test_timer_flow(client, store):
+    headers = register(client, "owner")
+    task_id = _task(client, headers)
+
+    assert client.post(f"/tasks/{task_id}/timer/stop", headers=headers).status_code == 409
+    assert client.post(f"/tasks/{task_id}/timer/start", headers=headers).status_code == 200
+    assert client.post(f"/tasks/{task_id}/timer/start", headers=headers).status_code == 409
+    assert [timer["task_id"] for timer in client.get("/timers/active", headers=headers).json()] == [task_id]
+
+    # Остановка сразу после запуска — одна минута, а не запись длиной 0
+    response = client.post(f"/tasks/{task_id}/timer/stop", headers=headers)
+    assert response.status_code == 200, response.text
+    assert response.json()["duration"] == 1
+    assert client.post(f"/tasks/{task_id}/timer/stop", headers=headers).status_code == 409
+    assert client.get("/timers/active", headers=headers).json() == []
+    assert _entries(task_id) == [1]
+
+
+def test_started_minute_counts_whole(client, store):
+    headers = register(client, "owner")
+    task_id = _task(client, headers)
+    user_id = client.get("/users/me", headers=headers).json()["id"]
+    # Таймер идёт 2 минуты 30 секунд: в запись попадают 3 минуты
+    client.portal.call(store.start, user_id, task_id, time.time() - 150)
+
+    response = client.post(f"/tasks/{task_id}/timer/stop", headers=headers)
+    assert response.json()["duration"] == 3
+
+
+def test_timers_are_per_user(client, store):
+    owner, other = register(client, "owner"), register(client, "other")
+    task_id = _task(client, owner)
+    client.post(f"/tasks/{task_id}/timer/start", headers=owner)
+
+    assert client.get("/timers/active", headers=other).json() == []
+    assert client.post(f"/tasks/{task_id}/timer/stop", headers=other).status_code == 409
+    assert client.post(f"/tasks/{task_id}/timer/stop", headers=owner).status_code == 200
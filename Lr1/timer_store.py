@@ -0,0 +1,75 @@
+# app/timer_store.py
+# Запущенные таймеры задач. Пока таймер идёт, в базе о нём ничего нет:
+# TimeEntry пишется один раз при остановке, а список активных таймеров
+# читается из памяти процесса или из Redis (TIMER_REDIS_URL) — без
+# опроса базы клиентами. Без Redis таймеры видит только тот воркер,
+# который их запустил, и они теряются при перезапуске.
+import os
+from typing import Dict, List, Optional, Tuple
+
+TIMER_REDIS_URL = os.getenv("TIMER_REDIS_URL")
+
+# Остановка в Redis: прочитать время запуска и удалить поле атомарно
+STOP_SCRIPT = """
+local started = redis.call('HGET', KEYS[1], ARGV[1])
+if started then
+    redis.call('HDEL', KEYS[1], ARGV[1])
+end
+return started
+"""
+
+
+class TimerStore:
+    # user_id -> {task_id: время запуска (unix-время)}; все операции из event loop
+    def __init__(self):
+        self._timers: Dict[int, Dict[int, float]] = {}
+
+    async def start(self, user_id: int, task_id: int, started_at: float) -> bool:
+        """Запускает таймер; False, если он уже идёт."""
+        timers = self._timers.setdefault(user_id, {})
+        if task_id in timers:
+            return False
+        timers[task_id] = started_at
+        return True
+
+    async def stop(self, user_id: int, task_id: int) -> Optional[float]:
+        """Останавливает таймер и возвращает время запуска; None, если он не запущен."""
+        timers = self._timers.get(user_id)
+        if not timers or task_id not in timers:
+            return None
+        started_at = timers.pop(task_id)
+        if not timers:
+            del self._timers[user_id]
+        return started_at
+
+    async def active(self, user_id: int) -> List[Tuple[int, float]]:
+        return sorted(self._timers.get(user_id, {}).items())
+
+
+class RedisTimerStore:
+    # Хэш timers:{user_id}: поле — task_id, значение — время запуска
+    def __init__(self, redis):
+        self.redis = redis
+        self._stop = redis.register_script(STOP_SCRIPT)
+
+    async def start(self, user_id: int, task_id: int, started_at: float) -> bool:
+        return bool(await self.redis.hsetnx(f"timers:{user_id}", task_id, repr(started_at)))
+
+    async def stop(self, user_id: int, task_id: int) -> Optional[float]:
+        started_at = await self._stop(keys=[f"timers:{user_id}"], args=[task_id])
+        return float(started_at) if started_at is not None else None
+
+    async def active(self, user_id: int) -> List[Tuple[int, float]]:
+        timers = await self.redis.hgetall(f"timers:{user_id}")
+        return sorted((int(task_id), float(started_at)) for task_id, started_at in timers.items())
+
+
+def _make_store(url: Optional[str]):
+    if not url:
+        return TimerStore()
+    import redis.asyncio
+
+    return RedisTimerStore(redis.asyncio.from_url(url, decode_responses=True))
+
+
+timer_store = _make_store(TIMER_REDIS_URL)
@@ -0,0 +1,18 @@
+# app/routers/timers.py
+import time
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import ORJSONResponse
+from typing import List
+import schemas, serializers
+from auth import get_current_user_id
+from timer_store import timer_store
+
+router = APIRouter(default_response_class=ORJSONResponse)
+
+# Активные таймеры пользователя; отвечает без обращения к базе
+@router.get("/active", response_model=List[schemas.TimerOut])
+async def read_active_timers(user_id: int = Depends(get_current_user_id)):
+    now = time.time()
+    timers = await timer_store.active(user_id)
+    return serializers.json_response([serializers.timer_to_dict(task_id, started_at, now) for task_id, started_at in timers])
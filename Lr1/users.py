@@ -1,21 +1,54 @@
 # app/routers/users.py
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-import schemas, crud, models
-from auth import get_db
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+import schemas, crud, models, pagination, etag, serializers
+from database import get_async_session, get_read_session
+from auth import get_current_user
+from passwords import hasher
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 
 @router.get("/me", response_model=schemas.UserOut)
-def read_current_user(current_user: models.User):
-    return current_user
+async def read_current_user(current_user: models.User = Depends(get_current_user)):
+    return serializers.json_response(serializers.user_to_dict(current_user))
 
 @router.get("/", response_model=List[schemas.UserOut])
-def read_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+async def read_users(
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_session),
+):
     # Можно ограничить этот эндпоинт, если не хотите раскрывать список всех пользователей
-    return crud.get_users(db, skip=skip, limit=limit)
+    users_etag = etag.make_etag("users", await crud.get_users_version(db), skip, limit, cursor or "")
+    if etag.etag_matches(if_none_match, users_etag):
+        return Response(status_code=304, headers={"ETag": users_etag})
+    response.headers["ETag"] = users_etag
+    after = None
+    if cursor:
+        try:
+            after = pagination.decode_cursor(cursor, pagination.USER_SORT_KEYS)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    users = await crud.get_users(db, skip=skip, limit=limit, after=after)
+    next_cursor = pagination.next_cursor(users, limit, pagination.USER_SORT_KEYS)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return serializers.json_response(serializers.users_to_list(users), response)
 
 @router.put("/me/password", response_model=schemas.UserOut)
-def change_password(password_data: schemas.UserPasswordChange, db: Session = Depends(get_db), ):
-    return
+async def change_password(
+    password_data: schemas.UserPasswordChange,
+    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session),
+):
+    # Закэшированный пользователь отсоединён от сессии — для записи читаем его заново
+    user = await db.get(models.User, current_user.id)
+    valid, _ = await hasher.verify_and_update(password_data.old_password, user.hashed_password)
+    if not valid:
+        raise HTTPException(status_code=400, detail="Неверный текущий пароль")
+    return await crud.update_user_password(db, user, password_data.new_password)
@@ -0,0 +1,106 @@
+"""base schema
+
+Таблицы, которые уже создаёт parser_service (Lr3) через create_all.
+Существующие таблицы не трогаются, поэтому миграция подходит и для
+пустой базы, и для базы, поднятой в docker-compose до появления Alembic.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # В offline-режиме (--sql) базы нет, выводим полный DDL
+    existing = set() if context.is_offline_mode() else set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "user" not in existing:
+        op.create_table(
+            "user",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("username", sa.String(), nullable=False),
+            sa.Column("email", sa.String(), nullable=False),
+            sa.Column("hashed_password", sa.String(), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+        )
+        op.create_index("ix_user_username", "user", ["username"])
+        op.create_index("ix_user_email", "user", ["email"])
+
+    if "task" not in existing:
+        op.create_table(
+            "task",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("title", sa.String(), nullable=False),
+            sa.Column("description", sa.String(), nullable=True),
+            sa.Column("deadline", sa.DateTime(), nullable=True),
+            sa.Column("priority", sa.Integer(), nullable=False),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("user.id"), nullable=True),
+        )
+
+    if "timeentry" not in existing:
+        op.create_table(
+            "timeentry",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("duration", sa.Integer(), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+            sa.Column("task_id", sa.Integer(), sa.ForeignKey("task.id"), nullable=True),
+        )
+
+    if "tag" not in existing:
+        op.create_table(
+            "tag",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("name", sa.String(), nullable=False, unique=True),
+        )
+
+    if "tasktag" not in existing:
+        op.create_table(
+            "tasktag",
+            sa.Column("task_id", sa.Integer(), sa.ForeignKey("task.id"), primary_key=True),
+            sa.Column("tag_id", sa.Integer(), sa.ForeignKey("tag.id"), primary_key=True),
+            sa.Column("note", sa.String(), nullable=True),
+        )
+
+    if "team" not in existing:
+        op.create_table(
+            "team",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("name", sa.String(), nullable=False),
+        )
+        op.create_index("ix_team_name", "team", ["name"], unique=True)
+
+    if "participant" not in existing:
+        op.create_table(
+            "participant",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("full_name", sa.String(), nullable=False),
+            sa.Column("nickname", sa.String(), nullable=False),
+            sa.Column("email", sa.String(), nullable=False),
+            sa.Column("phone", sa.String(), nullable=False),
+            sa.Column("skill", sa.String(), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+            sa.Column("team_id", sa.Integer(), sa.ForeignKey("team.id"), nullable=True),
+        )
+        op.create_index("ix_participant_nickname", "participant", ["nickname"], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_table("participant")
+    op.drop_table("team")
+    op.drop_table("tasktag")
+    op.drop_table("tag")
+    op.drop_table("timeentry")
+    op.drop_table("task")
+    op.drop_table("user")
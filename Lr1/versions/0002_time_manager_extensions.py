@@ -0,0 +1,61 @@
+"""time manager extensions
+
+Счётчик версий задач для ETag, таблица сводок учёта времени
+и полнотекстовый поиск по задачам.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+import models
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("user") as batch_op:
+        batch_op.add_column(sa.Column("tasks_version", sa.Integer(), nullable=False, server_default="0"))
+
+    op.create_table(
+        "timerollup",
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("user.id"), primary_key=True),
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("task_id", sa.Integer(), sa.ForeignKey("task.id"), primary_key=True),
+        sa.Column("total_minutes", sa.Integer(), nullable=False),
+        sa.Column("entry_count", sa.Integer(), nullable=False),
+    )
+
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        # Сгенерированная колонка сразу вычисляется для существующих строк
+        for statement in models.TASK_SEARCH_POSTGRES_DDL:
+            op.execute(statement)
+    elif dialect == "sqlite":
+        for statement in models.TASK_SEARCH_SQLITE_DDL:
+            op.execute(statement)
+        op.execute("INSERT INTO task_fts(task_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_task_search_vector")
+        op.execute("ALTER TABLE task DROP COLUMN IF EXISTS search_vector")
+    elif dialect == "sqlite":
+        for trigger in ("task_fts_ai", "task_fts_ad", "task_fts_au"):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS task_fts")
+    op.drop_table("timerollup")
+    with op.batch_alter_table("user") as batch_op:
+        batch_op.drop_column("tasks_version")
@@ -0,0 +1,55 @@
+"""access path indexes
+
+Индексы под запросы, которые реально выполняют роутеры:
+список задач пользователя (keyset по id и по priority/deadline),
+записи времени задачи, метки, сводки и участники команды.
+В PostgreSQL индексы строятся CONCURRENTLY, без блокировки записи.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ("ix_task_user_id_id", "task", ["user_id", "id"], {}),
+    ("ix_task_user_id_priority_deadline_id", "task", ["user_id", "priority", "deadline", "id"], {}),
+    (
+        "ix_timeentry_task_id_id",
+        "timeentry",
+        ["task_id", "id"],
+        {"postgresql_include": ["duration", "created_at"]},
+    ),
+    ("ix_timeentry_created_at", "timeentry", ["created_at"], {}),
+    ("ix_tasktag_tag_id", "tasktag", ["tag_id"], {}),
+    ("ix_timerollup_task_id", "timerollup", ["task_id"], {}),
+    ("ix_participant_team_id", "participant", ["team_id"], {}),
+]
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        # CREATE INDEX CONCURRENTLY нельзя выполнять внутри транзакции
+        with op.get_context().autocommit_block():
+            for name, table, columns, kwargs in INDEXES:
+                op.create_index(
+                    name, table, columns, postgresql_concurrently=True, if_not_exists=True, **kwargs
+                )
+    else:
+        for name, table, columns, kwargs in INDEXES:
+            op.create_index(name, table, columns, if_not_exists=True, **kwargs)
+
+
+def downgrade() -> None:
+    for name, table, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
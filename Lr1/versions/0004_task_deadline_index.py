@@ -0,0 +1,38 @@
+"""task deadline index
+
+Индекс (user_id, deadline) под GET /tasks/due: диапазон по сроку
+внутри задач одного пользователя читается без сортировки.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            op.create_index(
+                "ix_task_user_id_deadline",
+                "task",
+                ["user_id", "deadline"],
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+    else:
+        op.create_index("ix_task_user_id_deadline", "task", ["user_id", "deadline"], if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_task_user_id_deadline", table_name="task", if_exists=True)
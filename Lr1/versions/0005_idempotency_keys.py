@@ -0,0 +1,39 @@
+"""idempotency keys
+
+Сохранённые ответы на запросы с заголовком Idempotency-Key.
+Индекс по created_at — для удаления просроченных ключей.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "idempotencykey",
+        sa.Column("scope", sa.String(length=64), primary_key=True),
+        sa.Column("key", sa.String(length=255), primary_key=True),
+        sa.Column("request_hash", sa.String(length=64), nullable=False),
+        sa.Column("status_code", sa.Integer(), nullable=True),
+        sa.Column("response_body", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_idempotencykey_created_at", "idempotencykey", ["created_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_idempotencykey_created_at", table_name="idempotencykey")
+    op.drop_table("idempotencykey")
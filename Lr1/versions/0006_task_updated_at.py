@@ -0,0 +1,39 @@
+"""task updated_at
+
+Время последнего изменения задачи. Планировщик сроков раз в
+DEADLINE_SYNC_INTERVAL выбирает задачи, изменённые другими воркерами,
+по индексу ix_task_updated_at. Существующим строкам значение не нужно:
+их сроки планировщик читает полной загрузкой при старте.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("task", sa.Column("updated_at", sa.DateTime(), nullable=True))
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            op.create_index(
+                "ix_task_updated_at", "task", ["updated_at"], postgresql_concurrently=True, if_not_exists=True
+            )
+    else:
+        op.create_index("ix_task_updated_at", "task", ["updated_at"], if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_task_updated_at", table_name="task", if_exists=True)
+    op.drop_column("task", "updated_at")
@@ -0,0 +1,62 @@
+import argparse
+import os
+
+from parser_naive import *
+
+# Вся таблица загружается одним запросом к POST /participants/bulk:
+# команды создаются по имени, участники создаются или обновляются по никнейму.
+BULK_MAX_ITEMS = 1000
+API_URL = "http://localhost:8000"
+
+
+def login(username, password):
+    # /participants/bulk требует авторизации — токен берём у /auth/login
+    response = requests.post(f"{API_URL}/auth/login", data={"username": username, "password": password})
+    if response.status_code != 200:
+        raise SystemExit(f"Не удалось войти как {username}: {response.status_code} {response.text}")
+    return response.json()["access_token"]
+
+
+def upload_participants(data, token):
+    headers = {"Authorization": f"Bearer {token}"}
+    rows = [parse_participant(row) for row in data if row.get("Никнейм")]
+    result = {"teams": {}, "participants": {}, "errors": []}
+    for start in range(0, len(rows), BULK_MAX_ITEMS):
+        response = requests.post(
+            f"{API_URL}/participants/bulk",
+            json=rows[start: start + BULK_MAX_ITEMS],
+            headers=headers,
+        )
+        if response.status_code == 401:
+            # Без действующего токена все остальные пачки тоже будут отклонены
+            raise SystemExit("Токен отклонён (401): проверьте имя пользователя и пароль")
+        if response.status_code != 200:
+            print("Failed to upload participants:", response.status_code, response.json())
+            continue
+        batch = response.json()
+        result["teams"].update(batch["teams"])
+        result["participants"].update(batch["participants"])
+        result["errors"] += [{**error, "index": error["index"] + start} for error in batch["errors"]]
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Загрузка участников из Google-таблицы через POST /participants/bulk")
+    parser.add_argument("--username", default=os.getenv("API_USERNAME"))
+    parser.add_argument("--password", default=os.getenv("API_PASSWORD"))
+    args = parser.parse_args()
+    if not args.username or not args.password:
+        parser.error("нужны --username и --password (или переменные API_USERNAME и API_PASSWORD)")
+    token = login(args.username, args.password)
+
+    start_time = time.time()
+
+    url = "https://docs.google.com/spreadsheets/d/1mQN3GROxytwL-8Y_Hi9Gxrf3XeP9Kqe7SzII6SajWSo"
+    sh = init_google_sheet(url)
+    worksheet = sh.sheet1
+    data = worksheet.get_all_records()
+
+    result = upload_participants(data, token)
+    print(f"Команд: {len(result['teams'])}, участников: {len(result['participants'])}, ошибок: {len(result['errors'])}")
+
+    print(f"Общее время выполнения: {time.time() - start_time:.2f} секунд.")